@@ -0,0 +1,128 @@
+# standard lib imports
+import asyncio
+import heapq
+import itertools
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+# module imports
+from app.exceptions import ServiceUnavailableError
+
+# upper bounds in seconds of the acquire wait histogram buckets, the last bucket is unbounded
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Priority(IntEnum):
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+# priority of the connections acquired by the current request, set per route by the db_priority dependency and
+# inherited by the tasks the request spawns
+DB_PRIORITY: ContextVar[Priority] = ContextVar("db_priority", default=Priority.NORMAL)
+
+
+class AdmissionController:
+    def __init__(self, max_concurrency: int, max_queue_depth: int, max_wait: float, retry_after: int) -> None:
+        self._max_concurrency = max_concurrency
+        self._max_queue_depth = max_queue_depth
+        self._max_wait = max_wait
+        self._retry_after = retry_after
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._in_use = 0
+        self._queued = 0
+        self._wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+        self._wait_sum = 0.0
+        self.peak_in_use = 0
+        self.admitted = {priority: 0 for priority in Priority}
+        self.timeouts = 0
+        self.rejections = 0
+
+    async def acquire(self, priority: Priority) -> None:
+        if self._in_use < self._max_concurrency and not self._queued:
+            self._in_use += 1
+        else:
+            await self._wait(priority)
+        self.admitted[priority] += 1
+        self.peak_in_use = max(self.peak_in_use, self._in_use)
+
+    def release(self) -> None:
+        # the slot goes straight to the next live waiter, so in_use only drops when nobody is queued
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                self._queued -= 1
+                return
+        self._in_use -= 1
+
+    @asynccontextmanager
+    async def admit(self, priority: Priority) -> AsyncIterator[None]:
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def record_wait(self, wait: float) -> None:
+        self._wait_sum += wait
+        for index, bound in enumerate(WAIT_BUCKETS):
+            if wait <= bound:
+                self._wait_buckets[index] += 1
+                return
+        self._wait_buckets[-1] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        cumulative = list(itertools.accumulate(self._wait_buckets))
+        return {
+            "max_concurrency": self._max_concurrency,
+            "in_use": self._in_use,
+            "peak_in_use": self.peak_in_use,
+            "queued": self._queued,
+            "admitted": {priority.name.lower(): count for priority, count in self.admitted.items()},
+            "timeouts": self.timeouts,
+            "rejections": self.rejections,
+            "wait_seconds_sum": self._wait_sum,
+            "wait_seconds_buckets": {**{str(bound): count for bound, count in zip(WAIT_BUCKETS, cumulative)}, "+Inf": cumulative[-1]},
+        }
+
+    async def _wait(self, priority: Priority) -> None:
+        if self._queued >= self._max_queue_depth:
+            self._shed(priority)
+        waiter = (priority, next(self._sequence), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._waiters, waiter)
+        self._queued += 1
+        future = waiter[2]
+        try:
+            await asyncio.wait((future,), timeout=self._max_wait)
+        except asyncio.CancelledError:
+            self._abandon(future)
+            raise
+        if not future.done():
+            self._abandon(future)
+            self.timeouts += 1
+            raise ServiceUnavailableError(retry_after=self._retry_after)
+        # a shed waiter's future carries the error, an admitted one its slot
+        future.result()
+
+    def _shed(self, priority: Priority) -> None:
+        # the waiter that would be admitted last is the one given up for a more urgent acquire
+        live_waiters = [waiter for waiter in self._waiters if not waiter[2].done()]
+        self.rejections += 1
+        if not live_waiters or max(live_waiters)[0] <= priority:
+            raise ServiceUnavailableError(retry_after=self._retry_after)
+        _, _, future = max(live_waiters)
+        future.set_exception(ServiceUnavailableError(retry_after=self._retry_after))
+        self._queued -= 1
+
+    def _abandon(self, future: asyncio.Future) -> None:
+        if not future.done():
+            future.cancel()
+            self._queued -= 1
+        elif not future.cancelled() and future.exception() is None:
+            # the slot was handed over just as the waiter gave up, so pass it on
+            self.release()
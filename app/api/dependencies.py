@@ -1,11 +1,18 @@
+# standard lib imports
+from typing import Awaitable, Callable, Optional
+
 # third party imports
 from fastapi import Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials, SecurityScopes
 from starlette.requests import Request
 from databases import Database
-from supabase import create_client, Client
 
 # module imports
+from app.admission import DB_PRIORITY, Priority
+from app.cache import CoalescingCache, LRUCache
+from app.data.direct_pool import DirectPool
+from app.data.jwks import JWKSKeyStore
+from app.data.storage import StorageBackend
 from app.data.stripe import StripeData
 from app.exceptions import AuthError
 from app.logic.authorization import AuthorizationLogic
@@ -13,33 +20,93 @@ from app.logic.stripe import StripeLogic
 from app.logic.image import ImageLogic
 from app.logic.user_image import UserImageLogic
 from app.logic.user_alias import UserAliasLogic
+from app.models.authorization import Principal
 from app.data.image import ImageData
+from app.data.image_sampler import ImageSampler
 from app.data.user_image import UserImageData
 from app.data.user_alias import UserAliasData
 
 
-authorization_logic = AuthorizationLogic()
+def db_priority(priority: Priority) -> Callable[[], Awaitable[None]]:
+    async def _db_priority() -> None:
+        # async, so the context var is set in the request's own context rather than a threadpool copy of it
+        DB_PRIORITY.set(priority)
+
+    return _db_priority
 
 
 def get_db(request: Request) -> Database:
     return request.app.state.database
 
 
-def get_supabase_client(request: Request) -> Client:
-    return create_client(
-        request.app.state.config.SUPABASE_URL,
-        request.app.state.config.SUPABASE_SERVICE_KEY,
-    )
+def get_direct_db(request: Request) -> Optional[DirectPool]:
+    return request.app.state.direct_database
+
+
+def get_jwks_key_store(request: Request) -> JWKSKeyStore:
+    return request.app.state.jwks_key_store
+
+
+def get_token_cache(request: Request) -> LRUCache:
+    return request.app.state.token_cache
+
+
+def get_storage_backend(request: Request) -> StorageBackend:
+    return request.app.state.storage_backend
+
+
+def get_signed_url_cache(request: Request) -> LRUCache:
+    return request.app.state.signed_url_cache
 
 
-def get_supabase_bucket(request: Request) -> str:
-    return request.app.state.config.SUPABASE_BUCKET
+def get_user_alias_cache(request: Request) -> LRUCache:
+    return request.app.state.user_alias_cache
+
+
+def get_user_alias_cache_ttl(request: Request) -> int:
+    return request.app.state.config.USER_ALIAS_CACHE_TTL
+
+
+def get_rankings_cache(request: Request) -> CoalescingCache:
+    return request.app.state.rankings_cache
+
+
+def get_image_sampler(request: Request) -> ImageSampler:
+    return request.app.state.image_sampler
 
 
 def get_supabase_url_timeout(request: Request) -> int:
     return request.app.state.config.SUPABASE_URL_TIMEOUT
 
 
+def get_signed_url_min_ttl_fraction(request: Request) -> float:
+    return request.app.state.config.SIGNED_URL_MIN_TTL_FRACTION
+
+
+def get_upload_chunk_size(request: Request) -> int:
+    return request.app.state.config.UPLOAD_CHUNK_SIZE
+
+
+def get_max_upload_file_bytes(request: Request) -> int:
+    return request.app.state.config.MAX_UPLOAD_FILE_BYTES
+
+
+def get_max_upload_request_bytes(request: Request) -> int:
+    return request.app.state.config.MAX_UPLOAD_REQUEST_BYTES
+
+
+def get_bulk_upload_concurrency(request: Request) -> int:
+    return request.app.state.config.BULK_UPLOAD_CONCURRENCY
+
+
+def get_user_alias_search_max_results(request: Request) -> int:
+    return request.app.state.config.USER_ALIAS_SEARCH_MAX_RESULTS
+
+
+def get_fast_list_responses(request: Request) -> bool:
+    return request.app.state.config.FAST_LIST_RESPONSES
+
+
 def get_stripe_secret_key(request: Request) -> str:
     return request.app.state.config.STRIPE_SECRET_KEY
 
@@ -56,36 +123,60 @@ def get_domain(request: Request) -> str:
     return request.app.state.config.CLIENT_DOMAIN
 
 
-def authorize_user(
+def authorization_logic_dependency(
+    jwks_key_store: JWKSKeyStore = Depends(get_jwks_key_store),
+    token_cache: LRUCache = Depends(get_token_cache),
+) -> AuthorizationLogic:
+    return AuthorizationLogic(jwks_key_store=jwks_key_store, token_cache=token_cache)
+
+
+async def authorize_user(
     security_scopes: SecurityScopes,
     token: HTTPAuthorizationCredentials = Depends(HTTPBearer()),
-):
-    authorized, username = authorization_logic.authorize_user_for_operation(token=token.credentials, scopes=security_scopes.scopes)
+    authorization_logic: AuthorizationLogic = Depends(authorization_logic_dependency),
+) -> Principal:
+    authorized, principal = await authorization_logic.authorize_user_for_operation(token=token.credentials, scopes=security_scopes.scopes)
     if not authorized:
-        raise AuthError({"username": username, "scopes": security_scopes.scopes})
-    return username
+        raise AuthError({"username": principal.email, "scopes": security_scopes.scopes})
+    return principal
 
 
 def image_data_dependency(
     db: Database = Depends(get_db),
-    supabase_client: Client = Depends(get_supabase_client),
-    supabase_bucket: str = Depends(get_supabase_bucket),
+    direct_db: Optional[DirectPool] = Depends(get_direct_db),
+    storage: StorageBackend = Depends(get_storage_backend),
+    signed_url_cache: LRUCache = Depends(get_signed_url_cache),
+    image_sampler: ImageSampler = Depends(get_image_sampler),
     supabase_url_timeout: int = Depends(get_supabase_url_timeout),
+    signed_url_min_ttl_fraction: float = Depends(get_signed_url_min_ttl_fraction),
+    upload_chunk_size: int = Depends(get_upload_chunk_size),
 ) -> ImageData:
     return ImageData(
         db=db,
-        supabase_client=supabase_client,
-        supabase_bucket=supabase_bucket,
+        direct_db=direct_db,
+        storage=storage,
+        signed_url_cache=signed_url_cache,
+        image_sampler=image_sampler,
         supabase_url_timeout=supabase_url_timeout,
+        signed_url_min_ttl_fraction=signed_url_min_ttl_fraction,
+        upload_chunk_size=upload_chunk_size,
     )
 
 
-def user_image_data_dependency(db: Database = Depends(get_db)) -> UserImageData:
-    return UserImageData(db=db)
+def user_image_data_dependency(
+    db: Database = Depends(get_db),
+    direct_db: Optional[DirectPool] = Depends(get_direct_db),
+    rankings_cache: CoalescingCache = Depends(get_rankings_cache),
+) -> UserImageData:
+    return UserImageData(db=db, direct_db=direct_db, rankings_cache=rankings_cache)
 
 
-def user_alias_data_dependency(db: Database = Depends(get_db)) -> UserAliasData:
-    return UserAliasData(db=db)
+def user_alias_data_dependency(
+    db: Database = Depends(get_db),
+    user_alias_cache: LRUCache = Depends(get_user_alias_cache),
+    user_alias_cache_ttl: int = Depends(get_user_alias_cache_ttl),
+) -> UserAliasData:
+    return UserAliasData(db=db, user_alias_cache=user_alias_cache, user_alias_cache_ttl=user_alias_cache_ttl)
 
 
 def stripe_data_dependency(db: Database = Depends(get_db)) -> StripeData:
@@ -96,8 +187,18 @@ def image_logic_dependency(
     image_data: ImageData = Depends(image_data_dependency),
     user_image_data: UserImageData = Depends(user_image_data_dependency),
     user_alias_data: UserImageData = Depends(user_alias_data_dependency),
+    max_upload_file_bytes: int = Depends(get_max_upload_file_bytes),
+    max_upload_request_bytes: int = Depends(get_max_upload_request_bytes),
+    bulk_upload_concurrency: int = Depends(get_bulk_upload_concurrency),
 ) -> ImageLogic:
-    return ImageLogic(image_data=image_data, user_image_data=user_image_data, user_alias_data=user_alias_data)
+    return ImageLogic(
+        image_data=image_data,
+        user_image_data=user_image_data,
+        user_alias_data=user_alias_data,
+        max_upload_file_bytes=max_upload_file_bytes,
+        max_upload_request_bytes=max_upload_request_bytes,
+        bulk_upload_concurrency=bulk_upload_concurrency,
+    )
 
 
 def user_image_logic_dependency(
@@ -108,8 +209,9 @@ def user_image_logic_dependency(
 
 def user_alias_logic_dependency(
     user_alias_data: UserAliasData = Depends(user_alias_data_dependency),
+    search_max_results: int = Depends(get_user_alias_search_max_results),
 ) -> UserAliasLogic:
-    return UserAliasLogic(user_alias_data=user_alias_data)
+    return UserAliasLogic(user_alias_data=user_alias_data, search_max_results=search_max_results)
 
 
 def stripe_logic_dependency(
@@ -118,8 +220,7 @@ def stripe_logic_dependency(
     stripe_price_id: str = Depends(get_stripe_price_id),
     stripe_webhook_secret: str = Depends(get_stripe_webhook_secret),
     domain_url: str = Depends(get_domain),
-    image_data: ImageLogic = Depends(image_data_dependency),
-    user_image_data: UserImageData = Depends(user_image_data_dependency),
+    image_data: ImageData = Depends(image_data_dependency),
 ) -> StripeLogic:
     return StripeLogic(
         stripe_data=stripe_data,
@@ -128,5 +229,4 @@ def stripe_logic_dependency(
         stripe_webhook_secret=stripe_webhook_secret,
         domain_url=domain_url,
         image_data=image_data,
-        user_image_data=user_image_data,
     )
@@ -1,20 +1,65 @@
 # standard lib imports
-from typing import Callable
+from typing import Callable, Tuple
 
 # third party imports
 from fastapi import FastAPI
-from databases import Database
+
+# module imports
+from app.admission import AdmissionController
+from app.cache import CoalescingCache, LRUCache
+from app.config import Settings
+from app.data.database import AdmittedDatabase
+from app.data.direct_pool import DirectPool
+from app.data.image_sampler import ImageSampler
+from app.data.jwks import JWKSKeyStore
+from app.data.storage import create_storage_backend
+
+
+def db_pool_max_sizes(config: Settings) -> Tuple[int, int]:
+    direct_max_size = config.MAX_DIRECT_DB_POOL_SIZE if config.DIRECT_DB_POOL_ENABLED else 0
+    max_size = config.MAX_DB_POOL_SIZE - direct_max_size
+    if max_size < 1:
+        raise ValueError(
+            f"MAX_DIRECT_DB_POOL_SIZE={direct_max_size} leaves no connections of MAX_DB_POOL_SIZE={config.MAX_DB_POOL_SIZE} for the databases pool"
+        )
+    return max_size, direct_max_size
+
+
+def create_db_admission(config: Settings, max_size: int) -> AdmissionController:
+    return AdmissionController(
+        max_concurrency=max_size,
+        max_queue_depth=config.DB_ADMISSION_MAX_QUEUE_DEPTH,
+        max_wait=config.DB_ADMISSION_MAX_WAIT,
+        retry_after=config.DB_ADMISSION_RETRY_AFTER,
+    )
 
 
 def create_db_connection_pool(app: FastAPI) -> Callable:
     async def _create_db_connection_pool() -> None:
         config = app.state.config
-        app.state.database = Database(
+        max_size, direct_max_size = db_pool_max_sizes(config=config)
+        app.state.db_admission = create_db_admission(config=config, max_size=config.DB_ADMISSION_MAX_CONCURRENCY or max_size)
+        app.state.database = AdmittedDatabase(
             url=config.DATABASE_URL,
-            min_size=config.MIN_DB_POOL_SIZE,
-            max_size=config.MAX_DB_POOL_SIZE,
+            admission=app.state.db_admission,
+            min_size=min(config.MIN_DB_POOL_SIZE, max_size),
+            max_size=max_size,
+            statement_cache_size=config.DB_STATEMENT_CACHE_SIZE,
         )
         await app.state.database.connect()
+        app.state.direct_db_admission = None
+        app.state.direct_database = None
+        if config.DIRECT_DB_POOL_ENABLED:
+            # each pool has its own slots, so an acquire queued on one pool never holds a slot the other could use
+            app.state.direct_db_admission = create_db_admission(config=config, max_size=direct_max_size)
+            app.state.direct_database = DirectPool(
+                url=config.DATABASE_URL,
+                admission=app.state.direct_db_admission,
+                min_size=min(config.MIN_DIRECT_DB_POOL_SIZE, direct_max_size),
+                max_size=direct_max_size,
+                statement_cache_size=config.DB_STATEMENT_CACHE_SIZE,
+            )
+            await app.state.direct_database.connect()
 
     return _create_db_connection_pool
 
@@ -22,5 +67,56 @@ def create_db_connection_pool(app: FastAPI) -> Callable:
 def close_db_connection_pool(app: FastAPI) -> Callable:
     async def _close_db_connection_pool() -> None:
         await app.state.database.disconnect()
+        if app.state.direct_database is not None:
+            await app.state.direct_database.disconnect()
 
     return _close_db_connection_pool
+
+
+def create_storage_backend_client(app: FastAPI) -> Callable:
+    async def _create_storage_backend_client() -> None:
+        app.state.storage_backend = create_storage_backend(config=app.state.config)
+
+    return _create_storage_backend_client
+
+
+def close_storage_backend_client(app: FastAPI) -> Callable:
+    async def _close_storage_backend_client() -> None:
+        await app.state.storage_backend.close()
+
+    return _close_storage_backend_client
+
+
+def create_jwks_key_store(app: FastAPI) -> Callable:
+    async def _create_jwks_key_store() -> None:
+        config = app.state.config
+        app.state.jwks_key_store = JWKSKeyStore(
+            jwks_url=f"{config.AUTH0_ALLOWED_ISSUERS}.well-known/jwks.json",
+            refresh_interval=config.JWKS_REFRESH_INTERVAL,
+            min_refetch_interval=config.JWKS_MIN_REFETCH_INTERVAL,
+            timeout=config.JWKS_FETCH_TIMEOUT,
+        )
+        await app.state.jwks_key_store.start()
+
+    return _create_jwks_key_store
+
+
+def close_jwks_key_store(app: FastAPI) -> Callable:
+    async def _close_jwks_key_store() -> None:
+        await app.state.jwks_key_store.close()
+
+    return _close_jwks_key_store
+
+
+def create_caches(app: FastAPI) -> Callable:
+    async def _create_caches() -> None:
+        config = app.state.config
+        app.state.token_cache = LRUCache(max_entries=config.TOKEN_CACHE_MAX_ENTRIES, max_bytes=config.TOKEN_CACHE_MAX_BYTES)
+        app.state.signed_url_cache = LRUCache(max_entries=config.SIGNED_URL_CACHE_MAX_ENTRIES, max_bytes=config.SIGNED_URL_CACHE_MAX_BYTES)
+        app.state.user_alias_cache = LRUCache(max_entries=config.USER_ALIAS_CACHE_MAX_ENTRIES)
+        app.state.rankings_cache = CoalescingCache(
+            ttl=config.RANKINGS_CACHE_TTL, max_entries=config.RANKINGS_CACHE_MAX_ENTRIES, stale_after=config.RANKINGS_CACHE_OPEN_STALENESS
+        )
+        app.state.image_sampler = ImageSampler(refresh_interval=config.IMAGE_CATALOG_REFRESH_INTERVAL)
+
+    return _create_caches
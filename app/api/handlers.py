@@ -3,7 +3,15 @@ from fastapi import Request, encoders, responses
 from starlette import status
 
 # module imports
-from app.exceptions import NotFoundError, RequiredValueError, AuthError, TokenError
+from app.exceptions import (
+    NotFoundError,
+    RequiredValueError,
+    AuthError,
+    TokenError,
+    InvalidCursorError,
+    PayloadTooLargeError,
+    ServiceUnavailableError,
+)
 
 
 def not_found_exception_handler(exc: NotFoundError) -> responses.JSONResponse:
@@ -24,3 +32,19 @@ def auth_exception_handler(_: Request, exc: AuthError) -> responses.JSONResponse
 def token_exception_handler(exc: TokenError) -> responses.JSONResponse:
     content = encoders.jsonable_encoder(vars(exc))
     return responses.JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content=content)
+
+
+def invalid_cursor_handler(_: Request, exc: InvalidCursorError) -> responses.JSONResponse:
+    content = encoders.jsonable_encoder(vars(exc))
+    return responses.JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content=content)
+
+
+def payload_too_large_handler(_: Request, exc: PayloadTooLargeError) -> responses.JSONResponse:
+    content = encoders.jsonable_encoder(vars(exc))
+    return responses.JSONResponse(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, content=content)
+
+
+def service_unavailable_handler(_: Request, exc: ServiceUnavailableError) -> responses.JSONResponse:
+    content = encoders.jsonable_encoder(vars(exc))
+    headers = {"Retry-After": str(exc.extras["retry_after"])}
+    return responses.JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=content, headers=headers)
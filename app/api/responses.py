@@ -0,0 +1,15 @@
+# standard lib imports
+from typing import Any, List, Mapping, Optional, Sequence
+
+# third party imports
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+# list pages with FAST_LIST_RESPONSES on, dumped in one pydantic-core call without FastAPI revalidating the models
+class ListSerializer:
+    def __init__(self, item_type: Any) -> None:
+        self._adapter = TypeAdapter(List[item_type])
+
+    def response(self, items: Sequence[Any], headers: Optional[Mapping[str, str]] = None) -> Response:
+        return Response(content=self._adapter.dump_json(list(items)), media_type="application/json", headers=headers)
@@ -1,8 +1,11 @@
 # third party imports
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, Security
 
 # module imports
-from app.models.response import HealthcheckResponse
+from app.api.dependencies import authorize_user
+from app.logic.authorization import CRUDOperation, ResourceType
+from app.models.authorization import Principal
+from app.models.response import HealthcheckResponse, StatsResponse
 
 router = APIRouter()
 
@@ -10,3 +13,23 @@ router = APIRouter()
 @router.get("/", response_model=HealthcheckResponse)
 async def healthcheck():
     return HealthcheckResponse()
+
+
+@router.get("/stats", response_model=StatsResponse)
+async def stats(
+    request: Request,
+    auth_info: Principal = Security(
+        authorize_user,
+        scopes=[f"{CRUDOperation.READ.value}:{ResourceType.STATS.value}"],
+    ),
+):
+
+    _ = auth_info
+    return StatsResponse(
+        token_cache=request.app.state.token_cache.stats(),
+        signed_url_cache=request.app.state.signed_url_cache.stats(),
+        user_alias_cache=request.app.state.user_alias_cache.stats(),
+        rankings_cache=request.app.state.rankings_cache.stats(),
+        db_admission=request.app.state.db_admission.stats(),
+        direct_db_admission=request.app.state.direct_db_admission.stats() if request.app.state.direct_db_admission is not None else None,
+    )
@@ -2,22 +2,27 @@
 from typing import Sequence, Optional
 
 # third party imports
-from fastapi import APIRouter, File, Path, Query, Depends, Security, UploadFile
+from fastapi import APIRouter, File, Path, Query, Depends, Response, Security, UploadFile
 
 # module imports
-from app.api.dependencies import image_logic_dependency, authorize_user
+from app.admission import Priority
+from app.api.dependencies import image_logic_dependency, authorize_user, db_priority, get_fast_list_responses
+from app.api.responses import ListSerializer
 from app.logic.authorization import CRUDOperation, ResourceType
 from app.logic.image import ImageLogic
+from app.models.authorization import Principal
 from app.models.response import AddResponse, DeleteResponse
-from app.models.image import ImageResponse
+from app.models.image import ImageResponse, ImageIngestResult
 
 
 router = APIRouter()
 
+image_responses = ListSerializer(Optional[ImageResponse])
+
 
 @router.post("", response_model=AddResponse)
 async def create(
-    auth_info: str = Security(
+    auth_info: Principal = Security(
         authorize_user,
         scopes=[f"{CRUDOperation.CREATE.value}:{ResourceType.IMAGE.value}"],
     ),
@@ -25,14 +30,14 @@ async def create(
     image_file: UploadFile = File(..., title="image file"),
 ):
 
-    user_email = auth_info
+    user_email = auth_info.email
     added = await image_logic.create(image_file=image_file, user_email=user_email)
     return AddResponse(added=added)
 
 
-@router.post("/bulk", response_model=AddResponse)
+@router.post("/bulk", response_model=Sequence[ImageIngestResult])
 async def bulk_create(
-    auth_info: str = Security(
+    auth_info: Principal = Security(
         authorize_user,
         scopes=[f"{CRUDOperation.CREATE.value}:{ResourceType.IMAGE.value}"],
     ),
@@ -40,14 +45,14 @@ async def bulk_create(
     image_files: Sequence[UploadFile] = File(..., title="image files"),
 ):
 
-    user_email = auth_info
-    added = await image_logic.bulk_create(image_files=image_files, user_email=user_email)
-    return AddResponse(added=added)
+    user_email = auth_info.email
+    return await image_logic.bulk_create(image_files=image_files, user_email=user_email)
 
 
 @router.get("", response_model=Sequence[Optional[ImageResponse]])
 async def read(
-    auth_info: str = Security(
+    response: Response,
+    auth_info: Principal = Security(
         authorize_user,
         scopes=[],
     ),
@@ -57,15 +62,22 @@ async def read(
     opened: Optional[bool] = Query(None),
     limit: int = Query(50, ge=1),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, title="X-Next-Cursor header of the previous page, replaces offset"),
+    fast_list_responses: bool = Depends(get_fast_list_responses),
 ):
 
     _ = auth_info
-    return await image_logic.read(user_email=user_email, user_alias=user_alias, opened=opened, limit=limit, offset=offset)
+    images, next_cursor = await image_logic.read(user_email=user_email, user_alias=user_alias, opened=opened, limit=limit, offset=offset, cursor=cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if fast_list_responses:
+        return image_responses.response(images, headers=response.headers)
+    return images
 
 
 @router.delete("/{image_id}", response_model=DeleteResponse)
 async def delete(
-    auth_info: str = Security(
+    auth_info: Principal = Security(
         authorize_user,
         scopes=[f"{CRUDOperation.DELETE.value}:{ResourceType.IMAGE.value}"],
     ),
@@ -78,28 +90,28 @@ async def delete(
     return DeleteResponse(deleted=deleted)
 
 
-@router.put("/open", response_model=Sequence[Optional[ImageResponse]])
+@router.put("/open", response_model=Sequence[Optional[ImageResponse]], dependencies=[Depends(db_priority(Priority.HIGH))])
 async def open_image(
-    auth_info: str = Security(
+    auth_info: Principal = Security(
         authorize_user,
         scopes=[],
     ),
     image_logic: ImageLogic = Depends(image_logic_dependency),
 ):
 
-    user_email = auth_info
+    user_email = auth_info.email
     return await image_logic.open_image(user_email=user_email)
 
 
 @router.post("/dd", response_model=bool)
 async def daily_dollar(
-    auth_info: str = Security(
+    auth_info: Principal = Security(
         authorize_user,
         scopes=[],
     ),
     image_logic: ImageLogic = Depends(image_logic_dependency),
 ):
 
-    user_email = auth_info
+    user_email = auth_info.email
     added = await image_logic.daily_dollar(user_email=user_email)
     return bool(added)
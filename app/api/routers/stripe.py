@@ -2,8 +2,10 @@
 from fastapi import APIRouter, Depends, Query, Request, Security, Header
 
 # module imports
-from app.api.dependencies import stripe_logic_dependency, authorize_user
+from app.admission import Priority
+from app.api.dependencies import stripe_logic_dependency, authorize_user, db_priority
 from app.logic.stripe import StripeLogic
+from app.models.authorization import Principal
 from app.models.response import UpdateResponse
 from app.models.stripe import StripeResponse
 
@@ -18,7 +20,7 @@ async def parse_body(request: Request):
 
 @router.get("", response_model=StripeResponse)
 async def read(
-    auth_info: str = Security(
+    auth_info: Principal = Security(
         authorize_user,
         scopes=[],
     ),
@@ -26,12 +28,12 @@ async def read(
     quantity: int = Query(2, ge=2, le=10),
 ):
 
-    user_email = auth_info
+    user_email = auth_info.email
     stripe_url = await stripe_logic.read(user_email=user_email, quantity=quantity)
     return StripeResponse(url=stripe_url)
 
 
-@router.post("/webhook", response_model=UpdateResponse)
+@router.post("/webhook", response_model=UpdateResponse, dependencies=[Depends(db_priority(Priority.HIGH))])
 async def webhook(
     stripe_logic: StripeLogic = Depends(stripe_logic_dependency),
     stripe_response_header: str = Header(..., alias="stripe-signature"),
@@ -5,19 +5,24 @@ from typing import Sequence, Optional
 from fastapi import APIRouter, Path, Query, Body, Depends, Security
 
 # module imports
-from app.api.dependencies import user_alias_logic_dependency, authorize_user
+from app.api.dependencies import user_alias_logic_dependency, authorize_user, get_fast_list_responses
+from app.api.responses import ListSerializer
 from app.logic.authorization import CRUDOperation, ResourceType
 from app.logic.user_alias import UserAliasLogic
+from app.models.authorization import Principal
 from app.models.response import AddResponse, UpdateResponse, DeleteResponse
-from app.models.user_alias import UserAlias, UserAliasBase
+from app.models.user_alias import UserAlias, UserAliasBase, UserAliasSearchResult
 
 
 router = APIRouter()
 
+user_alias_responses = ListSerializer(Optional[UserAlias])
+user_alias_search_responses = ListSerializer(UserAliasSearchResult)
+
 
 @router.post("", response_model=AddResponse)
 async def create(
-    auth_info: str = Security(
+    auth_info: Principal = Security(
         authorize_user,
         scopes=[],
     ),
@@ -25,14 +30,14 @@ async def create(
     user_alias: UserAliasBase = Body(..., title="create user_alias"),
 ):
 
-    user_email = auth_info
+    user_email = auth_info.email
     added = await user_alias_logic.create(user_alias=user_alias, user_email=user_email)
     return AddResponse(added=added)
 
 
 @router.get("", response_model=Sequence[Optional[UserAlias]])
 async def read(
-    auth_info: str = Security(
+    auth_info: Principal = Security(
         authorize_user,
         scopes=[],
     ),
@@ -41,15 +46,39 @@ async def read(
     user_email: Optional[str] = Query(None),
     limit: int = Query(1, ge=1),
     offset: int = Query(0, ge=0),
+    fast_list_responses: bool = Depends(get_fast_list_responses),
+):
+
+    _ = auth_info
+    user_aliases = await user_alias_logic.read(user_alias=user_alias, user_email=user_email, limit=limit, offset=offset)
+    if fast_list_responses:
+        return user_alias_responses.response(user_aliases)
+    return user_aliases
+
+
+@router.get("/search", response_model=Sequence[UserAliasSearchResult])
+async def search(
+    auth_info: Principal = Security(
+        authorize_user,
+        scopes=[],
+    ),
+    user_alias_logic: UserAliasLogic = Depends(user_alias_logic_dependency),
+    # trigrams need at least three characters to narrow the index scan
+    query: str = Query(..., min_length=3, max_length=64),
+    limit: int = Query(10, ge=1),
+    fast_list_responses: bool = Depends(get_fast_list_responses),
 ):
 
     _ = auth_info
-    return await user_alias_logic.read(user_alias=user_alias, user_email=user_email, limit=limit, offset=offset)
+    user_aliases = await user_alias_logic.search(query=query, limit=limit)
+    if fast_list_responses:
+        return user_alias_search_responses.response(user_aliases)
+    return user_aliases
 
 
 @router.put("", response_model=UpdateResponse)
 async def update(
-    auth_info: str = Security(
+    auth_info: Principal = Security(
         authorize_user,
         scopes=[],
     ),
@@ -57,14 +86,14 @@ async def update(
     user_alias: UserAliasBase = Body(..., title="update user_alias"),
 ):
 
-    user_email = auth_info
+    user_email = auth_info.email
     updated = await user_alias_logic.update(user_alias=user_alias, user_email=user_email)
     return UpdateResponse(updated=updated)
 
 
 @router.delete("/{user_alias_id}", response_model=DeleteResponse)
 async def delete(
-    auth_info: str = Security(
+    auth_info: Principal = Security(
         authorize_user,
         scopes=[f"{CRUDOperation.DELETE.value}:{ResourceType.USER_ALIAS.value}"],
     ),
@@ -2,22 +2,28 @@
 from typing import Sequence, Optional
 
 # third party imports
-from fastapi import APIRouter, Path, Query, Body, Depends, Security
+from fastapi import APIRouter, Path, Query, Body, Depends, Response, Security
 
 # module imports
-from app.api.dependencies import user_image_logic_dependency, authorize_user
+from app.admission import Priority
+from app.api.dependencies import user_image_logic_dependency, authorize_user, db_priority, get_fast_list_responses
+from app.api.responses import ListSerializer
 from app.logic.authorization import CRUDOperation, ResourceType
 from app.logic.user_image import UserImageLogic
+from app.models.authorization import Principal
 from app.models.response import AddResponse, UpdateResponse, DeleteResponse
 from app.models.user_image import UserImage, UserImageBase, UserRankings
 
 
 router = APIRouter()
 
+user_image_responses = ListSerializer(Optional[UserImage])
+user_rankings_responses = ListSerializer(Optional[UserRankings])
+
 
 @router.post("", response_model=AddResponse)
 async def create(
-    auth_info: str = Security(
+    auth_info: Principal = Security(
         authorize_user,
         scopes=[f"{CRUDOperation.CREATE.value}:{ResourceType.USER_IMAGE.value}"],
     ),
@@ -25,39 +31,51 @@ async def create(
     user_image: UserImageBase = Body(..., title="create user_image"),
 ):
 
-    user_email = auth_info
+    user_email = auth_info.email
     added = await user_image_logic.create(user_image=user_image, user_email=user_email)
     return AddResponse(added=added)
 
 
 @router.get("", response_model=Sequence[Optional[UserImage]])
 async def read(
-    auth_info: str = Security(
+    response: Response,
+    auth_info: Principal = Security(
         authorize_user,
         scopes=[],
     ),
     user_image_logic: UserImageLogic = Depends(user_image_logic_dependency),
     limit: int = Query(50, ge=50),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, title="X-Next-Cursor header of the previous page, replaces offset"),
+    fast_list_responses: bool = Depends(get_fast_list_responses),
 ):
 
     _ = auth_info
-    return await user_image_logic.read(limit=limit, offset=offset)
+    user_images, next_cursor = await user_image_logic.read(limit=limit, offset=offset, cursor=cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if fast_list_responses:
+        return user_image_responses.response(user_images, headers=response.headers)
+    return user_images
 
 
-@router.get("/rankings", response_model=Sequence[Optional[UserRankings]])
+@router.get("/rankings", response_model=Sequence[Optional[UserRankings]], dependencies=[Depends(db_priority(Priority.LOW))])
 async def read_rankings(
     user_image_logic: UserImageLogic = Depends(user_image_logic_dependency),
     limit: int = Query(10, ge=10),
     offset: int = Query(0, ge=0),
+    fast_list_responses: bool = Depends(get_fast_list_responses),
 ):
 
-    return await user_image_logic.read_rankings(limit=limit, offset=offset)
+    user_rankings = await user_image_logic.read_rankings(limit=limit, offset=offset)
+    if fast_list_responses:
+        return user_rankings_responses.response(user_rankings)
+    return user_rankings
 
 
 @router.put("/{user_image_id}", response_model=UpdateResponse)
 async def update(
-    auth_info: str = Security(
+    auth_info: Principal = Security(
         authorize_user,
         scopes=[f"{CRUDOperation.UPDATE.value}:{ResourceType.USER_IMAGE.value}"],
     ),
@@ -66,14 +84,14 @@ async def update(
     user_image: UserImageBase = Body(..., title="update user_image"),
 ):
 
-    user_email = auth_info
+    user_email = auth_info.email
     updated = await user_image_logic.update(user_image_id=user_image_id, user_image=user_image, user_email=user_email)
     return UpdateResponse(updated=updated)
 
 
 @router.delete("/{user_image_id}", response_model=DeleteResponse)
 async def delete(
-    auth_info: str = Security(
+    auth_info: Principal = Security(
         authorize_user,
         scopes=[f"{CRUDOperation.DELETE.value}:{ResourceType.USER_IMAGE.value}"],
     ),
@@ -0,0 +1,145 @@
+# standard lib imports
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+
+class LRUCache:
+    def __init__(self, max_entries: int, max_bytes: Optional[int] = None) -> None:
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, Tuple[Any, float, int]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at, _ = entry
+        if expires_at <= time.time():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, expires_at: float, size: int = 1) -> None:
+        self._remove(key)
+        if self._max_bytes is not None and size > self._max_bytes:
+            return
+        self._entries[key] = (value, expires_at, size)
+        self._bytes += size
+        while len(self._entries) > self._max_entries or (self._max_bytes is not None and self._bytes > self._max_bytes):
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        self._remove(key)
+
+    def values(self) -> Iterator[Any]:
+        now = time.time()
+        return (value for value, expires_at, _ in self._entries.values() if expires_at > now)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+
+class CoalescingCache:
+    def __init__(self, ttl: float, max_entries: int, stale_after: float = 0) -> None:
+        self._ttl = ttl
+        self._stale_after = stale_after
+        self._entries = LRUCache(max_entries=max_entries)
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._generation = 0
+        self._stale_since: Optional[float] = None
+        self.coalesced = 0
+        self.invalidations = 0
+        self.stale_marks = 0
+
+    async def get_or_load(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        if self._stale_since is not None and time.time() - self._stale_since >= self._stale_after:
+            self.invalidate()
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry[0]
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, load, self._generation))
+            task.add_done_callback(self._retrieve_exception)
+            self._in_flight[key] = task
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+        self._in_flight.clear()
+        self._stale_since = None
+        self.invalidations += 1
+
+    def mark_stale(self) -> None:
+        if self._stale_since is None:
+            self._stale_since = time.time()
+        self.stale_marks += 1
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        stats = self._entries.stats()
+        return {
+            "entries": stats["entries"],
+            "hits": stats["hits"],
+            "misses": stats["misses"],
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            "stale_marks": self.stale_marks,
+            "hit_ratio": stats["hit_ratio"],
+            "ttl": self._ttl,
+            "stale_after": self._stale_after,
+            "max_age": max((now - loaded_at for _, loaded_at in self._entries.values()), default=0.0),
+        }
+
+    async def _load(self, key: Hashable, load: Callable[[], Awaitable[Any]], generation: int) -> Any:
+        try:
+            value = await load()
+        finally:
+            if self._in_flight.get(key) is asyncio.current_task():
+                del self._in_flight[key]
+        # a load that raced an invalidation still answers its waiters but is not cached
+        if generation == self._generation:
+            now = time.time()
+            self._entries.set(key, (value, now), expires_at=now + self._ttl)
+        return value
+
+    @staticmethod
+    def _retrieve_exception(task: asyncio.Task) -> None:
+        # every waiter may have gone away before a load failed; marking the exception retrieved keeps the loop quiet
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,36 @@
+"""Recounts the rankings table from user_image, for the initial backfill or after out-of-band data fixes.
+
+Usage: python -m app.commands.rebuild_rankings [--user-email EMAIL ...]
+"""
+
+# standard lib imports
+import argparse
+import asyncio
+import sys
+from typing import Optional, Sequence
+
+# third party imports
+from databases import Database
+
+# module imports
+from app.config import get_settings
+from app.data.rankings import RankingsData
+
+
+async def rebuild_rankings(user_emails: Optional[Sequence[str]]) -> int:
+    config = get_settings()
+    db = Database(url=config.DATABASE_URL, min_size=1, max_size=1)
+    await db.connect()
+    try:
+        rebuilt = await RankingsData(db=db).rebuild(user_emails=user_emails)
+    finally:
+        await db.disconnect()
+    print(f"{rebuilt} rankings rebuilt")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recount the rankings table from user_image")
+    parser.add_argument("--user-email", action="append", dest="user_emails", help="only rebuild this user, may be repeated")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(rebuild_rankings(user_emails=args.user_emails)))
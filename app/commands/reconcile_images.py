@@ -0,0 +1,58 @@
+"""Reports drift between the image table and the images folder of the storage bucket.
+
+Usage: python -m app.commands.reconcile_images [--page-size N]
+Exits with status 1 when the catalog and the bucket disagree.
+"""
+
+# standard lib imports
+import argparse
+import asyncio
+import sys
+
+# third party imports
+from databases import Database
+
+# module imports
+from app.cache import LRUCache
+from app.config import get_settings
+from app.data.image import ImageData
+from app.data.image_sampler import ImageSampler
+from app.data.storage import create_storage_backend
+
+
+async def reconcile_images(page_size: int) -> int:
+    config = get_settings()
+    db = Database(url=config.DATABASE_URL, min_size=1, max_size=1)
+    storage = create_storage_backend(config=config)
+    await db.connect()
+    try:
+        image_data = ImageData(
+            db=db,
+            storage=storage,
+            signed_url_cache=LRUCache(max_entries=1),
+            image_sampler=ImageSampler(refresh_interval=config.IMAGE_CATALOG_REFRESH_INTERVAL),
+            supabase_url_timeout=config.SUPABASE_URL_TIMEOUT,
+            signed_url_min_ttl_fraction=config.SIGNED_URL_MIN_TTL_FRACTION,
+            upload_chunk_size=config.UPLOAD_CHUNK_SIZE,
+        )
+        catalog_file_names = await image_data.read_file_names()
+        storage_file_names = await image_data.read_s3(page_size=page_size)
+    finally:
+        await db.disconnect()
+        await storage.close()
+
+    missing_from_storage = sorted(catalog_file_names - storage_file_names)
+    missing_from_catalog = sorted(storage_file_names - catalog_file_names)
+    print(f"{len(catalog_file_names)} images in catalog, {len(storage_file_names)} images in storage")
+    for file_name in missing_from_storage:
+        print(f"missing from storage: {file_name}")
+    for file_name in missing_from_catalog:
+        print(f"missing from catalog: {file_name}")
+    return 1 if missing_from_storage or missing_from_catalog else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diff the image table against the storage bucket")
+    parser.add_argument("--page-size", type=int, default=1000, help="storage list page size")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(reconcile_images(page_size=args.page_size)))
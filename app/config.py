@@ -1,6 +1,7 @@
 # standard lib imports
 import os
 from enum import Enum
+from typing import Optional
 
 # third party imports
 from pydantic_settings import BaseSettings
@@ -23,13 +24,36 @@ class Settings(BaseSettings):
     API_TITLE: str = f"jujugigi-api-v{API_MAJOR_VERSION}"
     CLIENT_DOMAIN: str = os.environ.get("DEV_DOMAIN")
 
-    # DB connection pool settings
+    # DB connection pool settings, MAX_DB_POOL_SIZE is the connection budget of the process across both pools
     MIN_DB_POOL_SIZE: int = 1
     MAX_DB_POOL_SIZE: int = 1
+    # Prepared statements cached per connection by asyncpg, 0 behind a transaction-mode pooler that switches server sessions
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # Separate asyncpg pool that serves the hot reads and writes without the databases/SQLAlchemy layer, its
+    # MAX_DIRECT_DB_POOL_SIZE connections come out of MAX_DB_POOL_SIZE and must leave at least one for the databases pool
+    DIRECT_DB_POOL_ENABLED: bool = False
+    MIN_DIRECT_DB_POOL_SIZE: int = 1
+    MAX_DIRECT_DB_POOL_SIZE: int = 1
+
+    # DB admission control on pooled connection acquires, per pool, acquires queued past the depth or wait get a 503
+    # with Retry-After (wait in seconds). The direct pool admits up to its own size.
+    DB_ADMISSION_MAX_CONCURRENCY: Optional[int] = None  # defaults to the databases pool size
+    DB_ADMISSION_MAX_QUEUE_DEPTH: int = 64
+    DB_ADMISSION_MAX_WAIT: float = 2.0
+    DB_ADMISSION_RETRY_AFTER: int = 1
 
     # CORS config settings
     ALLOW_ORIGIN_REGEX: str = r".*"
 
+    # Seconds before the in-process image catalog used for sampling is reloaded from the database
+    IMAGE_CATALOG_REFRESH_INTERVAL: int = 300
+
+    # Alias search returns at most this many matches per request
+    USER_ALIAS_SEARCH_MAX_RESULTS: int = 20
+
+    # List endpoints serialize their models straight to JSON bytes instead of revalidating them through FastAPI
+    FAST_LIST_RESPONSES: bool = False
+
     # Gacha Price in cents
     GACHA_PRICE: int = os.environ.get("GACHA_PRICE")
 
@@ -42,11 +66,51 @@ class Settings(BaseSettings):
     AUTH0_ISSUER: str = os.environ.get("AUTH0_ISSUER")
     AUTH0_TENANT: str = os.environ.get("AUTH0_TENANT")
 
+    # Auth0 JWKS key store settings in seconds
+    JWKS_REFRESH_INTERVAL: int = 3600
+    JWKS_MIN_REFETCH_INTERVAL: int = 30
+    JWKS_FETCH_TIMEOUT: int = 5
+
+    # Verified token cache settings
+    TOKEN_CACHE_MAX_ENTRIES: int = 4096
+    TOKEN_CACHE_MAX_BYTES: int = 4 * 1024 * 1024
+
     # Supabase storage
     SUPABASE_URL: str = os.environ.get("SUPABASE_URL")
     SUPABASE_BUCKET: str = os.environ.get("SUPABASE_BUCKET")
     SUPABASE_SERVICE_KEY: str = os.environ.get("SUPABASE_SERVICE_KEY")
     SUPABASE_URL_TIMEOUT: int = os.environ.get("SUPABASE_URL_TIMEOUT")
+    # Signed urls are minted locally when set, otherwise requested from the storage API
+    SUPABASE_JWT_SECRET: Optional[str] = os.environ.get("SUPABASE_JWT_SECRET")
+
+    # Signed url cache settings, urls are reissued once less than the fraction of SUPABASE_URL_TIMEOUT remains
+    SIGNED_URL_CACHE_MAX_ENTRIES: int = 10000
+    SIGNED_URL_CACHE_MAX_BYTES: int = 8 * 1024 * 1024
+    SIGNED_URL_MIN_TTL_FRACTION: float = 0.5
+
+    # Leaderboard page cache, pages are served from memory for up to RANKINGS_CACHE_TTL seconds. Image opens show up
+    # within RANKINGS_CACHE_OPEN_STALENESS seconds, all opens in that window drop the cached pages once
+    RANKINGS_CACHE_TTL: float = 5
+    RANKINGS_CACHE_OPEN_STALENESS: float = 1
+    RANKINGS_CACHE_MAX_ENTRIES: int = 256
+
+    # Alias row cache, rows written by other processes are picked up within USER_ALIAS_CACHE_TTL seconds
+    USER_ALIAS_CACHE_MAX_ENTRIES: int = 20000
+    USER_ALIAS_CACHE_TTL: int = 300
+
+    # Storage backend settings ("supabase" or "local"), timeouts in seconds
+    STORAGE_BACKEND: str = os.environ.get("STORAGE_BACKEND") or "supabase"
+    LOCAL_STORAGE_PATH: str = os.environ.get("LOCAL_STORAGE_PATH") or ".storage"
+    STORAGE_TIMEOUT: int = 20
+    STORAGE_CONNECT_TIMEOUT: int = 5
+    STORAGE_MAX_CONNECTIONS: int = 10
+    STORAGE_MAX_KEEPALIVE_CONNECTIONS: int = 5
+
+    # Upload streaming settings in bytes
+    UPLOAD_CHUNK_SIZE: int = 256 * 1024
+    MAX_UPLOAD_FILE_BYTES: int = 10 * 1024 * 1024
+    MAX_UPLOAD_REQUEST_BYTES: int = 200 * 1024 * 1024
+    BULK_UPLOAD_CONCURRENCY: int = 4
 
     # Stripe - DEV
     STRIPE_SECRET_KEY: str = os.environ.get("DEV_STRIPE_SECRET_KEY")
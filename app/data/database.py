@@ -0,0 +1,54 @@
+# standard lib imports
+import time
+from typing import Any
+
+# third party imports
+from databases import Database
+from databases.interfaces import ConnectionBackend, DatabaseBackend
+
+# module imports
+from app.admission import DB_PRIORITY, AdmissionController
+
+
+class AdmittedConnection:
+    def __init__(self, connection: ConnectionBackend, admission: AdmissionController) -> None:
+        self._connection = connection
+        self._admission = admission
+
+    async def acquire(self) -> None:
+        started_at = time.monotonic()
+        await self._admission.acquire(DB_PRIORITY.get())
+        try:
+            await self._connection.acquire()
+        except BaseException:
+            self._admission.release()
+            raise
+        self._admission.record_wait(time.monotonic() - started_at)
+
+    async def release(self) -> None:
+        try:
+            await self._connection.release()
+        finally:
+            self._admission.release()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._connection, name)
+
+
+class AdmittedBackend:
+    def __init__(self, backend: DatabaseBackend, admission: AdmissionController) -> None:
+        self._backend = backend
+        self._admission = admission
+
+    def connection(self) -> AdmittedConnection:
+        return AdmittedConnection(connection=self._backend.connection(), admission=self._admission)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._backend, name)
+
+
+class AdmittedDatabase(Database):
+    def __init__(self, url: str, admission: AdmissionController, **options: Any) -> None:
+        super().__init__(url, **options)
+        self._backend = AdmittedBackend(backend=self._backend, admission=admission)
+        self.admission = admission
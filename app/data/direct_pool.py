@@ -0,0 +1,91 @@
+# standard lib imports
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, List, Mapping, Optional, Union
+
+# third party imports
+import asyncpg
+from databases import DatabaseURL
+
+# module imports
+from app.admission import DB_PRIORITY, AdmissionController
+from app.data.statements import statement_for
+
+
+class DirectQueries:
+    def __init__(self, executor: Union[asyncpg.Pool, asyncpg.Connection, None]) -> None:
+        self._executor = executor
+
+    @asynccontextmanager
+    async def _acquire(self) -> AsyncIterator[Union[asyncpg.Pool, asyncpg.Connection]]:
+        yield self._executor
+
+    async def fetch_all(self, query: str, values: Optional[Mapping[str, Any]] = None) -> List[asyncpg.Record]:
+        statement = statement_for(query)
+        async with self._acquire() as executor:
+            return await executor.fetch(statement.positional_sql, *statement.args(values or {}))
+
+    async def fetch_one(self, query: str, values: Optional[Mapping[str, Any]] = None) -> Optional[asyncpg.Record]:
+        statement = statement_for(query)
+        async with self._acquire() as executor:
+            return await executor.fetchrow(statement.positional_sql, *statement.args(values or {}))
+
+    async def fetch_val(self, query: str, values: Optional[Mapping[str, Any]] = None, column: Union[int, str] = 0) -> Any:
+        statement = statement_for(query)
+        async with self._acquire() as executor:
+            if isinstance(column, int):
+                return await executor.fetchval(statement.positional_sql, *statement.args(values or {}), column=column)
+            record = await executor.fetchrow(statement.positional_sql, *statement.args(values or {}))
+        return record[column] if record is not None else None
+
+    async def execute(self, query: str, values: Optional[Mapping[str, Any]] = None) -> str:
+        statement = statement_for(query)
+        async with self._acquire() as executor:
+            return await executor.execute(statement.positional_sql, *statement.args(values or {}))
+
+
+class DirectPool(DirectQueries):
+    def __init__(self, url: str, admission: AdmissionController, min_size: int, max_size: int, statement_cache_size: int) -> None:
+        super().__init__(executor=None)
+        self.admission = admission
+        self._url = DatabaseURL(url)
+        self._min_size = min_size
+        self._max_size = max_size
+        self._statement_cache_size = statement_cache_size
+
+    async def connect(self) -> None:
+        # same url handling as the databases postgres backend, so both pools reach the same server the same way
+        ssl = self._url.options.get("ssl")
+        if ssl is not None:
+            ssl = {"true": True, "false": False}.get(ssl.lower(), ssl.lower())
+        self._executor = await asyncpg.create_pool(
+            host=self._url.hostname,
+            port=self._url.port,
+            user=self._url.username,
+            password=self._url.password,
+            database=self._url.database,
+            min_size=self._min_size,
+            max_size=self._max_size,
+            statement_cache_size=self._statement_cache_size,
+            ssl=ssl,
+        )
+
+    async def disconnect(self) -> None:
+        await self._executor.close()
+
+    @asynccontextmanager
+    async def _acquire(self) -> AsyncIterator[asyncpg.Connection]:
+        started_at = time.monotonic()
+        await self.admission.acquire(DB_PRIORITY.get())
+        try:
+            async with self._executor.acquire() as connection:
+                self.admission.record_wait(time.monotonic() - started_at)
+                yield connection
+        finally:
+            self.admission.release()
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[DirectQueries]:
+        async with self._acquire() as connection:
+            async with connection.transaction():
+                yield DirectQueries(executor=connection)
@@ -1,54 +1,62 @@
 # standard lib imports
-from typing import Any, Optional, Sequence
+import time
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
 
 # third party imports
 from databases import Database
 from fastapi import UploadFile
-from supabase import Client, StorageException
 from asyncpg.exceptions import UniqueViolationError
 
 # module imports
-from app.exceptions import BaseError
-from app.models.image import ImageCreate, ImageResponse, ImageUpdate
-from app.utils import build_insert_statement, build_update_statement
+from app.cache import LRUCache
+from app.data.direct_pool import DirectPool, DirectQueries
+from app.data.image_sampler import ImageSampler
+from app.data.records import RecordDecoder
+from app.data.statements import BULK_UPSERT_IMAGES, CREATE_IMAGE, DELETE_IMAGE, GRANT_IMAGES, MOVE_RANKINGS_FOR_RARITY_CHANGES, UPSERT_IMAGE
+from app.data.storage import StorageBackend, UploadBudget, UploadStream, hash_upload
+from app.exceptions import BaseError, PayloadTooLargeError, StorageError
+from app.models.image import ImageBase, ImageCreate, ImageResponse, ImageUpdate
+from app.utils import decode_cursor, encode_cursor
+
+IMAGE_RESPONSE_DECODER = RecordDecoder(ImageResponse)
 
 
 class ImageData:
-    def __init__(self, db: Database, supabase_client: Client, supabase_bucket: str, supabase_url_timeout: int) -> None:
+    def __init__(
+        self,
+        db: Database,
+        storage: StorageBackend,
+        signed_url_cache: LRUCache,
+        image_sampler: ImageSampler,
+        supabase_url_timeout: int,
+        signed_url_min_ttl_fraction: float,
+        upload_chunk_size: int,
+        direct_db: Optional[DirectPool] = None,
+    ) -> None:
         self._db = db
-        self._supabase_client = supabase_client
-        self._supabase_bucket = supabase_bucket
+        self._direct_db = direct_db
+        # the hot paths run on the direct asyncpg pool when one is configured
+        self._hot_db: Union[Database, DirectQueries] = direct_db if direct_db is not None else db
+        self._storage = storage
+        self._signed_url_cache = signed_url_cache
+        self._image_sampler = image_sampler
         self._supabase_url_timeout = supabase_url_timeout
+        self._signed_url_min_ttl_fraction = signed_url_min_ttl_fraction
+        self._upload_chunk_size = upload_chunk_size
 
-    async def create(self, image: ImageCreate, image_file: UploadFile) -> int:
-        mapped_dict = image.model_dump()
-        fields_statement, values_statement = build_insert_statement(image.model_dump())
+    async def create(self, image: ImageCreate, image_file: UploadFile, upload_budget: UploadBudget) -> int:
+        content_hash, byte_size = await self.upload_file(image_file=image_file, upload_budget=upload_budget, replace=False)
+        mapped_dict = image.model_copy(update={"content_hash": content_hash, "byte_size": byte_size}).model_dump()
 
+        created = 0
         try:
-            created = await self._db.fetch_val(
-                query=f"""
-                    WITH create_image AS (
-                        INSERT INTO image({fields_statement})
-                        VALUES({values_statement}) RETURNING *
-                    ) SELECT COUNT(*) as created 
-                    FROM create_image;
-                """,
-                values=mapped_dict,
-                column="created",
-            )
+            created = await self._db.fetch_val(query=CREATE_IMAGE.sql, values=CREATE_IMAGE.bind(mapped_dict)) or 0
         except UniqueViolationError:
             pass
         except Exception as e:
             raise BaseError({"code": "create:image", "description": e}) from e
-
-        try:
-            self._supabase_client.storage.from_(self._supabase_bucket).upload(
-                path=f"images/{image_file.filename}", file=image_file.file.read(), file_options={"content-type": image_file.content_type}
-            )
-        except StorageException as e:
-            raise BaseError({"code": "create:supabase", "description": e}) from e
-        except Exception as e:
-            raise BaseError({"code": "create:image", "description": e}) from e
+        if created:
+            self._image_sampler.invalidate()
         return created
 
     async def read(
@@ -60,7 +68,8 @@ class ImageData:
         opened: Optional[bool] = None,
         limit: int = 50,
         offset: int = 0,
-    ) -> Sequence[Optional[ImageResponse]]:
+        cursor: Optional[str] = None,
+    ) -> Tuple[Sequence[Optional[ImageResponse]], Optional[str]]:
 
         filter_statement = "JOIN user_image ui ON i.image_id = ui.image_id "
         values = {"limit": limit, "offset": offset}
@@ -86,91 +95,240 @@ class ImageData:
         elif user_alias:
             filter_statement += """
                 JOIN user_alias ua ON ui.user_email = ua.user_email 
-                WHERE ua.user_alias ILIKE :user_alias
+                WHERE ua.user_alias_normalized = lower(:user_alias)
             """
             values["user_alias"] = user_alias
 
+        conditions = []
         if opened is not None:
-            filter_statement += " AND ui.opened = :opened"
+            conditions.append("ui.opened = :opened")
             values["opened"] = opened
 
-        records = await self._db.fetch_all(
+        # a cursor seeks past its key on the composite user_image index instead of skipping `offset` rows
+        if cursor:
+            conditions.append("(ui.created_on, ui.user_image_id) < (CAST(:cursor_created_on AS timestamptz), CAST(:cursor_user_image_id AS int))")
+            values["cursor_created_on"], values["cursor_user_image_id"] = decode_cursor(cursor=cursor)
+            values["offset"] = 0
+
+        if conditions:
+            filter_statement += (" AND " if "WHERE" in filter_statement else " WHERE ") + " AND ".join(conditions)
+
+        records = await self._hot_db.fetch_all(
             query=f"""
-                SELECT i.path, i.file_name, i.description, i.rarity
+                SELECT i.path, i.file_name, i.description, i.rarity, ui.created_on, ui.user_image_id
                 FROM image i
                 {filter_statement}
-                ORDER BY ui.created_on DESC
+                ORDER BY ui.created_on DESC, ui.user_image_id DESC
                 LIMIT :limit OFFSET :offset
             """,
             values=values,
         )
         image_response = []
         if records:
-            paths = [f"{record.path}/{record.file_name}" for record in records]
-            image_details = self._supabase_client.storage.from_(self._supabase_bucket).create_signed_urls(paths=paths, expires_in=self._supabase_url_timeout)
-            for i, record in enumerate(records):
-                image_response.append(ImageResponse(**dict(record), signedURL=image_details[i].get("signedURL")))
-        return image_response
-
-    async def read_s3(self) -> Sequence[Optional[Any]]:
-        images = self._supabase_client.storage.from_(self._supabase_bucket).list("images")
-        return [image["name"] for image in images]
-
-    async def upsert(self, image: ImageUpdate, image_file: UploadFile) -> int:
-        mapped_dict = image.model_dump()
-        fields_statement, values_statement = build_insert_statement(mapped_dict=mapped_dict)
-        update_statement = build_update_statement(mapped_dict=mapped_dict)
+            paths = [f"{record['path']}/{record['file_name']}" for record in records]
+            signed_urls = await self.read_signed_urls(paths=paths)
+            image_response = IMAGE_RESPONSE_DECODER.decode(records, signedURL=[signed_urls.get(path) for path in paths])
+        next_cursor = None
+        if len(records) == limit:
+            next_cursor = encode_cursor(created_on=records[-1]["created_on"], row_id=records[-1]["user_image_id"])
+        return image_response, next_cursor
+
+    async def read_signed_urls(self, paths: Sequence[str]) -> Dict[str, Optional[str]]:
+        signed_urls = {}
+        missing_paths: List[str] = []
+        for path in dict.fromkeys(paths):
+            signed_url = self._signed_url_cache.get(path)
+            if signed_url is None:
+                missing_paths.append(path)
+            else:
+                signed_urls[path] = signed_url
+
+        if missing_paths:
+            # cached urls expire from the cache while they still have the minimum fraction of their lifetime left
+            expires_at = time.time() + self._supabase_url_timeout * (1 - self._signed_url_min_ttl_fraction)
+            created_urls = await self._storage.create_signed_urls(paths=missing_paths, expires_in=self._supabase_url_timeout)
+            for path, signed_url in zip(missing_paths, created_urls):
+                signed_urls[path] = signed_url
+                if signed_url:
+                    self._signed_url_cache.set(path, signed_url, expires_at=expires_at, size=len(signed_url))
+        return signed_urls
+
+    async def read_s3(self, page_size: int = 1000) -> Set[str]:
+        # storage lists are paginated, so keep paging until a short page comes back
+        file_names: Set[str] = set()
+        offset = 0
+        while True:
+            images = await self._storage.list(prefix="images", limit=page_size, offset=offset)
+            file_names.update(image["name"] for image in images if not image["name"].startswith("."))
+            if len(images) < page_size:
+                return file_names
+            offset += page_size
+
+    async def read_file_names(self) -> Set[str]:
+        records = await self._db.fetch_all(query="SELECT file_name FROM image")
+        return {record["file_name"] for record in records}
+
+    async def upsert(self, image: ImageUpdate, image_file: UploadFile, upload_budget: UploadBudget) -> int:
+        content_hash, byte_size = await self.upload_file(image_file=image_file, upload_budget=upload_budget, replace=True)
+        mapped_dict = image.model_copy(update={"content_hash": content_hash, "byte_size": byte_size}).model_dump()
         try:
-            upserted = await self._db.fetch_val(
-                query=f"""
-            WITH upsert_image as (
-                INSERT INTO image ({fields_statement})
-                    VALUES ({values_statement})
-                    ON CONFLICT (file_name)
-                DO UPDATE SET {update_statement}
-                    RETURNING *
-                ) SELECT COUNT(*) as upserted 
-                FROM upsert_image            
-            """,
-                values=mapped_dict,
-                column="upserted",
-            )
+            async with self._db.transaction():
+                previous_rarities = await self.read_rarities(file_names=[image.file_name])
+                upserted = await self._db.fetch_val(query=UPSERT_IMAGE.sql, values=UPSERT_IMAGE.bind(mapped_dict)) or 0
+                await self.move_rankings_for_rarity_changes(previous_rarities=previous_rarities, images=[image])
         except Exception as e:
             raise BaseError({"code": "update:image", "description": e}) from e
+        if upserted:
+            self._image_sampler.invalidate()
+        return upserted
 
+    async def hash_file(self, image_file: UploadFile) -> Tuple[str, int]:
+        return await hash_upload(upload_file=image_file, chunk_size=self._upload_chunk_size)
+
+    async def read_manifest(self, file_names: Sequence[str]) -> Dict[str, Optional[str]]:
+        records = await self._db.fetch_all(
+            query="SELECT file_name, content_hash FROM image WHERE file_name = ANY(:file_names)",
+            values={"file_names": list(file_names)},
+        )
+        return {record["file_name"]: record["content_hash"] for record in records}
+
+    async def upload_file(self, image_file: UploadFile, upload_budget: UploadBudget, replace: bool) -> Tuple[str, int]:
+        operation = "update" if replace else "create"
+        upload = self._storage.update if replace else self._storage.upload
         try:
-            self._supabase_client.storage.from_(self._supabase_bucket).update(
-                path=f"images/{image_file.filename}", file=image_file.file.read(), file_options={"content-type": image_file.content_type, "upsert": "true"}
+            upload_stream = UploadStream(upload_file=image_file, chunk_size=self._upload_chunk_size, budget=upload_budget)
+            await upload(
+                path=f"images/{image_file.filename}", stream=upload_stream, content_type=image_file.content_type, content_length=upload_stream.content_length
             )
-        except StorageException as e:
-            raise BaseError({"code": "update:supabase", "description": e}) from e
+            return upload_stream.content_hash, upload_stream.byte_size
+        except PayloadTooLargeError:
+            raise
+        except StorageError as e:
+            raise BaseError({"code": f"{operation}:supabase", "description": e}) from e
         except Exception as e:
-            raise BaseError({"code": "update:image", "description": e}) from e
-        return upserted
+            raise BaseError({"code": f"{operation}:image", "description": e}) from e
 
-    async def delete(self, image_id: int) -> int:
-        return await self._db.fetch_val(
-            query="""
-                WITH delete_image as (
-                    DELETE FROM image
-                    WHERE image_id = :image_id RETURNING *
-                ) SELECT count(*) as deleted 
-                FROM delete_image;
-            """,
-            values={"image_id": image_id},
-            column="deleted",
-        )
+    async def delete_files(self, file_names: Sequence[str]) -> None:
+        try:
+            await self._storage.delete(paths=[f"images/{file_name}" for file_name in file_names])
+        except StorageError as e:
+            raise BaseError({"code": "delete:supabase", "description": e}) from e
 
-    async def read_random_unowned_images(self, user_email: str, quantity: 2) -> Sequence[Optional[int]]:
+    async def bulk_upsert(self, images: Sequence[ImageCreate]) -> Dict[str, bool]:
+        if not images:
+            return {}
+        try:
+            async with self._db.transaction():
+                previous_rarities = await self.read_rarities(file_names=[image.file_name for image in images])
+                records = await self._db.fetch_all(
+                    query=BULK_UPSERT_IMAGES.sql,
+                    values={
+                        "paths": [image.path for image in images],
+                        "file_names": [image.file_name for image in images],
+                        "descriptions": [image.description for image in images],
+                        "rarities": [image.rarity for image in images],
+                        "content_hashes": [image.content_hash for image in images],
+                        "byte_sizes": [image.byte_size for image in images],
+                        "created_bys": [image.created_by for image in images],
+                        "updated_bys": [image.updated_by for image in images],
+                    },
+                )
+                updated_file_names = {record["file_name"] for record in records if not record["created"]}
+                await self.move_rankings_for_rarity_changes(
+                    previous_rarities=previous_rarities, images=[image for image in images if image.file_name in updated_file_names]
+                )
+        except Exception as e:
+            raise BaseError({"code": "upsert:image", "description": e}) from e
+        if records:
+            self._image_sampler.invalidate()
+        # xmax is only zero on freshly inserted rows, so it tells creates from conflict updates;
+        # rows whose content hash already matched are left untouched and not returned
+        return {record["file_name"]: record["created"] for record in records}
+
+    async def read_rarities(self, file_names: Sequence[str]) -> Dict[str, int]:
+        # the row locks hold the rarities until the caller's transaction commits its update and the rankings move
         records = await self._db.fetch_all(
-            query="""
-                SELECT i.image_id, -LOG(RANDOM())/i.rarity as priority 
-                FROM image i WHERE i.image_id NOT IN (
-                    SELECT image_id FROM user_image ui WHERE ui.user_email = :user_email
-                ) ORDER BY priority DESC LIMIT :limit;
-            """,
-            values={"user_email": user_email, "limit": quantity},
+            query="SELECT file_name, rarity FROM image WHERE file_name = ANY(:file_names) FOR UPDATE",
+            values={"file_names": list(file_names)},
+        )
+        return {record["file_name"]: record["rarity"] for record in records}
+
+    async def move_rankings_for_rarity_changes(self, previous_rarities: Dict[str, int], images: Sequence[ImageBase]) -> None:
+        changed_images = [image for image in images if image.file_name in previous_rarities and previous_rarities[image.file_name] != image.rarity]
+        if not changed_images:
+            return
+        await self._db.fetch_val(
+            query=MOVE_RANKINGS_FOR_RARITY_CHANGES.sql,
+            values={
+                "file_names": [image.file_name for image in changed_images],
+                "previous_rarities": [previous_rarities[image.file_name] for image in changed_images],
+                "rarities": [image.rarity for image in changed_images],
+            },
         )
-        if len(records) == quantity:
-            return [record["image_id"] for record in records]
+
+    async def delete(self, image_id: int) -> int:
+        deleted = await self._db.fetch_val(query=DELETE_IMAGE.sql, values={"image_id": image_id}) or 0
+        if deleted:
+            self._image_sampler.invalidate()
+        return deleted
+
+    async def read_random_unowned_images(self, user_email: str, quantity: 2) -> Sequence[Optional[int]]:
+        await self.refresh_image_sampler()
+        owned_image_ids = await self.read_owned_image_ids(user_email=user_email)
+        image_ids = self._image_sampler.sample(owned_image_ids=owned_image_ids, quantity=quantity)
+        if len(image_ids) == quantity:
+            return image_ids
         return []
+
+    async def read_random_images(self, quantity: int) -> List[int]:
+        await self.refresh_image_sampler()
+        return self._image_sampler.sample(owned_image_ids=set(), quantity=quantity)
+
+    async def grant_random_unowned_images(self, user_email: str, quantity: int, max_attempts: int = 3) -> List[int]:
+        await self.refresh_image_sampler()
+        if self._direct_db is not None:
+            async with self._direct_db.transaction() as connection:
+                return await self._grant_random_unowned_images(db=connection, user_email=user_email, quantity=quantity, max_attempts=max_attempts)
+        async with self._db.transaction():
+            return await self._grant_random_unowned_images(db=self._db, user_email=user_email, quantity=quantity, max_attempts=max_attempts)
+
+    async def _grant_random_unowned_images(self, db: Union[Database, DirectQueries], user_email: str, quantity: int, max_attempts: int) -> List[int]:
+        granted_image_ids: List[int] = []
+        owned_image_ids = await self._read_owned_image_ids(db=db, user_email=user_email)
+        for _ in range(max_attempts):
+            image_ids = self._image_sampler.sample(owned_image_ids=owned_image_ids, quantity=quantity - len(granted_image_ids))
+            if not image_ids:
+                break
+            # the unique constraint is the only ownership check in the database; conflicting pulls from a
+            # concurrent grant, and images deleted since the catalog loaded, are dropped and resampled
+            records = await db.fetch_all(
+                query=GRANT_IMAGES.sql,
+                values={"user_email": user_email, "image_ids": image_ids},
+            )
+            granted_image_ids.extend(record["image_id"] for record in records)
+            if len(granted_image_ids) == quantity:
+                break
+            if len(records) < len(image_ids):
+                self._image_sampler.invalidate()
+            owned_image_ids.update(image_ids)
+        return granted_image_ids
+
+    async def read_owned_image_ids(self, user_email: str) -> Set[int]:
+        return await self._read_owned_image_ids(db=self._db, user_email=user_email)
+
+    @staticmethod
+    async def _read_owned_image_ids(db: Union[Database, DirectQueries], user_email: str) -> Set[int]:
+        records = await db.fetch_all(
+            query="SELECT image_id FROM user_image WHERE user_email = :user_email",
+            values={"user_email": user_email},
+        )
+        return {record["image_id"] for record in records}
+
+    async def refresh_image_sampler(self) -> None:
+        if not self._image_sampler.is_stale():
+            return
+        async with self._image_sampler.lock:
+            # concurrent callers wait for the one reload instead of each reading the catalog
+            if self._image_sampler.is_stale():
+                records = await self._db.fetch_all(query="SELECT image_id, rarity FROM image")
+                self._image_sampler.load((record["image_id"], record["rarity"]) for record in records)
@@ -0,0 +1,85 @@
+# standard lib imports
+import asyncio
+import heapq
+import math
+import random
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class ImageSampler:
+    def __init__(self, refresh_interval: int) -> None:
+        self._refresh_interval = refresh_interval
+        self._groups: Dict[int, array] = {}
+        self._loaded_at: Optional[float] = None
+        self.lock = asyncio.Lock()
+
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self._refresh_interval
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    def load(self, images: Iterable[Tuple[int, int]]) -> None:
+        groups: Dict[int, List[int]] = {}
+        for image_id, rarity in images:
+            groups.setdefault(rarity, []).append(image_id)
+        self._groups = {rarity: array("q", sorted(image_ids)) for rarity, image_ids in groups.items() if rarity > 0}
+        self._loaded_at = time.monotonic()
+
+    def sample(self, owned_image_ids: Set[int], quantity: int) -> List[int]:
+        unowned_counts = {rarity: len(image_ids) - self._count_owned(image_ids, owned_image_ids) for rarity, image_ids in self._groups.items()}
+        rarity_order = self._draw_rarity_order(unowned_counts=unowned_counts, quantity=quantity)
+
+        picks = {
+            rarity: iter(self._pick_unowned(self._groups[rarity], owned_image_ids, unowned_counts[rarity], rarity_order.count(rarity)))
+            for rarity in set(rarity_order)
+        }
+        return [next(picks[rarity]) for rarity in rarity_order]
+
+    @staticmethod
+    def _count_owned(image_ids: array, owned_image_ids: Set[int]) -> int:
+        count = 0
+        for image_id in owned_image_ids:
+            index = bisect_left(image_ids, image_id)
+            if index < len(image_ids) and image_ids[index] == image_id:
+                count += 1
+        return count
+
+    def _draw_rarity_order(self, unowned_counts: Dict[int, int], quantity: int) -> List[int]:
+        # The largest of m iid Exp(1) keys is -log(1 - t) with t = U^(1/m); given it, the next largest of the
+        # remaining m - 1 keys uses t * U^(1/(m - 1)), and so on. Dividing by the rarity gives -LOG(RANDOM())/rarity.
+        heap: List[Tuple[float, int, int, float]] = []
+        for rarity, unowned_count in unowned_counts.items():
+            if unowned_count > 0:
+                heapq.heappush(heap, self._next_key(rarity=rarity, remaining=unowned_count, bound=1.0))
+
+        rarity_order: List[int] = []
+        for _ in range(quantity):
+            if not heap:
+                break
+            _, rarity, remaining, bound = heapq.heappop(heap)
+            rarity_order.append(rarity)
+            if remaining > 1:
+                heapq.heappush(heap, self._next_key(rarity=rarity, remaining=remaining - 1, bound=bound))
+        return rarity_order
+
+    @staticmethod
+    def _next_key(rarity: int, remaining: int, bound: float) -> Tuple[float, int, int, float]:
+        bound *= random.random() ** (1 / remaining)
+        key = -math.log1p(-bound) / rarity
+        return -key, rarity, remaining, bound
+
+    @staticmethod
+    def _pick_unowned(image_ids: array, owned_image_ids: Set[int], unowned_count: int, picks: int) -> List[int]:
+        # rejection sampling stays cheap while most of the group is unowned, otherwise materialize the unowned ids
+        if unowned_count * 2 < len(image_ids):
+            return random.sample([image_id for image_id in image_ids if image_id not in owned_image_ids], picks)
+        picked: Dict[int, None] = {}
+        while len(picked) < picks:
+            image_id = image_ids[random.randrange(len(image_ids))]
+            if image_id not in owned_image_ids:
+                picked[image_id] = None
+        return list(picked)
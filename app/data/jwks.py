@@ -0,0 +1,82 @@
+# standard lib imports
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+# third party imports
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSKeyStore:
+    def __init__(self, jwks_url: str, refresh_interval: int, min_refetch_interval: int, timeout: int) -> None:
+        self._jwks_url = jwks_url
+        self._refresh_interval = refresh_interval
+        self._min_refetch_interval = min_refetch_interval
+        self._client = httpx.AsyncClient(timeout=timeout)
+        self._keys: Dict[str, Dict[str, str]] = {}
+        self._lock = asyncio.Lock()
+        self._last_fetch_attempt = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        try:
+            await self.refresh()
+        except Exception:
+            logger.exception("Unable to load signing keys from %s", self._jwks_url)
+        self._refresh_task = asyncio.create_task(self._refresh_periodically())
+
+    async def close(self) -> None:
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+        await self._client.aclose()
+
+    async def refresh(self) -> None:
+        async with self._lock:
+            await self._fetch()
+
+    async def get_key(self, kid: str) -> Optional[Dict[str, str]]:
+        key = self._keys.get(kid)
+        if key is None and self._can_refetch():
+            async with self._lock:
+                # another request may have refetched while this one waited on the lock
+                if kid not in self._keys and self._can_refetch():
+                    try:
+                        await self._fetch()
+                    except Exception:
+                        logger.exception("Unable to refetch signing keys from %s", self._jwks_url)
+            key = self._keys.get(kid)
+        return key
+
+    def _can_refetch(self) -> bool:
+        return time.monotonic() - self._last_fetch_attempt >= self._min_refetch_interval
+
+    async def _fetch(self) -> None:
+        self._last_fetch_attempt = time.monotonic()
+        response = await self._client.get(self._jwks_url)
+        response.raise_for_status()
+        jwks = response.json()
+        self._keys = {
+            key["kid"]: {
+                "kty": key["kty"],
+                "kid": key["kid"],
+                "use": key["use"],
+                "n": key["n"],
+                "e": key["e"],
+            }
+            for key in jwks["keys"]
+        }
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self._refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Unable to refresh signing keys from %s", self._jwks_url)
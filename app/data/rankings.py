@@ -0,0 +1,25 @@
+# standard lib imports
+from typing import Optional, Sequence
+
+# third party imports
+from databases import Database
+
+# module imports
+from app.data.statements import REBUILD_RANKINGS, REBUILD_USER_RANKINGS
+
+
+class RankingsData:
+    def __init__(self, db: Database) -> None:
+        self._db = db
+
+    async def rebuild(self, user_emails: Optional[Sequence[str]] = None) -> int:
+        statement = REBUILD_RANKINGS
+        values = {}
+        if user_emails is not None:
+            statement = REBUILD_USER_RANKINGS
+            values["user_emails"] = list(user_emails)
+
+        async with self._db.transaction():
+            # counter updates wait on the lock until the recount commits, so it overwrites none of them
+            await self._db.execute(query="LOCK TABLE rankings IN SHARE ROW EXCLUSIVE MODE")
+            return await self._db.fetch_val(query=statement.sql, values=statement.bind(values), column="rebuilt")
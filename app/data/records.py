@@ -0,0 +1,27 @@
+# standard lib imports
+from typing import Any, Generic, List, Mapping, Sequence, Type, TypeVar
+
+# third party imports
+from pydantic import BaseModel, TypeAdapter
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+# a `databases` Record wraps the asyncpg record, whose column lookups skip its Python-level column maps
+def record_mapping(record: Any) -> Mapping[str, Any]:
+    return getattr(record, "_mapping", record)
+
+
+class RecordDecoder(Generic[ModelT]):
+    def __init__(self, model: Type[ModelT]) -> None:
+        self._adapter = TypeAdapter(List[model])
+
+    def decode(self, records: Sequence[Any], **columns: Sequence[Any]) -> List[ModelT]:
+        rows = [dict(record_mapping(record)) for record in records]
+        for name, values in columns.items():
+            for row, value in zip(rows, values):
+                row[name] = value
+        return self._adapter.validate_python(rows)
+
+    def decode_one(self, record: Any) -> ModelT:
+        return self.decode([record])[0]
@@ -0,0 +1,398 @@
+# standard lib imports
+import re
+from functools import lru_cache
+from typing import Any, Dict, Mapping, Tuple
+
+# the word boundary stops the name from backtracking to a prefix, which would read `:ids::int[]` as `:id` + `s::int[]`
+BIND_PARAM_PATTERN = re.compile(r"(?<![:\w]):(\w+)\b(?!:)")
+# text() misreads `:name::type`, so parameters are cast with CAST(:name AS type)
+CAST_SUFFIX_PATTERN = re.compile(r"(?<![:\w]):\w+::")
+
+
+class Statement:
+    def __init__(self, sql: str) -> None:
+        if CAST_SUFFIX_PATTERN.search(sql):
+            raise ValueError(f"cast bind parameters with CAST(:name AS type), not :name::type: {' '.join(sql.split())}")
+        self.sql = sql
+        names = BIND_PARAM_PATTERN.findall(sql)
+        self.params: Tuple[str, ...] = tuple(dict.fromkeys(names))
+        positions = {name: index for index, name in enumerate(self.params, start=1)}
+        self.positional_sql = BIND_PARAM_PATTERN.sub(lambda match: f"${positions[match.group(1)]}", sql)
+
+    def bind(self, values: Mapping[str, Any]) -> Dict[str, Any]:
+        return {name: values[name] for name in self.params}
+
+    def args(self, values: Mapping[str, Any]) -> Tuple[Any, ...]:
+        return tuple(values[name] for name in self.params)
+
+
+# read filters assemble a handful of shapes, each parsed once
+@lru_cache(maxsize=512)
+def statement_for(sql: str) -> Statement:
+    return Statement(sql)
+
+
+# appended after a `ranking_delta (user_email, rarity, delta)` CTE so the counters change with the rows they count
+APPLY_RANKING_DELTA = """
+    INSERT INTO rankings AS r (user_email, common_count, uncommon_count, rare_count, epic_count, unique_count, total_count)
+    SELECT
+        user_email,
+        SUM(CASE WHEN rarity = 1 THEN delta ELSE 0 END),
+        SUM(CASE WHEN rarity = 2 THEN delta ELSE 0 END),
+        SUM(CASE WHEN rarity = 3 THEN delta ELSE 0 END),
+        SUM(CASE WHEN rarity = 4 THEN delta ELSE 0 END),
+        SUM(CASE WHEN rarity = 5 THEN delta ELSE 0 END),
+        SUM(delta)
+    FROM ranking_delta
+    GROUP BY user_email
+    ON CONFLICT (user_email) DO UPDATE SET
+        common_count = r.common_count + EXCLUDED.common_count,
+        uncommon_count = r.uncommon_count + EXCLUDED.uncommon_count,
+        rare_count = r.rare_count + EXCLUDED.rare_count,
+        epic_count = r.epic_count + EXCLUDED.epic_count,
+        unique_count = r.unique_count + EXCLUDED.unique_count,
+        total_count = r.total_count + EXCLUDED.total_count
+"""
+
+
+# image
+
+CREATE_IMAGE = Statement(
+    """
+    INSERT INTO image (path, file_name, description, rarity, content_hash, byte_size, created_by, updated_by)
+    VALUES (:path, :file_name, :description, :rarity, :content_hash, :byte_size, :created_by, :updated_by)
+    RETURNING 1
+    """
+)
+
+UPSERT_IMAGE = Statement(
+    """
+    INSERT INTO image (path, file_name, description, rarity, content_hash, byte_size, updated_by, updated_on)
+    VALUES (:path, :file_name, :description, :rarity, :content_hash, :byte_size, :updated_by, :updated_on)
+    ON CONFLICT (file_name) DO UPDATE SET
+        path = EXCLUDED.path,
+        description = EXCLUDED.description,
+        rarity = EXCLUDED.rarity,
+        content_hash = EXCLUDED.content_hash,
+        byte_size = EXCLUDED.byte_size,
+        updated_by = EXCLUDED.updated_by,
+        updated_on = EXCLUDED.updated_on
+    RETURNING 1
+    """
+)
+
+BULK_UPSERT_IMAGES = Statement(
+    """
+    INSERT INTO image (path, file_name, description, rarity, content_hash, byte_size, created_by, updated_by)
+    SELECT * FROM unnest(
+        CAST(:paths AS varchar[]),
+        CAST(:file_names AS varchar[]),
+        CAST(:descriptions AS varchar[]),
+        CAST(:rarities AS int[]),
+        CAST(:content_hashes AS varchar[]),
+        CAST(:byte_sizes AS bigint[]),
+        CAST(:created_bys AS varchar[]),
+        CAST(:updated_bys AS varchar[])
+    )
+    ON CONFLICT (file_name) DO UPDATE SET
+        path = EXCLUDED.path,
+        description = EXCLUDED.description,
+        rarity = EXCLUDED.rarity,
+        content_hash = EXCLUDED.content_hash,
+        byte_size = EXCLUDED.byte_size,
+        updated_by = EXCLUDED.updated_by,
+        updated_on = CURRENT_TIMESTAMP
+    WHERE image.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+    RETURNING file_name, (xmax = 0) AS created
+    """
+)
+
+DELETE_IMAGE = Statement(
+    """
+    DELETE FROM image
+    WHERE image_id = :image_id
+    RETURNING 1
+    """
+)
+
+GRANT_IMAGES = Statement(
+    """
+    INSERT INTO user_image (user_email, image_id, opened, created_by, updated_by)
+    SELECT :user_email, i.image_id, FALSE, :user_email, :user_email
+    FROM unnest(CAST(:image_ids AS int[])) AS pull(image_id)
+    JOIN image i ON i.image_id = pull.image_id
+    ON CONFLICT ON CONSTRAINT user_image_unique_user_email_image_id DO NOTHING
+    RETURNING image_id
+    """
+)
+
+
+# user_image
+
+CREATE_USER_IMAGE = Statement(
+    f"""
+    WITH create_user_image AS (
+        INSERT INTO user_image (user_email, image_id, opened, created_by, updated_by)
+        VALUES (:user_email, :image_id, COALESCE(CAST(:opened AS bool), FALSE), :created_by, :updated_by)
+        RETURNING user_email, image_id, opened
+    ), ranking_delta AS (
+        SELECT c.user_email, i.rarity, 1 AS delta
+        FROM create_user_image c
+        JOIN image i ON i.image_id = c.image_id
+        WHERE c.opened = TRUE
+    ), apply_ranking_delta AS ({APPLY_RANKING_DELTA}
+    ) SELECT 1 AS created
+    FROM create_user_image
+    """
+)
+
+BULK_CREATE_USER_IMAGES = Statement(
+    f"""
+    WITH create_user_image AS (
+        INSERT INTO user_image (user_email, image_id, opened, created_by, updated_by)
+        SELECT * FROM unnest(
+            CAST(:user_emails AS varchar[]),
+            CAST(:image_ids AS int[]),
+            CAST(:opened AS bool[]),
+            CAST(:created_bys AS varchar[]),
+            CAST(:updated_bys AS varchar[])
+        )
+        RETURNING user_email, image_id, opened
+    ), ranking_delta AS (
+        SELECT c.user_email, i.rarity, 1 AS delta
+        FROM create_user_image c
+        JOIN image i ON i.image_id = c.image_id
+        WHERE c.opened = TRUE
+    ), apply_ranking_delta AS ({APPLY_RANKING_DELTA}
+    ) SELECT COUNT(*) AS created
+    FROM create_user_image
+    """
+)
+
+# null fields keep their current values
+UPDATE_USER_IMAGE = Statement(
+    f"""
+    WITH update_user_image AS (
+        UPDATE user_image ui SET
+            user_email = COALESCE(CAST(:user_email AS varchar), ui.user_email),
+            image_id = COALESCE(CAST(:image_id AS int), ui.image_id),
+            opened = COALESCE(CAST(:opened AS bool), ui.opened),
+            updated_by = :updated_by,
+            updated_on = :updated_on
+        FROM user_image previous
+        WHERE ui.user_image_id = :user_image_id
+        AND previous.user_image_id = ui.user_image_id
+        RETURNING ui.user_email, ui.image_id, ui.opened,
+            previous.user_email AS previous_user_email,
+            previous.image_id AS previous_image_id,
+            previous.opened AS previous_opened
+    ), ranking_delta AS (
+        SELECT u.previous_user_email AS user_email, i.rarity, -1 AS delta
+        FROM update_user_image u
+        JOIN image i ON i.image_id = u.previous_image_id
+        WHERE u.previous_opened = TRUE
+        UNION ALL
+        SELECT u.user_email, i.rarity, 1 AS delta
+        FROM update_user_image u
+        JOIN image i ON i.image_id = u.image_id
+        WHERE u.opened = TRUE
+    ), apply_ranking_delta AS ({APPLY_RANKING_DELTA}
+    ) SELECT 1 AS updated
+    FROM update_user_image
+    """
+)
+
+DELETE_USER_IMAGE = Statement(
+    f"""
+    WITH delete_user_image AS (
+        DELETE FROM user_image
+        WHERE user_image_id = :user_image_id
+        RETURNING user_email, image_id, opened
+    ), ranking_delta AS (
+        SELECT d.user_email, i.rarity, -1 AS delta
+        FROM delete_user_image d
+        JOIN image i ON i.image_id = d.image_id
+        WHERE d.opened = TRUE
+    ), apply_ranking_delta AS ({APPLY_RANKING_DELTA}
+    ) SELECT 1 AS deleted
+    FROM delete_user_image
+    """
+)
+
+OPEN_USER_IMAGE = Statement(
+    f"""
+    WITH update_user_image AS (
+        UPDATE user_image
+        SET opened = TRUE,
+        updated_on = CURRENT_TIMESTAMP
+        WHERE user_image_id = (
+            SELECT user_image_id
+            FROM user_image
+            WHERE user_email = :user_email
+            AND opened = FALSE
+            ORDER BY created_on ASC LIMIT 1
+        ) RETURNING user_image_id, user_email, image_id
+    ), ranking_delta AS (
+        SELECT u.user_email, i.rarity, 1 AS delta
+        FROM update_user_image u
+        JOIN image i ON i.image_id = u.image_id
+    ), apply_ranking_delta AS ({APPLY_RANKING_DELTA}
+    ) SELECT user_image_id
+    FROM update_user_image
+    """
+)
+
+
+# user_alias
+
+CREATE_USER_ALIAS = Statement(
+    """
+    INSERT INTO user_alias (user_email, user_alias, daily_dollar, created_by, updated_by)
+    VALUES (:user_email, :user_alias, :daily_dollar, :created_by, :updated_by)
+    RETURNING *
+    """
+)
+
+# fields whose set_ flag is false keep their current values, so an explicit null still clears daily_dollar
+UPDATE_USER_ALIAS = Statement(
+    """
+    UPDATE user_alias ua SET
+        user_alias = CASE WHEN CAST(:set_user_alias AS bool) THEN CAST(:user_alias AS varchar) ELSE ua.user_alias END,
+        daily_dollar = CASE WHEN CAST(:set_daily_dollar AS bool) THEN CAST(:daily_dollar AS timestamptz) ELSE ua.daily_dollar END,
+        updated_by = :updated_by,
+        updated_on = :updated_on
+    FROM user_alias previous
+    WHERE ua.user_email = :user_email
+    AND previous.user_alias_id = ua.user_alias_id
+    RETURNING ua.*, previous.user_alias_normalized AS previous_user_alias_normalized
+    """
+)
+
+DELETE_USER_ALIAS = Statement(
+    """
+    DELETE FROM user_alias
+    WHERE user_alias_id = :user_alias_id
+    RETURNING user_email, user_alias_normalized
+    """
+)
+
+CLAIM_DAILY_DOLLAR = Statement(
+    """
+    WITH candidate AS (
+        SELECT pull.image_id
+        FROM unnest(CAST(:image_ids AS int[])) WITH ORDINALITY AS pull(image_id, ord)
+        JOIN image i ON i.image_id = pull.image_id
+        WHERE NOT EXISTS (
+            SELECT 1 FROM user_image ui
+            WHERE ui.user_email = :user_email AND ui.image_id = pull.image_id
+        )
+        ORDER BY pull.ord
+        LIMIT 1
+    ), claim AS (
+        UPDATE user_alias SET daily_dollar = current_timestamp
+        WHERE user_email = :user_email
+        AND (daily_dollar IS NULL OR daily_dollar < current_timestamp - INTERVAL '24 hours')
+        AND EXISTS (SELECT 1 FROM candidate)
+        RETURNING user_email, daily_dollar
+    ), grant_image AS (
+        INSERT INTO user_image (user_email, image_id, opened, created_by, updated_by)
+        SELECT claim.user_email, candidate.image_id, FALSE, claim.user_email, claim.user_email
+        FROM claim CROSS JOIN candidate
+        RETURNING image_id
+    ) SELECT
+        (SELECT image_id FROM grant_image) AS image_id,
+        (SELECT daily_dollar FROM claim) AS daily_dollar,
+        EXISTS (
+            SELECT 1 FROM user_alias
+            WHERE user_email = :user_email
+            AND (daily_dollar IS NULL OR daily_dollar < current_timestamp - INTERVAL '24 hours')
+        ) AS eligible
+    """
+)
+
+
+# stripe
+
+UPSERT_STRIPE_EVENT = Statement(
+    """
+    INSERT INTO stripe (event_id, object, api_version, created_on, data, livemode, pending_webhooks, request, type)
+    VALUES (:event_id, :object, :api_version, :created_on, :data, :livemode, :pending_webhooks, :request, :type)
+    ON CONFLICT (event_id) DO UPDATE SET
+        object = EXCLUDED.object,
+        api_version = EXCLUDED.api_version,
+        created_on = EXCLUDED.created_on,
+        data = EXCLUDED.data,
+        livemode = EXCLUDED.livemode,
+        pending_webhooks = EXCLUDED.pending_webhooks,
+        request = EXCLUDED.request,
+        type = EXCLUDED.type
+    RETURNING 1
+    """
+)
+
+
+# rankings
+
+
+def _rebuild_rankings(filter_statement: str) -> Statement:
+    return Statement(
+        f"""
+        WITH rebuild_rankings AS (
+            INSERT INTO rankings AS r (user_email, common_count, uncommon_count, rare_count, epic_count, unique_count, total_count)
+            SELECT
+                ua.user_email,
+                count(i.image_id) FILTER (WHERE i.rarity = 1),
+                count(i.image_id) FILTER (WHERE i.rarity = 2),
+                count(i.image_id) FILTER (WHERE i.rarity = 3),
+                count(i.image_id) FILTER (WHERE i.rarity = 4),
+                count(i.image_id) FILTER (WHERE i.rarity = 5),
+                count(i.image_id)
+            FROM user_alias ua
+            LEFT JOIN user_image ui ON ui.user_email = ua.user_email AND ui.opened = TRUE
+            LEFT JOIN image i ON i.image_id = ui.image_id
+            {filter_statement}
+            GROUP BY ua.user_email
+            ON CONFLICT (user_email) DO UPDATE SET
+                common_count = EXCLUDED.common_count,
+                uncommon_count = EXCLUDED.uncommon_count,
+                rare_count = EXCLUDED.rare_count,
+                epic_count = EXCLUDED.epic_count,
+                unique_count = EXCLUDED.unique_count,
+                total_count = EXCLUDED.total_count
+            RETURNING 1
+        ) SELECT COUNT(*) AS rebuilt
+        FROM rebuild_rankings
+        """
+    )
+
+
+REBUILD_RANKINGS = _rebuild_rankings(filter_statement="")
+REBUILD_USER_RANKINGS = _rebuild_rankings(filter_statement="WHERE ua.user_email = ANY(:user_emails)")
+
+# moves every opened pull of an image whose rarity changed from its previous rarity's counter to its new one, reading
+# only the pulls of the changed images
+MOVE_RANKINGS_FOR_RARITY_CHANGES = Statement(
+    f"""
+    WITH rarity_change AS (
+        SELECT i.image_id, change.previous_rarity, change.rarity
+        FROM unnest(
+            CAST(:file_names AS varchar[]),
+            CAST(:previous_rarities AS int[]),
+            CAST(:rarities AS int[])
+        ) AS change(file_name, previous_rarity, rarity)
+        JOIN image i ON i.file_name = change.file_name
+    ), ranking_delta AS (
+        SELECT ui.user_email, rc.previous_rarity AS rarity, -1 AS delta
+        FROM rarity_change rc
+        JOIN user_image ui ON ui.image_id = rc.image_id
+        WHERE ui.opened = TRUE
+        UNION ALL
+        SELECT ui.user_email, rc.rarity, 1 AS delta
+        FROM rarity_change rc
+        JOIN user_image ui ON ui.image_id = rc.image_id
+        WHERE ui.opened = TRUE
+    ), apply_ranking_delta AS ({APPLY_RANKING_DELTA}
+    ) SELECT COUNT(DISTINCT user_email) AS moved
+    FROM ranking_delta
+    """
+)
@@ -0,0 +1,265 @@
+# standard lib imports
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+# third party imports
+import httpx
+from fastapi import UploadFile
+
+# module imports
+from app.exceptions import PayloadTooLargeError, StorageError
+
+
+class UploadBudget:
+    def __init__(self, max_file_bytes: int, max_request_bytes: int) -> None:
+        self.max_file_bytes = max_file_bytes
+        self.max_request_bytes = max_request_bytes
+        self.request_bytes = 0
+
+    def consume(self, file_name: str, file_bytes: int, chunk_bytes: int) -> None:
+        if file_bytes > self.max_file_bytes:
+            raise PayloadTooLargeError(resource_id=file_name, max_bytes=self.max_file_bytes)
+        self.request_bytes += chunk_bytes
+        if self.request_bytes > self.max_request_bytes:
+            raise PayloadTooLargeError(resource_id="request", max_bytes=self.max_request_bytes)
+
+
+class UploadStream:
+    def __init__(self, upload_file: UploadFile, chunk_size: int, budget: UploadBudget) -> None:
+        self._upload_file = upload_file
+        self._chunk_size = chunk_size
+        self._budget = budget
+        self._hash = hashlib.sha256()
+        self.byte_size = 0
+
+    @property
+    def content_hash(self) -> str:
+        return self._hash.hexdigest()
+
+    @property
+    def content_length(self) -> Optional[int]:
+        return self._upload_file.size
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        if self.content_length is not None and self.content_length > self._budget.max_file_bytes:
+            raise PayloadTooLargeError(resource_id=self._upload_file.filename, max_bytes=self._budget.max_file_bytes)
+        await self._upload_file.seek(0)
+        self._hash = hashlib.sha256()
+        self.byte_size = 0
+        while chunk := await self._upload_file.read(self._chunk_size):
+            self.byte_size += len(chunk)
+            self._budget.consume(file_name=self._upload_file.filename, file_bytes=self.byte_size, chunk_bytes=len(chunk))
+            self._hash.update(chunk)
+            yield chunk
+
+
+async def hash_upload(upload_file: UploadFile, chunk_size: int) -> Tuple[str, int]:
+    content_hash = hashlib.sha256()
+    byte_size = 0
+    await upload_file.seek(0)
+    while chunk := await upload_file.read(chunk_size):
+        byte_size += len(chunk)
+        content_hash.update(chunk)
+    return content_hash.hexdigest(), byte_size
+
+
+# implementations must never block the event loop
+class StorageBackend(ABC):
+    @abstractmethod
+    async def upload(self, path: str, stream: AsyncIterable[bytes], content_type: str, content_length: Optional[int] = None) -> None: ...
+
+    @abstractmethod
+    async def update(self, path: str, stream: AsyncIterable[bytes], content_type: str, content_length: Optional[int] = None) -> None: ...
+
+    @abstractmethod
+    async def delete(self, paths: Sequence[str]) -> None: ...
+
+    @abstractmethod
+    async def list(self, prefix: str, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def create_signed_urls(self, paths: Sequence[str], expires_in: int) -> List[Optional[str]]: ...
+
+    async def close(self) -> None:
+        pass
+
+
+# HS256 tokens over {"url": "<bucket>/<path>", "iat", "exp"}, byte for byte the way the storage API signs them
+class SignedURLSigner:
+    def __init__(self, base_url: str, bucket: str, jwt_secret: str) -> None:
+        self._base_url = base_url
+        self._bucket = bucket
+        self._hmac = hmac.new(jwt_secret.encode(), digestmod=hashlib.sha256)
+        self._header_segment = self._encode_segment(b'{"alg":"HS256","typ":"JWT"}')
+
+    def sign(self, paths: Sequence[str], expires_in: int) -> List[str]:
+        issued_at = int(time.time())
+        # every token of a batch shares its header and timestamps, so only the url and signature vary per path
+        claims_suffix = f',"iat":{issued_at},"exp":{issued_at + expires_in}}}'
+        signed_urls = []
+        for path in paths:
+            url = f"{self._bucket}/{path}"
+            claims = f'{{"url":{json.dumps(url, ensure_ascii=False)}{claims_suffix}'
+            signing_input = self._header_segment + b"." + self._encode_segment(claims.encode())
+            signature = self._hmac.copy()
+            signature.update(signing_input)
+            token = signing_input + b"." + self._encode_segment(signature.digest())
+            signed_urls.append(f"{self._base_url}object/sign/{url}?token={token.decode()}")
+        return signed_urls
+
+    @staticmethod
+    def _encode_segment(segment: bytes) -> bytes:
+        return base64.urlsafe_b64encode(segment).rstrip(b"=")
+
+
+class SupabaseStorageBackend(StorageBackend):
+    def __init__(
+        self,
+        url: str,
+        service_key: str,
+        bucket: str,
+        timeout: int,
+        connect_timeout: int,
+        max_connections: int,
+        max_keepalive_connections: int,
+        jwt_secret: Optional[str] = None,
+    ) -> None:
+        self._bucket = bucket
+        self._base_url = f"{url}/storage/v1/"
+        self._signer = SignedURLSigner(base_url=self._base_url, bucket=bucket, jwt_secret=jwt_secret) if jwt_secret else None
+        self._client = httpx.AsyncClient(
+            base_url=self._base_url,
+            headers={
+                "apiKey": service_key,
+                "Authorization": f"Bearer {service_key}",
+            },
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections),
+        )
+
+    async def upload(self, path: str, stream: AsyncIterable[bytes], content_type: str, content_length: Optional[int] = None) -> None:
+        await self._request("POST", f"object/{self._bucket}/{path}", content=stream, headers=self._file_headers(content_type, content_length, upsert=False))
+
+    async def update(self, path: str, stream: AsyncIterable[bytes], content_type: str, content_length: Optional[int] = None) -> None:
+        # an upserting POST also recreates objects that went missing from the bucket while the catalog kept their row
+        await self._request("POST", f"object/{self._bucket}/{path}", content=stream, headers=self._file_headers(content_type, content_length, upsert=True))
+
+    async def delete(self, paths: Sequence[str]) -> None:
+        await self._request("DELETE", f"object/{self._bucket}", json={"prefixes": list(paths)})
+
+    async def list(self, prefix: str, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        response = await self._request(
+            "POST",
+            f"object/list/{self._bucket}",
+            json={
+                "prefix": prefix,
+                "limit": limit,
+                "offset": offset,
+                "sortBy": {"column": "name", "order": "asc"},
+            },
+        )
+        return response.json()
+
+    async def create_signed_urls(self, paths: Sequence[str], expires_in: int) -> List[Optional[str]]:
+        if self._signer:
+            return self._signer.sign(paths=paths, expires_in=expires_in)
+        response = await self._request("POST", f"object/sign/{self._bucket}", json={"paths": list(paths), "expiresIn": expires_in})
+        return [f"{self._base_url}{item['signedURL'].lstrip('/')}" if item.get("signedURL") else None for item in response.json()]
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+    def _file_headers(self, content_type: str, content_length: Optional[int], upsert: bool) -> Dict[str, str]:
+        headers = {"content-type": content_type or "application/octet-stream", "cache-control": "max-age=3600", "x-upsert": "true" if upsert else "false"}
+        # a known length lets httpx stream the body without chunked transfer encoding
+        if content_length is not None:
+            headers["content-length"] = str(content_length)
+        return headers
+
+    async def _request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        try:
+            response = await self._client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            raise StorageError({"code": "storage_request", "description": e}) from e
+        if response.is_error:
+            raise StorageError({"code": f"storage_{response.status_code}", "description": response.text})
+        return response
+
+
+class LocalStorageBackend(StorageBackend):
+    def __init__(self, root: str, bucket: str, base_url: str = "file://") -> None:
+        self._root = os.path.join(root, bucket)
+        self._bucket = bucket
+        self._base_url = base_url
+
+    async def upload(self, path: str, stream: AsyncIterable[bytes], content_type: str, content_length: Optional[int] = None) -> None:
+        full_path = self._full_path(path)
+        if await asyncio.to_thread(os.path.exists, full_path):
+            raise StorageError({"code": "storage_409", "description": f"{path} already exists"})
+        await self._write(full_path, stream)
+
+    async def update(self, path: str, stream: AsyncIterable[bytes], content_type: str, content_length: Optional[int] = None) -> None:
+        await self._write(self._full_path(path), stream)
+
+    async def delete(self, paths: Sequence[str]) -> None:
+        for full_path in [self._full_path(path) for path in paths]:
+            # like the storage API, paths that do not exist are ignored
+            if await asyncio.to_thread(os.path.isfile, full_path):
+                await asyncio.to_thread(os.remove, full_path)
+
+    async def list(self, prefix: str, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        names = await asyncio.to_thread(self._list, self._full_path(prefix))
+        return [{"name": name} for name in names[offset : offset + limit]]
+
+    async def create_signed_urls(self, paths: Sequence[str], expires_in: int) -> List[Optional[str]]:
+        return [f"{self._base_url}{self._full_path(path)}" for path in paths]
+
+    def _full_path(self, path: str) -> str:
+        full_path = os.path.normpath(os.path.join(self._root, path))
+        if not full_path.startswith(os.path.normpath(self._root)):
+            raise StorageError({"code": "storage_400", "description": f"{path} is outside of bucket {self._bucket}"})
+        return full_path
+
+    @staticmethod
+    async def _write(full_path: str, stream: AsyncIterable[bytes]) -> None:
+        # chunks land in a temporary file that replaces the object only once the whole stream is read
+        partial_path = f"{full_path}.partial"
+        await asyncio.to_thread(os.makedirs, os.path.dirname(full_path), exist_ok=True)
+        file = await asyncio.to_thread(open, partial_path, "wb")
+        try:
+            async for chunk in stream:
+                await asyncio.to_thread(file.write, chunk)
+        except BaseException:
+            await asyncio.to_thread(file.close)
+            await asyncio.to_thread(os.remove, partial_path)
+            raise
+        await asyncio.to_thread(file.close)
+        await asyncio.to_thread(os.replace, partial_path, full_path)
+
+    @staticmethod
+    def _list(full_path: str) -> List[str]:
+        if not os.path.isdir(full_path):
+            return []
+        return sorted(name for name in os.listdir(full_path) if os.path.isfile(os.path.join(full_path, name)) and not name.endswith(".partial"))
+
+
+def create_storage_backend(config: Any) -> StorageBackend:
+    if config.STORAGE_BACKEND == "local":
+        return LocalStorageBackend(root=config.LOCAL_STORAGE_PATH, bucket=config.SUPABASE_BUCKET)
+    return SupabaseStorageBackend(
+        url=config.SUPABASE_URL,
+        service_key=config.SUPABASE_SERVICE_KEY,
+        bucket=config.SUPABASE_BUCKET,
+        timeout=config.STORAGE_TIMEOUT,
+        connect_timeout=config.STORAGE_CONNECT_TIMEOUT,
+        max_connections=config.STORAGE_MAX_CONNECTIONS,
+        max_keepalive_connections=config.STORAGE_MAX_KEEPALIVE_CONNECTIONS,
+        jwt_secret=config.SUPABASE_JWT_SECRET,
+    )
@@ -5,8 +5,8 @@ import json
 from databases import Database
 
 # module imports
+from app.data.statements import UPSERT_STRIPE_EVENT
 from app.models.stripe import StripeWebhook
-from app.utils import build_insert_statement, build_update_statement
 
 
 class StripeData:
@@ -17,19 +17,5 @@ class StripeData:
         mapped_dict = stripe_update.model_dump()
         mapped_dict["data"] = json.dumps(mapped_dict["data"])
         mapped_dict["request"] = json.dumps(mapped_dict["request"])
-        fields_statement, values_statement = build_insert_statement(mapped_dict=mapped_dict)
-        update_statement = build_update_statement(mapped_dict=mapped_dict)
-        return await self._db.fetch_val(
-            query=f"""
-            WITH upsert_stripe as (
-                INSERT INTO stripe ({fields_statement})
-                    VALUES ({values_statement})
-                    ON CONFLICT (event_id)
-                DO UPDATE SET {update_statement}
-                    RETURNING *
-                ) SELECT COUNT(*) as upserted 
-                FROM upsert_stripe
-            """,
-            values=mapped_dict,
-            column="upserted",
-        )
+        upserted = await self._db.fetch_val(query=UPSERT_STRIPE_EVENT.sql, values=UPSERT_STRIPE_EVENT.bind(mapped_dict))
+        return upserted or 0
@@ -1,39 +1,48 @@
 # standard lib imports
-from typing import Optional, Sequence
+import time
+from typing import Any, Mapping, Optional, Sequence, Tuple
 
 # third party imports
 from databases import Database
+from asyncpg.exceptions import UniqueViolationError
 
 # module imports
-from app.models.user_alias import UserAlias, UserAliasCreate, UserAliasUpdate
-from app.utils import build_insert_statement, build_update_statement
+from app.cache import LRUCache
+from app.data.records import RecordDecoder
+from app.data.statements import CLAIM_DAILY_DOLLAR, CREATE_USER_ALIAS, DELETE_USER_ALIAS, UPDATE_USER_ALIAS
+from app.models.user_alias import UserAlias, UserAliasCreate, UserAliasSearchResult, UserAliasUpdate
 
+USER_ALIAS_DECODER = RecordDecoder(UserAlias)
+USER_ALIAS_SEARCH_RESULT_DECODER = RecordDecoder(UserAliasSearchResult)
 
+
+# writes made by other processes go unnoticed for up to user_alias_cache_ttl seconds
 class UserAliasData:
-    def __init__(self, db: Database) -> None:
+    def __init__(self, db: Database, user_alias_cache: LRUCache, user_alias_cache_ttl: int) -> None:
         self._db = db
+        self._user_alias_cache = user_alias_cache
+        self._user_alias_cache_ttl = user_alias_cache_ttl
 
     async def create(self, user_alias: UserAliasCreate) -> int:
-        mapped_dict = user_alias.model_dump()
-        fields_statement, values_statement = build_insert_statement(mapped_dict=mapped_dict)
-        return await self._db.fetch_val(
-            query=f"""
-                WITH create_user_alias AS (
-                    INSERT INTO user_alias ({fields_statement})
-                    VALUES ({values_statement}) RETURNING *
-                ) SELECT COUNT(*) as created 
-                FROM create_user_alias;
-            """,
-            values=mapped_dict,
-            column="created",
-        )
+        record = await self._db.fetch_one(query=CREATE_USER_ALIAS.sql, values=CREATE_USER_ALIAS.bind(user_alias.model_dump()))
+        if record is None:
+            return 0
+        self._cache_row(record)
+        return 1
 
     async def read(self, user_alias: Optional[str] = None, user_email: Optional[str] = None, limit: int = 10, offset: int = 0) -> Sequence[Optional[UserAlias]]:
+        # emails and aliases are unique, so the first page of a lookup is the whole result
+        single_row = bool(user_email or user_alias) and offset == 0
+        if single_row:
+            cached_row = self._read_cached_row(user_email=user_email or self._user_alias_cache.get(("user_alias", user_alias.lower())))
+            if cached_row is not None:
+                return [cached_row]
+
         filter_statement = ""
         values = {"limit": limit, "offset": offset}
 
         if user_alias:
-            filter_statement = "WHERE ua.user_alias ILIKE :user_alias"
+            filter_statement = "WHERE ua.user_alias_normalized = lower(:user_alias)"
             values["user_alias"] = user_alias
 
         if user_email:
@@ -47,50 +56,74 @@ class UserAliasData:
             """,
             values=values,
         )
-        user_alias_response = []
-        if records:
-            for record in records:
-                user_alias_response.append(UserAlias(**dict(record)))
+        user_alias_response = USER_ALIAS_DECODER.decode(records)
+        if records and single_row:
+            self._cache_row(records[0], user_alias=user_alias_response[0])
         return user_alias_response
 
-    async def update(self, user_email: str, user_alias: UserAliasUpdate) -> int:
-        mapped_dict = user_alias.model_dump(exclude_unset=True)
-        mapped_dict["user_email"] = user_email
-        update_statement = build_update_statement(mapped_dict=mapped_dict)
-        return await self._db.fetch_val(
-            query=f"""
-                WITH update_user_alias as (
-                    UPDATE user_alias SET {update_statement}
-                    WHERE user_email = :user_email RETURNING *
-                ) SELECT COUNT(*) as updated 
-                FROM update_user_alias
+    async def search(self, query: str, limit: int) -> Sequence[UserAliasSearchResult]:
+        escaped_query = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        records = await self._db.fetch_all(
+            query="""
+                SELECT ua.user_alias FROM user_alias ua
+                WHERE ua.user_alias_normalized LIKE ('%' || lower(:query) || '%')
+                ORDER BY (ua.user_alias_normalized LIKE (lower(:query) || '%')) DESC, length(ua.user_alias_normalized), ua.user_alias_normalized
+                LIMIT :limit
             """,
-            values=mapped_dict,
-            column="updated",
+            values={"query": escaped_query, "limit": limit},
         )
+        return USER_ALIAS_SEARCH_RESULT_DECODER.decode(records)
+
+    async def update(self, user_email: str, user_alias: UserAliasUpdate) -> int:
+        values = user_alias.model_dump()
+        values["user_email"] = user_email
+        # only the fields sent with the update are written, so a statement with fixed text flags which ones were sent
+        values["set_user_alias"] = "user_alias" in user_alias.model_fields_set
+        values["set_daily_dollar"] = "daily_dollar" in user_alias.model_fields_set
+        record = await self._db.fetch_one(query=UPDATE_USER_ALIAS.sql, values=UPDATE_USER_ALIAS.bind(values))
+        if record is None:
+            return 0
+        # the row is no longer found under its previous alias
+        self._user_alias_cache.delete(("user_alias", record["previous_user_alias_normalized"]))
+        self._cache_row(record)
+        return 1
 
     async def delete(self, user_alias_id: int) -> int:
-        return await self._db.fetch_val(
-            query="""
-                WITH delete_user_alias as (
-                    DELETE FROM user_alias 
-                    WHERE user_alias_id = :user_alias_id RETURNING *
-                ) SELECT count(*) as deleted 
-                FROM delete_user_alias;
-            """,
-            values={"user_alias_id": user_alias_id},
-            column="deleted",
-        )
+        record = await self._db.fetch_one(query=DELETE_USER_ALIAS.sql, values={"user_alias_id": user_alias_id})
+        if record is None:
+            return 0
+        self._user_alias_cache.delete(("user_email", record["user_email"]))
+        self._user_alias_cache.delete(("user_alias", record["user_alias_normalized"]))
+        return 1
 
-    async def daily_dollar(self, user_email: str) -> int:
-        return await self._db.fetch_val(
-            query="""
-                WITH update_user_alias as (
-                    UPDATE user_alias SET daily_dollar = current_timestamp
-                    WHERE user_email = :user_email RETURNING *
-                ) SELECT COUNT(*) as updated 
-                FROM update_user_alias
-            """,
-            values={"user_email": user_email},
-            column="updated",
-        )
+    async def daily_dollar(self, user_email: str, image_ids: Sequence[int]) -> Tuple[Optional[int], bool]:
+        # the UPDATE's row lock makes concurrent claims wait and then fail the eligibility check
+        try:
+            record = await self._db.fetch_one(query=CLAIM_DAILY_DOLLAR.sql, values={"user_email": user_email, "image_ids": list(image_ids)})
+        except UniqueViolationError:
+            # a concurrent pull granted the candidate first; the whole statement, claim included, rolled back
+            return None, True
+        if record["image_id"] is not None:
+            cached_row = self._read_cached_row(user_email=user_email)
+            if cached_row is not None:
+                self._user_alias_cache.set(
+                    ("user_email", user_email), cached_row.model_copy(update={"daily_dollar": record["daily_dollar"]}), expires_at=time.time() + self._user_alias_cache_ttl
+                )
+        return record["image_id"], record["eligible"]
+
+    async def read_user_email(self, user_alias: str) -> Optional[str]:
+        user_email = self._user_alias_cache.get(("user_alias", user_alias.lower()))
+        if user_email is None:
+            user_aliases = await self.read(user_alias=user_alias, limit=1, offset=0)
+            user_email = user_aliases[0].user_email if user_aliases else None
+        return user_email
+
+    def _read_cached_row(self, user_email: Optional[str]) -> Optional[UserAlias]:
+        return self._user_alias_cache.get(("user_email", user_email)) if user_email else None
+
+    def _cache_row(self, record: Mapping[str, Any], user_alias: Optional[UserAlias] = None) -> None:
+        # rows are cached once under the email, and the case-folded alias maps to that email
+        expires_at = time.time() + self._user_alias_cache_ttl
+        user_alias = user_alias or USER_ALIAS_DECODER.decode_one(record)
+        self._user_alias_cache.set(("user_email", record["user_email"]), user_alias, expires_at=expires_at)
+        self._user_alias_cache.set(("user_alias", record["user_alias_normalized"]), record["user_email"], expires_at=expires_at)
@@ -1,111 +1,107 @@
 # standard lib imports
-from typing import Optional, Sequence
+from typing import Optional, Sequence, Tuple, Union
 
 # third party imports
 from databases import Database
 
 # module imports
+from app.cache import CoalescingCache
+from app.data.direct_pool import DirectPool, DirectQueries
+from app.data.records import RecordDecoder
+from app.data.statements import BULK_CREATE_USER_IMAGES, CREATE_USER_IMAGE, DELETE_USER_IMAGE, OPEN_USER_IMAGE, UPDATE_USER_IMAGE
 from app.models.user_image import UserImage, UserImageCreate, UserImageUpdate, UserRankings
-from app.utils import build_insert_statement, build_update_statement
+from app.utils import decode_cursor, encode_cursor
+
+USER_IMAGE_DECODER = RecordDecoder(UserImage)
+USER_RANKINGS_DECODER = RecordDecoder(UserRankings)
 
 
 class UserImageData:
-    def __init__(self, db: Database) -> None:
+    def __init__(self, db: Database, rankings_cache: CoalescingCache, direct_db: Optional[DirectPool] = None) -> None:
         self._db = db
+        # the hot paths run on the direct asyncpg pool when one is configured
+        self._hot_db: Union[Database, DirectQueries] = direct_db if direct_db is not None else db
+        self._rankings_cache = rankings_cache
 
     async def create(self, user_image: UserImageCreate) -> int:
-        mapped_dict = user_image.model_dump()
-        fields_statement, values_statement = build_insert_statement(mapped_dict=mapped_dict)
-        return await self._db.fetch_val(
-            query=f"""
-                WITH create_user_image AS (
-                    INSERT INTO user_image ({fields_statement})
-                    VALUES ({values_statement}) RETURNING *
-                ) SELECT COUNT(*) as created 
-                FROM create_user_image;
-            """,
-            values=mapped_dict,
-            column="created",
-        )
+        created = await self._db.fetch_val(query=CREATE_USER_IMAGE.sql, values=CREATE_USER_IMAGE.bind(user_image.model_dump())) or 0
+        if created and user_image.opened:
+            self._rankings_cache.invalidate()
+        return created
 
     async def bulk_create(self, user_images: Sequence[UserImageCreate]) -> int:
-        mapped_dict = user_images.model_dump()
-        fields_statement, values_statement = build_insert_statement(mapped_dict=mapped_dict)
-        return await self._db.fetch_val(
-            query=f"""
-                WITH create_user_image AS (
-                    INSERT INTO user_image ({fields_statement})
-                    VALUES ({values_statement}) RETURNING *
-                ) SELECT COUNT(*) as created 
-                FROM create_user_image;
-            """,
-            values=mapped_dict,
-            column="created",
+        if not user_images:
+            return 0
+        created = await self._db.fetch_val(
+            query=BULK_CREATE_USER_IMAGES.sql,
+            values={
+                "user_emails": [user_image.user_email for user_image in user_images],
+                "image_ids": [user_image.image_id for user_image in user_images],
+                "opened": [bool(user_image.opened) for user_image in user_images],
+                "created_bys": [user_image.created_by for user_image in user_images],
+                "updated_bys": [user_image.updated_by for user_image in user_images],
+            },
         )
+        if created and any(user_image.opened for user_image in user_images):
+            self._rankings_cache.invalidate()
+        return created
+
+    async def read(self, limit: int, offset: int, cursor: Optional[str] = None) -> Tuple[Sequence[Optional[UserImage]], Optional[str]]:
+        filter_statement = ""
+        values = {"limit": limit, "offset": offset}
+        if cursor:
+            filter_statement = "WHERE (created_on, user_image_id) < (CAST(:cursor_created_on AS timestamptz), CAST(:cursor_user_image_id AS int))"
+            values["cursor_created_on"], values["cursor_user_image_id"] = decode_cursor(cursor=cursor)
+            values["offset"] = 0
 
-    async def read(self, limit: int, offset: int) -> Sequence[Optional[UserImage]]:
         records = await self._db.fetch_all(
-            query="SELECT * FROM user_image LIMIT :limit OFFSET :offset",
-            values={"limit": limit, "offset": offset},
+            query=f"""SELECT * FROM user_image
+                {filter_statement}
+                ORDER BY created_on DESC, user_image_id DESC
+                LIMIT :limit OFFSET :offset
+            """,
+            values=values,
         )
-        return [UserImage(**dict(record)) for record in records]
+        next_cursor = None
+        if len(records) == limit:
+            next_cursor = encode_cursor(created_on=records[-1]["created_on"], row_id=records[-1]["user_image_id"])
+        return USER_IMAGE_DECODER.decode(records), next_cursor
 
     async def read_rankings(self, limit: int, offset: int) -> Sequence[Optional[UserRankings]]:
-        records = await self._db.fetch_all(
+        return await self._rankings_cache.get_or_load((limit, offset), lambda: self._read_rankings(limit=limit, offset=offset))
+
+    async def _read_rankings(self, limit: int, offset: int) -> Sequence[Optional[UserRankings]]:
+        records = await self._hot_db.fetch_all(
             query="""
-                SELECT * FROM rankings
+                SELECT ua.user_alias, r.common_count, r.uncommon_count, r.rare_count, r.epic_count, r.unique_count, r.total_count
+                FROM rankings r
+                JOIN user_alias ua ON ua.user_email = r.user_email
+                WHERE r.total_count > 0
+                ORDER BY r.total_count DESC, r.unique_count DESC, r.epic_count DESC, r.rare_count DESC,
+                    r.uncommon_count DESC, r.common_count DESC, r.user_email
                 LIMIT :limit OFFSET :offset
             """,
             values={"limit": limit, "offset": offset},
         )
-        return [UserRankings(**dict(record)) for record in records]
+        return USER_RANKINGS_DECODER.decode(records)
 
     async def update(self, user_image_id: int, user_image: UserImageUpdate) -> int:
         mapped_dict = user_image.model_dump()
         mapped_dict["user_image_id"] = user_image_id
-        update_statement = build_update_statement(mapped_dict=mapped_dict)
-        return await self._db.fetch_val(
-            query=f"""
-                WITH update_user_image as (
-                    UPDATE user_image SET {update_statement}
-                    WHERE user_image_id = :user_image_id RETURNING *
-                ) SELECT COUNT(*) as updated 
-                FROM update_user_image
-            """,
-            values=mapped_dict,
-            column="updated",
-        )
+        updated = await self._db.fetch_val(query=UPDATE_USER_IMAGE.sql, values=UPDATE_USER_IMAGE.bind(mapped_dict)) or 0
+        if updated:
+            self._rankings_cache.invalidate()
+        return updated
 
     async def delete(self, user_image_id: int) -> int:
-        return await self._db.fetch_val(
-            query="""
-                WITH delete_user_image as (
-                    DELETE FROM user_image 
-                    WHERE user_image_id = :user_image_id RETURNING *
-                ) SELECT count(*) as deleted 
-                FROM delete_user_image;
-            """,
-            values={"user_image_id": user_image_id},
-            column="deleted",
-        )
+        deleted = await self._db.fetch_val(query=DELETE_USER_IMAGE.sql, values={"user_image_id": user_image_id}) or 0
+        if deleted:
+            self._rankings_cache.invalidate()
+        return deleted
 
     async def open_image(self, user_email: str) -> int:
-        return await self._db.fetch_val(
-            query="""
-                WITH update_user_image as (
-                    UPDATE user_image
-                    SET opened = TRUE,
-                    updated_on = CURRENT_TIMESTAMP
-                    WHERE user_image_id = (
-                        SELECT user_image_id
-                        FROM user_image
-                        WHERE user_email = :user_email 
-                        AND opened = FALSE
-                        ORDER BY created_on ASC LIMIT 1
-                    ) RETURNING *
-                ) SELECT user_image_id 
-                FROM update_user_image
-            """,
-            values={"user_email": user_email},
-            column="user_image_id",
-        )
+        user_image_id = await self._hot_db.fetch_val(query=OPEN_USER_IMAGE.sql, values={"user_email": user_email})
+        if user_image_id:
+            # opens are the busiest write, so they are batched into one invalidation per RANKINGS_CACHE_OPEN_STALENESS
+            self._rankings_cache.mark_stale()
+        return user_image_id
@@ -38,3 +38,33 @@ class TokenError(BaseError):
     def __init__(self, error: dict) -> None:
         message = f"{error.get("code")}: {error.get("description")}"
         super().__init__(message=message)
+
+class StorageError(BaseError):
+    def __init__(self, error: dict) -> None:
+        message = f"{error.get("code")}: {error.get("description")}"
+        super().__init__(message=message)
+
+class InvalidCursorError(BaseError):
+    def __init__(self, cursor: str) -> None:
+        message = "Pagination cursor is malformed, pass back the X-Next-Cursor value of the previous page."
+        extras = {
+            "cursor": cursor
+        }
+        super().__init__(message=message, extras=extras)
+
+class PayloadTooLargeError(BaseError):
+    def __init__(self, resource_id: str, max_bytes: int) -> None:
+        message = f"Upload {resource_id} exceeds the limit of {max_bytes} bytes."
+        extras = {
+            "id": resource_id,
+            "max_bytes": max_bytes
+        }
+        super().__init__(message=message, extras=extras)
+
+class ServiceUnavailableError(BaseError):
+    def __init__(self, retry_after: int) -> None:
+        message = f"Too many requests are waiting on the database, retry after {retry_after} seconds."
+        extras = {
+            "retry_after": retry_after
+        }
+        super().__init__(message=message, extras=extras)
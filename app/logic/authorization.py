@@ -1,14 +1,16 @@
 # standard lib imports
-import json
+import hashlib
 from enum import Enum
-from typing import Tuple, Sequence
-from urllib.request import urlopen
+from typing import Any, Dict, Tuple, Sequence
 
 # third party imports
 from jose import jwt
 
 # module imports
+from app.cache import LRUCache
+from app.data.jwks import JWKSKeyStore
 from app.exceptions import TokenError
+from app.models.authorization import Principal
 from app.config import get_settings
 
 config_settings = get_settings()
@@ -27,79 +29,78 @@ class ResourceType(str, Enum):
     TRANSACTION = "transaction"
     USER_ALIAS = "user_alias"
     STRIPE = "stripe"
+    STATS = "stats"
 
 
 class AuthorizationLogic:
-    def get_value_from_token(self, token: str, key: str, namespace: str = None):
-        claims = jwt.get_unverified_claims(token=token)
+    def __init__(self, jwks_key_store: JWKSKeyStore, token_cache: LRUCache):
+        self._jwks_key_store = jwks_key_store
+        self._token_cache = token_cache
+
+    def get_value_from_claims(self, claims: Dict[str, Any], key: str, namespace: str = None):
         if namespace:
             key = f"{namespace}/{key}"
         claim = claims.get(key)
         return claim
 
-    def validate_token(self, token: str, tenant_url: str) -> bool:
-        jsonurl = urlopen(f"{tenant_url}.well-known/jwks.json")
-        jwks = json.loads(jsonurl.read())
-        unverified_header = jwt.get_unverified_header(token)
-        rsa_key = {}
-
-        for key in jwks["keys"]:
-            if key["kid"] == unverified_header["kid"]:
-                rsa_key = {
-                    "kty": key["kty"],
-                    "kid": key["kid"],
-                    "use": key["use"],
-                    "n": key["n"],
-                    "e": key["e"],
-                }
+    async def validate_token(self, token: str, tenant_url: str) -> Dict[str, Any]:
+        try:
+            unverified_header = jwt.get_unverified_header(token)
+        except jwt.JWTError as e:
+            raise TokenError({"code": "invalid_header", "description": "Unable to parse authentication token."}) from e
+        rsa_key = await self._jwks_key_store.get_key(unverified_header.get("kid"))
         if rsa_key:
             try:
-                jwt.decode(
+                return jwt.decode(
                     token,
                     rsa_key,
                     algorithms=config_settings.AUTH0_ALGORITHMS,
                     audience=config_settings.AUTH0_API_AUDIENCE,
                     issuer=f"{tenant_url}",
                 )
-                return True
             except jwt.JWTError as e:
                 raise TokenError({"code": "jwt_error", "description": f"{e.args}"}) from e
-            except Exception:
+            except Exception as e:
                 raise TokenError({"code": "invalid_header", "description": "Unable to parse authentication token."}) from e
         raise TokenError({"code": "invalid_header", "description": "Unable to find appropriate key"})
 
-    def validate_scopes(self, required_scopes: Sequence[str], token: str) -> bool:
-        unverified_claims = jwt.get_unverified_claims(token)
-        if unverified_claims.get("scope"):
-            token_scopes = unverified_claims["scope"].split()
-            if unverified_claims.get("permissions"):
-                permissions = unverified_claims.get("permissions") or []
-                if len(permissions) > 0:
-                    token_scopes = [*token_scopes, *permissions]
-            for scope in required_scopes:
-                if scope not in token_scopes:
-                    return False
-            return True
-        raise TokenError({"code": "invalid_claims", "description": "Missing scope claim"})
-
-    def authorize_user_for_operation(self, token: str, scopes: Sequence) -> Tuple[bool, str, str]:
-        # Retrieve and verify issuer claim on access token
-        issuer = self.get_value_from_token(token=token, key="iss")
-        if issuer != config_settings.AUTH0_ALLOWED_ISSUERS:
-            raise TokenError({"code": "invalid_claims", "description": "Invalid issuer claim"})
-        # Validate token using verified issuer as Auth0 tenant
-        self.validate_token(token=token, tenant_url=issuer)
-        username = self.get_value_from_token(token=token, key="email", namespace=config_settings.AUTH0_TOKEN_NAMESPACE)
+    def validate_scopes(self, required_scopes: Sequence[str], principal: Principal) -> bool:
+        return principal.scopes.issuperset(required_scopes)
 
+    def build_principal(self, claims: Dict[str, Any]) -> Principal:
+        username = self.get_value_from_claims(claims=claims, key="email", namespace=config_settings.AUTH0_TOKEN_NAMESPACE)
         if username is None:
             raise TokenError({"code": "invalid_claims", "description": "No username found on token"})
 
-        tenant = self.get_value_from_token(token=token, key="tenant", namespace=config_settings.AUTH0_TOKEN_NAMESPACE)
+        tenant = self.get_value_from_claims(claims=claims, key="tenant", namespace=config_settings.AUTH0_TOKEN_NAMESPACE)
         if tenant is None:
             raise TokenError({"code": "invalid_claims", "description": "No tenant found on token"})
 
         if tenant != config_settings.AUTH0_TENANT:
             raise TokenError({"code": "invalid_claims", "description": "Invalid tenant found on token"})
 
-        valid_scopes = self.validate_scopes(required_scopes=scopes, token=token)
-        return valid_scopes, username
+        if not claims.get("scope"):
+            raise TokenError({"code": "invalid_claims", "description": "Missing scope claim"})
+
+        if claims.get("exp") is None:
+            raise TokenError({"code": "invalid_claims", "description": "No expiration found on token"})
+
+        return Principal(
+            email=username,
+            tenant=tenant,
+            scopes=frozenset([*claims["scope"].split(), *(claims.get("permissions") or [])]),
+            expires_at=claims["exp"],
+        )
+
+    async def authorize_user_for_operation(self, token: str, scopes: Sequence) -> Tuple[bool, Principal]:
+        # Tokens are cached by digest once fully verified, so a repeat token goes straight to the scope check
+        token_digest = hashlib.sha256(token.encode()).digest()
+        principal = self._token_cache.get(token_digest)
+        if principal is None:
+            # Issuer, audience and signature are verified by the single decode of the token
+            claims = await self.validate_token(token=token, tenant_url=config_settings.AUTH0_ALLOWED_ISSUERS)
+            principal = self.build_principal(claims=claims)
+            self._token_cache.set(token_digest, principal, expires_at=principal.expires_at, size=len(token))
+
+        valid_scopes = self.validate_scopes(required_scopes=scopes, principal=principal)
+        return valid_scopes, principal
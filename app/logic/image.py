@@ -1,7 +1,8 @@
 # standard lib imports
+import asyncio
 import re
-from typing import Sequence, Optional
-from datetime import datetime, timedelta
+from typing import Dict, List, Sequence, Optional, Tuple
+from datetime import datetime
 from zoneinfo import ZoneInfo
 
 # third party imports
@@ -10,51 +11,137 @@ from fastapi import UploadFile
 # module imports
 from app.exceptions import BaseError
 from app.data.image import ImageData
+from app.data.storage import UploadBudget
 from app.data.user_image import UserImageData
 from app.data.user_alias import UserAliasData
-from app.models.image import ImageCreate, ImageUpdate, ImageResponse
-from app.models.user_image import UserImageCreate
+from app.models.image import ImageCreate, ImageUpdate, ImageResponse, ImageIngestResult, ImageIngestStatus
+
+# unowned candidates sampled per daily dollar claim before falling back to an ownership-aware sample
+DAILY_DOLLAR_CANDIDATES = 8
 
 
 class ImageLogic:
-    def __init__(self, image_data: ImageData, user_image_data: UserImageData, user_alias_data: UserAliasData):
+    def __init__(
+        self,
+        image_data: ImageData,
+        user_image_data: UserImageData,
+        user_alias_data: UserAliasData,
+        max_upload_file_bytes: int,
+        max_upload_request_bytes: int,
+        bulk_upload_concurrency: int,
+    ):
         self._image_data = image_data
         self._user_image_data = user_image_data
         self._user_alias_data = user_alias_data
+        self._max_upload_file_bytes = max_upload_file_bytes
+        self._max_upload_request_bytes = max_upload_request_bytes
+        self._bulk_upload_concurrency = bulk_upload_concurrency
+
+    def new_upload_budget(self) -> UploadBudget:
+        return UploadBudget(max_file_bytes=self._max_upload_file_bytes, max_request_bytes=self._max_upload_request_bytes)
 
-    async def create(self, image_file: UploadFile, user_email: str) -> int:
-        image_file.file.seek(0)
+    async def create(self, image_file: UploadFile, user_email: str, upload_budget: Optional[UploadBudget] = None) -> int:
         pattern = r"^[1-5]_[a-z0-9_']+[.][a-z]{3,4}$"
         if re.match(pattern, image_file.filename, re.IGNORECASE):
-            image = ImageCreate(
-                path="images",
-                file_name=image_file.filename,
-                description=image_file.filename[image_file.filename.find("_") : image_file.filename.rfind(".")].replace("_", " "),
-                rarity=image_file.filename[0],
-                created_by=user_email,
-                updated_by=user_email,
-            )
-            return await self._image_data.create(image=image, image_file=image_file)
+            image = self.build_image(file_name=image_file.filename, user_email=user_email)
+            return await self._image_data.create(image=image, image_file=image_file, upload_budget=upload_budget or self.new_upload_budget())
         else:
             raise BaseError({"code": "create:image", "description": "Incorrect file name schema"})
 
-    async def bulk_create(self, image_files: Sequence[UploadFile], user_email: str) -> int:
-        count = 0
-        existing_images = await self._image_data.read_s3()
-        for image_file in image_files:
-            if image_file.filename in existing_images:
-                count += await self.upsert(image_file=image_file, user_email=user_email)
+    async def bulk_create(self, image_files: Sequence[UploadFile], user_email: str) -> Sequence[ImageIngestResult]:
+        pattern = r"^[1-5]_[a-z0-9_']+[.][a-z]{3,4}$"
+        # one result per file, at the file's position in the request
+        results: List[Optional[ImageIngestResult]] = [None] * len(image_files)
+        accepted_files: Dict[str, int] = {}
+        for index, image_file in enumerate(image_files):
+            if image_file.filename in accepted_files:
+                results[index] = ImageIngestResult(file_name=image_file.filename, status=ImageIngestStatus.SKIPPED, detail="Duplicate file name in request")
+            elif not re.match(pattern, image_file.filename or "", re.IGNORECASE):
+                results[index] = ImageIngestResult(file_name=image_file.filename or "", status=ImageIngestStatus.FAILED, detail="Incorrect file name schema")
+            else:
+                accepted_files[image_file.filename] = index
+
+        # the image table is the manifest of the bucket: file name -> content hash of the stored object
+        manifest = await self._image_data.read_manifest(file_names=list(accepted_files))
+        upload_budget = self.new_upload_budget()
+        upload_slots = asyncio.Semaphore(self._bulk_upload_concurrency)
+        uploaded_images: Dict[int, ImageCreate] = {}
+
+        async def ingest(index: int) -> None:
+            image_file = image_files[index]
+            async with upload_slots:
+                try:
+                    # a stored hash that matches the spooled file means the object in storage is already current
+                    stored_hash = manifest.get(image_file.filename)
+                    if stored_hash is not None:
+                        content_hash, _ = await self._image_data.hash_file(image_file=image_file)
+                        if content_hash == stored_hash:
+                            results[index] = ImageIngestResult(file_name=image_file.filename, status=ImageIngestStatus.SKIPPED, detail="Unchanged content")
+                            return
+                    content_hash, byte_size = await self._image_data.upload_file(
+                        image_file=image_file, upload_budget=upload_budget, replace=image_file.filename in manifest
+                    )
+                except BaseError as e:
+                    results[index] = ImageIngestResult(file_name=image_file.filename, status=ImageIngestStatus.FAILED, detail=str(e.message))
+                    return
+            uploaded_images[index] = self.build_image(file_name=image_file.filename, user_email=user_email, content_hash=content_hash, byte_size=byte_size)
+
+        await asyncio.gather(*(ingest(index) for index in accepted_files.values()))
+
+        try:
+            created = await self._image_data.bulk_upsert(images=[uploaded_images[index] for index in sorted(uploaded_images)])
+        except BaseError as e:
+            await self._fail_uploaded_images(uploaded_images=uploaded_images, manifest=manifest, results=results, error=e)
+            return results
+
+        for index, image in uploaded_images.items():
+            if image.file_name not in created:
+                status, detail = ImageIngestStatus.SKIPPED, "Unchanged content"
+            elif created[image.file_name]:
+                status, detail = ImageIngestStatus.CREATED, None
             else:
-                count += await self.create(image_file=image_file, user_email=user_email)
-        return count
+                status, detail = ImageIngestStatus.UPDATED, None
+            results[index] = ImageIngestResult(file_name=image.file_name, status=status, detail=detail)
+        return results
+
+    async def _fail_uploaded_images(
+        self, uploaded_images: Dict[int, ImageCreate], manifest: Dict[str, Optional[str]], results: List[Optional[ImageIngestResult]], error: BaseError
+    ) -> None:
+        # objects new to the bucket have no catalog row without the upsert, so they are removed again; replaced objects
+        # already lost their previous content and stay, their rows keep the old hash so a retry uploads them again
+        new_file_names = [image.file_name for image in uploaded_images.values() if image.file_name not in manifest]
+        cleanup_detail = ""
+        if new_file_names:
+            try:
+                await self._image_data.delete_files(file_names=new_file_names)
+            except BaseError as e:
+                cleanup_detail = f"; the uploaded object was left in storage: {e.message}"
+        for index, image in uploaded_images.items():
+            detail = str(error.message) + (cleanup_detail if image.file_name in new_file_names else "")
+            results[index] = ImageIngestResult(file_name=image.file_name, status=ImageIngestStatus.FAILED, detail=detail)
+
+    def build_image(self, file_name: str, user_email: str, content_hash: Optional[str] = None, byte_size: Optional[int] = None) -> ImageCreate:
+        return ImageCreate(
+            path="images",
+            file_name=file_name,
+            description=file_name[file_name.find("_") : file_name.rfind(".")].replace("_", " "),
+            rarity=file_name[0],
+            content_hash=content_hash,
+            byte_size=byte_size,
+            created_by=user_email,
+            updated_by=user_email,
+        )
 
     async def read(
-        self, user_email: Optional[str], user_alias: Optional[str], opened: Optional[bool], limit: int, offset: int
-    ) -> Sequence[Optional[ImageResponse]]:
-        return await self._image_data.read(user_email=user_email, user_alias=user_alias, opened=opened, limit=limit, offset=offset)
+        self, user_email: Optional[str], user_alias: Optional[str], opened: Optional[bool], limit: int, offset: int, cursor: Optional[str] = None
+    ) -> Tuple[Sequence[Optional[ImageResponse]], Optional[str]]:
+        if user_alias and not user_email:
+            user_email = await self._user_alias_data.read_user_email(user_alias=user_alias)
+            if user_email is None:
+                return [], None
+        return await self._image_data.read(user_email=user_email, opened=opened, limit=limit, offset=offset, cursor=cursor)
 
-    async def upsert(self, image_file: UploadFile, user_email: str) -> int:
-        image_file.file.seek(0)
+    async def upsert(self, image_file: UploadFile, user_email: str, upload_budget: Optional[UploadBudget] = None) -> int:
         now = datetime.now(tz=ZoneInfo("America/Chicago"))
         pattern = r"^[1-5]_[a-z0-9_']+[.][a-z]{3,4}$"
         if re.match(pattern, image_file.filename, re.IGNORECASE):
@@ -66,7 +153,7 @@ class ImageLogic:
                 updated_by=user_email,
                 updated_on=now,
             )
-            return await self._image_data.upsert(image=image, image_file=image_file)
+            return await self._image_data.upsert(image=image, image_file=image_file, upload_budget=upload_budget or self.new_upload_budget())
         else:
             raise BaseError({"code": "create:image", "description": "Incorrect file name schema"})
 
@@ -76,7 +163,8 @@ class ImageLogic:
     async def open_image(self, user_email: str) -> Sequence[Optional[ImageResponse]]:
         user_image_id = await self._user_image_data.open_image(user_email=user_email)
         if user_image_id:
-            return await self._image_data.read(user_image_id=user_image_id)
+            images, _ = await self._image_data.read(user_image_id=user_image_id)
+            return images
         else:
             return []
 
@@ -84,13 +172,13 @@ class ImageLogic:
         return await self._image_data.read_random_unowned_images(user_email=user_email, quantity=quantity)
 
     async def daily_dollar(self, user_email: str) -> int:
-        ua_record = await self._user_alias_data.read(user_email=user_email, limit=1, offset=0)
-        now = datetime.now(tz=ZoneInfo("America/Chicago"))
-        if ua_record[0].daily_dollar < (now - timedelta(hours=24)):
+        # candidates come from the in-process catalog and the claim statement skips the ones already owned, so the
+        # usual claim is one round trip; only when every candidate is owned is the ownership set read to resample
+        image_id, eligible = await self._user_alias_data.daily_dollar(
+            user_email=user_email, image_ids=await self._image_data.read_random_images(quantity=DAILY_DOLLAR_CANDIDATES)
+        )
+        if image_id is None and eligible:
             image_ids = await self._image_data.read_random_unowned_images(user_email=user_email, quantity=1)
-            if len(image_ids) > 0:
-                await self._user_alias_data.daily_dollar(user_email=user_email)
-                return await self._user_image_data.create(
-                    user_image=UserImageCreate(user_email=user_email, image_id=image_ids[0], opened=False, created_by=user_email, updated_by=user_email)
-                )
-        return 0
+            if image_ids:
+                image_id, _ = await self._user_alias_data.daily_dollar(user_email=user_email, image_ids=image_ids)
+        return 1 if image_id is not None else 0
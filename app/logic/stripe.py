@@ -1,5 +1,6 @@
 # standard lib imports
 import json
+from typing import Sequence
 
 # third party imports
 import stripe
@@ -7,10 +8,8 @@ import stripe
 # module imports
 from app.data.image import ImageData
 from app.data.stripe import StripeData
-from app.data.user_image import UserImageData
 from app.exceptions import BaseError
 from app.models.stripe import StripeWebhook
-from app.models.user_image import UserImageCreate
 
 
 class StripeLogic:
@@ -22,7 +21,6 @@ class StripeLogic:
         stripe_webhook_secret: str,
         domain_url: str,
         image_data: ImageData,
-        user_image_data: UserImageData,
     ):
         stripe.api_key = stripe_secret_key
         self._stripe_data = stripe_data
@@ -30,7 +28,6 @@ class StripeLogic:
         self._stripe_webhook_secret = stripe_webhook_secret
         self._domain_url = domain_url
         self._image_data = image_data
-        self._user_image_data = user_image_data
 
     async def read(self, user_email: str, quantity: int) -> str:
         records = await self._image_data.read_random_unowned_images(user_email=user_email, quantity=quantity)
@@ -66,11 +63,5 @@ class StripeLogic:
         except stripe.error.SignatureVerificationError as e:
             raise BaseError({"code": "stripe_webhook", "description": e}) from e
 
-    async def gacha(self, user_email: str, quantity: int) -> int:
-        count = 0
-        image_ids = await self._image_data.read_random_unowned_images(user_email=user_email, quantity=quantity)
-        for image_id in image_ids:
-            count += await self._user_image_data.create(
-                user_image=UserImageCreate(user_email=user_email, image_id=image_id, opened=False, created_by=user_email, updated_by=user_email)
-            )
-        return count
+    async def gacha(self, user_email: str, quantity: int) -> Sequence[int]:
+        return await self._image_data.grant_random_unowned_images(user_email=user_email, quantity=quantity)
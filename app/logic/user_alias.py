@@ -5,12 +5,13 @@ from zoneinfo import ZoneInfo
 
 # module imports
 from app.data.user_alias import UserAliasData
-from app.models.user_alias import UserAlias, UserAliasBase, UserAliasCreate, UserAliasUpdate
+from app.models.user_alias import UserAlias, UserAliasBase, UserAliasCreate, UserAliasSearchResult, UserAliasUpdate
 
 
 class UserAliasLogic:
-    def __init__(self, user_alias_data: UserAliasData):
+    def __init__(self, user_alias_data: UserAliasData, search_max_results: int):
         self._user_alias_data = user_alias_data
+        self._search_max_results = search_max_results
 
     async def create(self, user_alias: UserAliasBase, user_email: str) -> int:
         now = datetime.now(tz=ZoneInfo("America/Chicago"))
@@ -22,6 +23,9 @@ class UserAliasLogic:
     async def read(self, user_alias: Optional[str], user_email: Optional[str], limit: int, offset: int) -> Sequence[Optional[UserAlias]]:
         return await self._user_alias_data.read(user_alias=user_alias, user_email=user_email, limit=limit, offset=offset)
 
+    async def search(self, query: str, limit: int) -> Sequence[UserAliasSearchResult]:
+        return await self._user_alias_data.search(query=query, limit=min(limit, self._search_max_results))
+
     async def update(self, user_alias: UserAliasBase, user_email: str) -> int:
         ua_record = await self._user_alias_data.read(user_email=user_email, limit=1, offset=0)
         now = datetime.now(tz=ZoneInfo("America/Chicago"))
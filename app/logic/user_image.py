@@ -1,5 +1,5 @@
 # standard lib imports
-from typing import Sequence, Optional
+from typing import Sequence, Optional, Tuple
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
@@ -16,8 +16,8 @@ class UserImageLogic:
         user_image = UserImageCreate(**user_image.model_dump(), created_by=user_email, updated_by=user_email)
         return await self._user_image_data.create(user_image=user_image)
 
-    async def read(self, limit: int, offset: int) -> Sequence[Optional[UserImage]]:
-        return await self._user_image_data.read(limit=limit, offset=offset)
+    async def read(self, limit: int, offset: int, cursor: Optional[str] = None) -> Tuple[Sequence[Optional[UserImage]], Optional[str]]:
+        return await self._user_image_data.read(limit=limit, offset=offset, cursor=cursor)
 
     async def read_rankings(self, limit: int, offset: int) -> Sequence[Optional[UserRankings]]:
         return await self._user_image_data.read_rankings(limit=limit, offset=offset)
@@ -6,10 +6,34 @@ from fastapi.middleware.cors import CORSMiddleware
 
 # module imports
 from app.config import get_settings
-from app.api.events import create_db_connection_pool, close_db_connection_pool
-from app.api.handlers import not_found_exception_handler, required_value_handler, auth_exception_handler, token_exception_handler
+from app.api.events import (
+    create_db_connection_pool,
+    close_db_connection_pool,
+    create_storage_backend_client,
+    close_storage_backend_client,
+    create_jwks_key_store,
+    close_jwks_key_store,
+    create_caches,
+)
+from app.api.handlers import (
+    not_found_exception_handler,
+    required_value_handler,
+    auth_exception_handler,
+    token_exception_handler,
+    invalid_cursor_handler,
+    payload_too_large_handler,
+    service_unavailable_handler,
+)
 from app.api.routers import healthcheck, image, user_image, user_alias, stripe
-from app.exceptions import NotFoundError, RequiredValueError, AuthError, TokenError
+from app.exceptions import (
+    NotFoundError,
+    RequiredValueError,
+    AuthError,
+    TokenError,
+    InvalidCursorError,
+    PayloadTooLargeError,
+    ServiceUnavailableError,
+)
 
 
 def get_application():
@@ -33,17 +57,26 @@ def get_application():
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "Retry-After"],
     )
 
     # register api event handlers
     fast_app.add_event_handler("startup", create_db_connection_pool(fast_app))
+    fast_app.add_event_handler("startup", create_storage_backend_client(fast_app))
+    fast_app.add_event_handler("startup", create_jwks_key_store(fast_app))
+    fast_app.add_event_handler("startup", create_caches(fast_app))
     fast_app.add_event_handler("shutdown", close_db_connection_pool(fast_app))
+    fast_app.add_event_handler("shutdown", close_storage_backend_client(fast_app))
+    fast_app.add_event_handler("shutdown", close_jwks_key_store(fast_app))
 
     # register api exception event handlers
     fast_app.add_exception_handler(NotFoundError, not_found_exception_handler)
     fast_app.add_exception_handler(RequiredValueError, required_value_handler)
     fast_app.add_exception_handler(AuthError, auth_exception_handler)
     fast_app.add_exception_handler(TokenError, token_exception_handler)
+    fast_app.add_exception_handler(InvalidCursorError, invalid_cursor_handler)
+    fast_app.add_exception_handler(PayloadTooLargeError, payload_too_large_handler)
+    fast_app.add_exception_handler(ServiceUnavailableError, service_unavailable_handler)
 
     # register api endpoints
     fast_app.include_router(healthcheck.router, tags=["healthcheck"])
@@ -0,0 +1,25 @@
+# standard lib imports
+from typing import FrozenSet
+
+# third party imports
+from pydantic import BaseModel, Field
+
+
+class Principal(BaseModel):
+    email: str = Field(..., title="email of user")
+    tenant: str = Field(..., title="Auth0 tenant of user")
+    scopes: FrozenSet[str] = Field(..., title="scopes and permissions granted on token")
+    expires_at: int = Field(..., title="expiration time of token in epoch seconds")
+    model_config = {
+        "frozen": True,
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "email": "example@email.com",
+                    "tenant": "jujugigi",
+                    "scopes": ["openid", "create:image"],
+                    "expires_at": "1713069997",
+                }
+            ]
+        },
+    }
@@ -1,5 +1,6 @@
 # standard lib imports
 from datetime import datetime
+from enum import Enum
 from typing import Optional, Any
 
 # third party imports
@@ -11,6 +12,8 @@ class ImageBase(BaseModel):
     file_name: str = Field(..., title="file_name of image")
     description: str = Field(..., title="description of image")
     rarity: int = Field(..., title="rarity of image")  # 1-5: common, uncommon, rare, epic, unique
+    content_hash: Optional[str] = Field(None, title="sha256 hex digest of image file")
+    byte_size: Optional[int] = Field(None, title="size of image file in bytes")
     model_config = {
         "json_schema_extra": {
             "examples": [
@@ -125,3 +128,27 @@ class ImageResponse(BaseModel):
             ]
         }
     }
+
+
+class ImageIngestStatus(str, Enum):
+    CREATED = "created"
+    UPDATED = "updated"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+
+class ImageIngestResult(BaseModel):
+    file_name: str = Field(..., title="file_name of uploaded image")
+    status: ImageIngestStatus = Field(..., title="outcome of the upload")
+    detail: Optional[str] = Field(None, title="reason the upload was skipped or failed")
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "file_name": "1_couch_potato.jpeg",
+                    "status": "created",
+                    "detail": None,
+                }
+            ]
+        }
+    }
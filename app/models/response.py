@@ -1,3 +1,6 @@
+# standard lib imports
+from typing import Dict, Optional
+
 # third party imports
 from pydantic import BaseModel, Field
 
@@ -52,3 +55,95 @@ class DeleteResponse(BaseModel):
             ]
         }
     }
+
+
+class CacheStats(BaseModel):
+    entries: int = Field(..., title="cached entry count")
+    bytes: int = Field(..., title="approximate cached size in bytes")
+    hits: int = Field(..., title="cache hit count")
+    misses: int = Field(..., title="cache miss count")
+    evictions: int = Field(..., title="cache eviction count")
+    hit_ratio: float = Field(..., title="hits over total lookups")
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "entries": "1",
+                    "bytes": "1024",
+                    "hits": "3",
+                    "misses": "1",
+                    "evictions": "0",
+                    "hit_ratio": "0.75",
+                }
+            ]
+        }
+    }
+
+
+class CoalescingCacheStats(BaseModel):
+    entries: int = Field(..., title="cached entry count")
+    hits: int = Field(..., title="cache hit count")
+    misses: int = Field(..., title="cache miss count, including coalesced misses")
+    coalesced: int = Field(..., title="misses that waited on an in-flight load")
+    invalidations: int = Field(..., title="cache invalidation count")
+    stale_marks: int = Field(..., title="writes marking the cache stale, applied in batches as invalidations")
+    hit_ratio: float = Field(..., title="hits over total lookups")
+    ttl: float = Field(..., title="entry lifetime in seconds")
+    stale_after: float = Field(..., title="seconds a stale mark waits before it is applied")
+    max_age: float = Field(..., title="age in seconds of the stalest cached entry")
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "entries": "1",
+                    "hits": "97",
+                    "misses": "3",
+                    "coalesced": "2",
+                    "invalidations": "1",
+                    "stale_marks": "40",
+                    "hit_ratio": "0.97",
+                    "ttl": "5",
+                    "stale_after": "1",
+                    "max_age": "1.5",
+                }
+            ]
+        }
+    }
+
+
+class AdmissionStats(BaseModel):
+    max_concurrency: int = Field(..., title="pooled connections allowed to be held at once")
+    in_use: int = Field(..., title="pooled connections currently held")
+    peak_in_use: int = Field(..., title="highest in_use seen at acquire")
+    queued: int = Field(..., title="connection acquires waiting for a slot")
+    admitted: Dict[str, int] = Field(..., title="connection acquire count by priority")
+    timeouts: int = Field(..., title="acquires refused after waiting the max acquire wait")
+    rejections: int = Field(..., title="acquires refused or displaced because the queue was full")
+    wait_seconds_sum: float = Field(..., title="total connection acquire wait in seconds")
+    wait_seconds_buckets: Dict[str, int] = Field(..., title="cumulative acquire count by wait upper bound in seconds")
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "max_concurrency": "10",
+                    "in_use": "4",
+                    "peak_in_use": "10",
+                    "queued": "0",
+                    "admitted": {"high": "12", "normal": "950", "low": "38"},
+                    "timeouts": "1",
+                    "rejections": "0",
+                    "wait_seconds_sum": "3.2",
+                    "wait_seconds_buckets": {"0.001": "900", "0.01": "990", "+Inf": "1000"},
+                }
+            ]
+        }
+    }
+
+
+class StatsResponse(BaseModel):
+    token_cache: CacheStats = Field(..., title="verified token cache stats")
+    signed_url_cache: CacheStats = Field(..., title="signed url cache stats")
+    user_alias_cache: CacheStats = Field(..., title="alias row cache stats")
+    rankings_cache: CoalescingCacheStats = Field(..., title="leaderboard page cache stats")
+    db_admission: AdmissionStats = Field(..., title="database admission control stats")
+    direct_db_admission: Optional[AdmissionStats] = Field(None, title="direct pool admission control stats, when enabled")
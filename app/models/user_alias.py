@@ -81,3 +81,16 @@ class UserAlias(UserAliasBase):
             ]
         }
     }
+
+
+class UserAliasSearchResult(BaseModel):
+    user_alias: str = Field(..., title="alias of user")
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "user_alias": "alias",
+                }
+            ]
+        }
+    }
@@ -1,21 +1,17 @@
 # standard lib imports
+import base64
+import json
+from datetime import datetime
 from typing import Dict, Any, Tuple, Set, List
 
+# module imports
+from app.exceptions import InvalidCursorError
+
 
 def filter_excluded_keys(mapped_dict: Dict[str, Any], excluded_keys: Set[str]) -> Dict[str, Any]:
     return {k: v for k, v in mapped_dict.items() if k not in excluded_keys}
 
 
-def build_insert_statement(mapped_dict: Dict[str, Any]) -> Tuple[str, str]:
-    values_statement = ", ".join(f":{k}" for k in mapped_dict)
-    fields_statement = values_statement.replace(":", "")
-    return fields_statement, values_statement
-
-
-def build_update_statement(mapped_dict: Dict[str, Any]) -> str:
-    return ", ".join(f"{k} = :{k}" for k in mapped_dict)
-
-
 def build_in_statement(filter_list: List[Any]) -> str:
     in_statement = ""
     count = 0
@@ -26,3 +22,16 @@ def build_in_statement(filter_list: List[Any]) -> str:
             in_statement += f", {str(val)}"
         count += 1
     return in_statement
+
+
+def encode_cursor(created_on: datetime, row_id: int) -> str:
+    payload = json.dumps([created_on.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_on, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(created_on), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(cursor=cursor) from e
@@ -0,0 +1,2 @@
+ALTER TABLE public.image ADD COLUMN IF NOT EXISTS content_hash varchar;
+ALTER TABLE public.image ADD COLUMN IF NOT EXISTS byte_size bigint;
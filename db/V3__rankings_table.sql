@@ -0,0 +1,30 @@
+DROP VIEW IF EXISTS public.rankings;
+
+CREATE TABLE IF NOT EXISTS public.rankings (
+    user_email varchar NOT NULL REFERENCES public.user_alias (user_email) ON UPDATE CASCADE ON DELETE CASCADE,
+    common_count int NOT NULL default 0,
+    uncommon_count int NOT NULL default 0,
+    rare_count int NOT NULL default 0,
+    epic_count int NOT NULL default 0,
+    unique_count int NOT NULL default 0,
+    total_count int NOT NULL default 0,
+    CONSTRAINT rankings_pk PRIMARY KEY (user_email)
+);
+CREATE INDEX IF NOT EXISTS rankings_index_leaderboard ON public.rankings (
+    total_count DESC, unique_count DESC, epic_count DESC, rare_count DESC, uncommon_count DESC, common_count DESC, user_email
+) WHERE total_count > 0;
+
+INSERT INTO public.rankings (user_email, common_count, uncommon_count, rare_count, epic_count, unique_count, total_count)
+SELECT
+    ui.user_email,
+    count(*) FILTER (WHERE i.rarity = 1),
+    count(*) FILTER (WHERE i.rarity = 2),
+    count(*) FILTER (WHERE i.rarity = 3),
+    count(*) FILTER (WHERE i.rarity = 4),
+    count(*) FILTER (WHERE i.rarity = 5),
+    count(*)
+FROM user_image ui
+JOIN image i ON i.image_id = ui.image_id
+WHERE ui.opened = TRUE
+GROUP BY ui.user_email
+ON CONFLICT (user_email) DO NOTHING;
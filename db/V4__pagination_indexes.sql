@@ -0,0 +1,4 @@
+-- keyset pagination seeks on (created_on, user_image_id); btree indexes serve the DESC order by scanning backwards
+CREATE INDEX IF NOT EXISTS user_image_index_created_on_user_image_id ON public.user_image (created_on, user_image_id);
+CREATE INDEX IF NOT EXISTS user_image_index_user_email_created_on_user_image_id ON public.user_image (user_email, created_on, user_image_id);
+DROP INDEX IF EXISTS public.user_image_index_created_on;
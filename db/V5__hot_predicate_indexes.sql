@@ -0,0 +1,4 @@
+-- open_image takes a user's oldest unopened pull; the partial index only holds the unopened backlog
+CREATE INDEX IF NOT EXISTS user_image_index_unopened_user_email_created_on ON public.user_image (user_email, created_on) WHERE opened = FALSE;
+-- image deletes check the user_image foreign key, and rarity changes look up the owners of an image
+CREATE INDEX IF NOT EXISTS user_image_index_image_id ON public.user_image (image_id);
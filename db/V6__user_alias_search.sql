@@ -0,0 +1,7 @@
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- the case-folded alias is generated, so every insert and update of user_alias keeps it in sync
+ALTER TABLE public.user_alias ADD COLUMN IF NOT EXISTS user_alias_normalized varchar GENERATED ALWAYS AS (lower(user_alias)) STORED;
+-- exact lookups resolve the email from the index alone; fails if existing aliases collide when case-folded
+CREATE UNIQUE INDEX IF NOT EXISTS user_alias_unique_user_alias_normalized ON public.user_alias (user_alias_normalized) INCLUDE (user_email);
+CREATE INDEX IF NOT EXISTS user_alias_index_user_alias_normalized_trgm ON public.user_alias USING gin (user_alias_normalized gin_trgm_ops);
@@ -0,0 +1,84 @@
+# standard lib imports
+import asyncio
+
+# third party imports
+import asyncpg
+import pytest
+
+# module imports
+from app.admission import AdmissionController
+from app.cache import CoalescingCache, LRUCache
+from app.data.database import AdmittedDatabase
+from app.data.direct_pool import DirectPool
+from app.data.rankings import RankingsData
+from app.data.user_image import UserImageData
+from timing import print_table, time_async_interleaved
+
+pytestmark = pytest.mark.benchmark
+
+ITERATIONS = 2000
+USER_EMAIL = "u1@example.com"
+
+
+def make_admission() -> AdmissionController:
+    return AdmissionController(max_concurrency=1, max_queue_depth=8, max_wait=1.0, retry_after=1)
+
+
+def test_databases_against_direct_pool_per_query(database_url, tmp_path, image_data):
+    async def main():
+        connection = await asyncpg.connect(database_url)
+        await connection.execute(
+            """
+            INSERT INTO user_alias (user_email, user_alias) SELECT 'u' || n || '@example.com', 'u' || n FROM generate_series(1, 200) AS n;
+            INSERT INTO image (path, file_name, description, rarity) SELECT 'images', n || '.jpeg', 'bench', 1 + n % 5 FROM generate_series(1, 100) AS n;
+            INSERT INTO user_image (user_email, image_id, opened)
+            SELECT 'u' || u || '@example.com', i.image_id, true FROM generate_series(1, 200) AS u JOIN image i ON i.image_id % 4 = u % 4;
+            ANALYZE;
+            """
+        )
+        await connection.close()
+
+        # one connection per pool, as in a worker under load, and both behind admission as in the app
+        db = AdmittedDatabase(url=database_url, admission=make_admission(), min_size=1, max_size=1, statement_cache_size=100)
+        direct_db = DirectPool(url=database_url, admission=make_admission(), min_size=1, max_size=1, statement_cache_size=100)
+        await db.connect()
+        await direct_db.connect()
+        try:
+            await RankingsData(db=db).rebuild()
+            pools = {"databases": (db, None), "direct": (db, direct_db)}
+            calls = {}
+            for name, (pool_db, pool_direct_db) in pools.items():
+                hot_db = pool_direct_db or pool_db
+                user_images = UserImageData(db=pool_db, direct_db=pool_direct_db, rankings_cache=CoalescingCache(ttl=0, max_entries=1))
+                images = image_data(
+                    db=pool_db,
+                    storage_root=str(tmp_path),
+                    direct_db=pool_direct_db,
+                    # every url of the page stays cached, so the timings are the query and the decode
+                    signed_url_cache=LRUCache(max_entries=1024),
+                    supabase_url_timeout=3600,
+                )
+
+                async def point_read(hot_db=hot_db):
+                    return await hot_db.fetch_val(query="SELECT user_alias FROM user_alias WHERE user_email = :user_email", values={"user_email": USER_EMAIL})
+
+                async def rankings_page(user_images=user_images):
+                    return await user_images._read_rankings(limit=25, offset=0)
+
+                async def image_page(images=images):
+                    return await images.read(user_email=USER_EMAIL, limit=25)
+
+                calls[f"point read, {name}"] = point_read
+                calls[f"rankings page 25 rows, {name}"] = rankings_page
+                calls[f"image page 25 rows, {name}"] = image_page
+            rows = await time_async_interleaved(calls, iterations=ITERATIONS)
+            return rows, {name: await call() for name, call in calls.items()}
+        finally:
+            await direct_db.disconnect()
+            await db.disconnect()
+
+    rows, results = asyncio.run(main())
+    print_table(f"hot queries, {ITERATIONS} calls each on one pooled connection per pool", rows)
+    for query in ("point read", "rankings page 25 rows", "image page 25 rows"):
+        assert results[f"{query}, direct"] == results[f"{query}, databases"]
+    assert len(results["rankings page 25 rows, direct"]) == len(results["image page 25 rows, direct"][0]) == 25
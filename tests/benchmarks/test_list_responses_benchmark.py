@@ -0,0 +1,89 @@
+# standard lib imports
+import asyncio
+from typing import List, Optional, Sequence
+
+# third party imports
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+# module imports
+from app.api.routers.image import image_responses
+from app.models.image import ImageResponse
+from timing import print_table, time_async_interleaved
+
+pytestmark = pytest.mark.benchmark
+
+ROW_COUNTS = (50, 500, 5000)
+
+
+def make_images(rows: int) -> List[ImageResponse]:
+    return [
+        ImageResponse(
+            path="images",
+            file_name=f"G{n}_couch_potato.jpeg",
+            description="a cat on a couch, looking at the camera",
+            rarity=1 + n % 5,
+            signedURL=f"https://project.supabase.co/storage/v1/object/sign/images/G{n}_couch_potato.jpeg?token=eyJhbGciOiJIUzI1NiJ9.{n:032d}.sig",
+        )
+        for n in range(rows)
+    ]
+
+
+def make_app(images: List[ImageResponse]) -> FastAPI:
+    # the same response_model and return values as GET /image with FAST_LIST_RESPONSES off and on
+    app = FastAPI()
+
+    @app.get("/default", response_model=Sequence[Optional[ImageResponse]])
+    async def default():
+        return images
+
+    @app.get("/fast", response_model=Sequence[Optional[ImageResponse]])
+    async def fast():
+        return image_responses.response(images)
+
+    return app
+
+
+def test_fast_list_responses_against_the_default_path():
+    async def main():
+        field = create_response_field(name="image_list", type_=Sequence[Optional[ImageResponse]])
+        results = {}
+        for rows in ROW_COUNTS:
+            images = make_images(rows)
+
+            async def default_serialize(images=images):
+                JSONResponse(content=await serialize_response(field=field, response_content=images))
+
+            async def fast_serialize(images=images):
+                image_responses.response(images)
+
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=make_app(images)), base_url="http://bench") as client:
+                default_body = (await client.get("/default")).json()
+                fast_body = (await client.get("/fast")).json()
+                assert fast_body == default_body
+
+                async def default_request(client=client):
+                    (await client.get("/default")).raise_for_status()
+
+                async def fast_request(client=client):
+                    (await client.get("/fast")).raise_for_status()
+
+                results[rows] = await time_async_interleaved(
+                    {
+                        "default, serialize": default_serialize,
+                        "FAST_LIST_RESPONSES, serialize": fast_serialize,
+                        "default, request": default_request,
+                        "FAST_LIST_RESPONSES, request": fast_request,
+                    },
+                    iterations=max(100, 50000 // rows),
+                    warmup=5,
+                )
+        return results
+
+    results = asyncio.run(main())
+    for rows, table in results.items():
+        print_table(f"GET /image list of {rows} ImageResponse", table)
@@ -0,0 +1,133 @@
+# standard lib imports
+import asyncio
+import itertools
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+# third party imports
+import asyncpg
+import pytest
+from databases import Database
+
+# module imports
+from app.data.statements import UPDATE_USER_ALIAS
+from timing import print_table, time_async_interleaved, time_sync
+
+pytestmark = pytest.mark.benchmark
+
+USER_EMAIL = "bench@example.com"
+ITERATIONS = 2000
+# the fields a UserAliasUpdate has set with exclude_unset, which is what shaped the old statement text
+SHAPES = [("user_alias",), ("daily_dollar",), ("user_alias", "daily_dollar")]
+
+
+def build_update_query(mapped_dict: Dict[str, Any]) -> str:
+    # the query UserAliasData.update built per call before the statement registry
+    update_statement = ", ".join(f"{k} = :{k}" for k in mapped_dict)
+    return f"""
+        WITH update_user_alias as (
+            UPDATE user_alias SET {update_statement}
+            WHERE user_email = :user_email RETURNING *
+        ) SELECT COUNT(*) as updated
+        FROM update_user_alias
+    """
+
+
+def build_returning_update_query(mapped_dict: Dict[str, Any]) -> str:
+    # the same work as UPDATE_USER_ALIAS, with the SET list built from the fields that were sent
+    update_statement = ", ".join(f"{k} = :{k}" for k in mapped_dict if k != "user_email")
+    return f"""
+        UPDATE user_alias ua SET {update_statement}
+        FROM user_alias previous
+        WHERE ua.user_email = :user_email
+        AND previous.user_alias_id = ua.user_alias_id
+        RETURNING ua.*, previous.user_alias_normalized AS previous_user_alias_normalized
+    """
+
+
+def update_values(shape: tuple, index: int) -> Dict[str, Any]:
+    values = {"user_alias": f"bench-{index}", "daily_dollar": datetime.now(tz=timezone.utc)}
+    mapped_dict = {field: values[field] for field in shape}
+    mapped_dict.update({"updated_by": "bench", "updated_on": datetime.now(tz=timezone.utc), "user_email": USER_EMAIL})
+    return mapped_dict
+
+
+def registry_values(shape: tuple, index: int) -> Dict[str, Any]:
+    mapped_dict = update_values(shape=shape, index=index)
+    return {
+        "user_alias": mapped_dict.get("user_alias"),
+        "daily_dollar": mapped_dict.get("daily_dollar"),
+        "set_user_alias": "user_alias" in shape,
+        "set_daily_dollar": "daily_dollar" in shape,
+        "updated_by": mapped_dict["updated_by"],
+        "updated_on": mapped_dict["updated_on"],
+        "user_email": USER_EMAIL,
+    }
+
+
+async def prepared_count(db: Database, marker: str, excluding: str = "pg_prepared_statements") -> int:
+    return await db.fetch_val(
+        query="""
+            SELECT COUNT(*) FROM pg_prepared_statements
+            WHERE statement LIKE :marker AND statement NOT LIKE :excluding AND statement NOT LIKE '%pg_prepared_statements%'
+        """,
+        values={"marker": f"%{marker}%", "excluding": f"%{excluding}%"},
+    )
+
+
+def test_registry_against_per_call_built_update(database_url):
+    async def main():
+        connection = await asyncpg.connect(database_url)
+        await connection.execute("INSERT INTO user_alias (user_email, user_alias) VALUES ($1, 'bench')", USER_EMAIL)
+
+        # one pooled connection, so both paths see a single asyncpg statement cache
+        db = Database(url=database_url, min_size=1, max_size=1)
+        await db.connect()
+        try:
+            shapes, counter = itertools.cycle(SHAPES), itertools.count()
+
+            async def built_call():
+                mapped_dict = update_values(shape=next(shapes), index=next(counter))
+                await db.fetch_val(query=build_update_query(mapped_dict), values=mapped_dict, column="updated")
+
+            async def built_returning_call():
+                mapped_dict = update_values(shape=next(shapes), index=next(counter))
+                await db.fetch_one(query=build_returning_update_query(mapped_dict), values=mapped_dict)
+
+            async def registry_call():
+                values = registry_values(shape=next(shapes), index=next(counter))
+                await db.fetch_one(query=UPDATE_USER_ALIAS.sql, values=UPDATE_USER_ALIAS.bind(values))
+
+            async def registry_direct_call():
+                values = registry_values(shape=next(shapes), index=next(counter))
+                await connection.fetchrow(UPDATE_USER_ALIAS.positional_sql, *UPDATE_USER_ALIAS.args(values))
+
+            rows = await time_async_interleaved(
+                {
+                    "baseline count query, build + execute": built_call,
+                    "per-call built, build + execute": built_returning_call,
+                    "registry, bind + execute": registry_call,
+                    "registry, positional_sql on asyncpg": registry_direct_call,
+                },
+                iterations=ITERATIONS,
+            )
+            prepared = {
+                "baseline count query": await prepared_count(db, marker="WITH update_user_alias as"),
+                "per-call built": await prepared_count(db, marker="UPDATE user_alias ua SET", excluding="CASE WHEN"),
+                "registry": await prepared_count(db, marker="CASE WHEN CAST"),
+            }
+        finally:
+            await db.disconnect()
+            await connection.close()
+
+        mapped_dict = update_values(shape=SHAPES[2], index=0)
+        rows["per-call built, build only"] = time_sync(lambda: build_returning_update_query(mapped_dict), iterations=ITERATIONS)
+        values = registry_values(shape=SHAPES[2], index=0)
+        rows["registry, bind only"] = time_sync(lambda: UPDATE_USER_ALIAS.bind(values), iterations=ITERATIONS)
+        return rows, prepared
+
+    rows, prepared = asyncio.run(main())
+    print_table(f"UserAliasData.update, {ITERATIONS} calls cycling {len(SHAPES)} field shapes on one connection", rows)
+    print(f"  prepared statements on the connection: {prepared}")
+    # every shape is its own statement text before, one text covers them all after
+    assert prepared == {"baseline count query": len(SHAPES), "per-call built": len(SHAPES), "registry": 1}
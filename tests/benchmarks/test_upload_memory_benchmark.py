@@ -0,0 +1,145 @@
+# standard lib imports
+import asyncio
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import AsyncIterable, AsyncIterator, Optional
+
+# third party imports
+import pytest
+from databases import Database
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+# module imports
+from app.data.storage import SupabaseStorageBackend
+from app.models.image import ImageIngestStatus
+
+pytestmark = pytest.mark.benchmark
+
+MIB = 1024 * 1024
+CHUNK_SIZE = 256 * 1024
+FILE_SIZE = 8 * MIB
+FILE_COUNT = 24
+BULK_UPLOAD_CONCURRENCY = 4
+# each concurrent upload may hold a few chunks in flight plus the http client's buffers, never its file
+STREAMING_RSS_BUDGET = BULK_UPLOAD_CONCURRENCY * 8 * CHUNK_SIZE
+
+
+def proc_status_bytes(field: str) -> int:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1]) * 1024
+    raise KeyError(field)
+
+
+def reset_peak_rss() -> int:
+    # restarts VmHWM at the current resident set, which is returned as the baseline
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")
+    return proc_status_bytes("VmRSS")
+
+
+class BufferingStorageBackend(SupabaseStorageBackend):
+    # what ImageData sent before streaming, each file read whole into memory before the request
+    async def upload(self, path: str, stream: AsyncIterable[bytes], content_type: str, content_length: Optional[int] = None) -> None:
+        await super().upload(path=path, stream=self._buffer(stream), content_type=content_type, content_length=content_length)
+
+    @staticmethod
+    async def _buffer(stream: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+        body = bytearray()
+        async for chunk in stream:
+            body += chunk
+        yield body
+
+
+class DiscardingHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        remaining = int(self.headers["content-length"])
+        while remaining:
+            remaining -= len(self.rfile.read(min(remaining, 64 * 1024)))
+        body = b'{"Key": "images/upload.jpeg"}'
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def spooled_uploads(prefix: str, count: int, size: int, block: bytes) -> list:
+    uploads = []
+    for n in range(count):
+        # the multipart parser's spool file, rolled over to disk past 1 MiB like starlette's
+        spool = tempfile.SpooledTemporaryFile(max_size=MIB)
+        for _ in range(size // len(block)):
+            spool.write(block)
+        spool.write(block[: size % len(block)])
+        uploads.append(UploadFile(file=spool, size=size, filename=f"1_{prefix}_{n}.jpeg", headers=Headers({"content-type": "image/jpeg"})))
+    return uploads
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/clear_refs"), reason="peak RSS reset needs Linux /proc")
+def test_bulk_create_peak_rss_stays_within_budget(database_url, tmp_path, image_logic):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), DiscardingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    async def measure(mode: str, db: Database, block: bytes) -> int:
+        storage_type = BufferingStorageBackend if mode == "buffered" else SupabaseStorageBackend
+        storage = storage_type(
+            url=f"http://127.0.0.1:{server.server_port}",
+            service_key="service-key",
+            bucket="images",
+            timeout=60,
+            connect_timeout=5,
+            max_connections=BULK_UPLOAD_CONCURRENCY,
+            max_keepalive_connections=BULK_UPLOAD_CONCURRENCY,
+        )
+        logic = image_logic(
+            db=db,
+            storage_root=str(tmp_path),
+            max_upload_file_bytes=FILE_SIZE,
+            max_upload_request_bytes=FILE_COUNT * FILE_SIZE,
+            bulk_upload_concurrency=BULK_UPLOAD_CONCURRENCY,
+            storage=storage,
+            upload_chunk_size=CHUNK_SIZE,
+        )
+        try:
+            # a small batch first, so the client's connections and the code paths are in the baseline
+            await logic.bulk_create(image_files=spooled_uploads(f"{mode}_warmup", BULK_UPLOAD_CONCURRENCY, CHUNK_SIZE, block), user_email="admin@example.com")
+            image_files = spooled_uploads(mode, FILE_COUNT, FILE_SIZE, block)
+            baseline = reset_peak_rss()
+            results = await logic.bulk_create(image_files=image_files, user_email="admin@example.com")
+            peak = proc_status_bytes("VmHWM")
+        finally:
+            await storage.close()
+        assert [result.status for result in results] == [ImageIngestStatus.CREATED] * FILE_COUNT
+        return peak - baseline
+
+    async def main():
+        db = Database(url=database_url, min_size=1, max_size=2)
+        await db.connect()
+        try:
+            block = os.urandom(MIB)
+            # streaming first, so it cannot reuse memory the buffered run freed
+            return {mode: await measure(mode, db=db, block=block) for mode in ("streaming", "buffered")}
+        finally:
+            await db.disconnect()
+
+    try:
+        growth = asyncio.run(main())
+    finally:
+        server.shutdown()
+
+    print(
+        f"\npeak RSS growth of bulk_create, {FILE_COUNT} files of {FILE_SIZE // MIB} MiB, "
+        f"{BULK_UPLOAD_CONCURRENCY} concurrent uploads, {CHUNK_SIZE // 1024} KiB chunks"
+    )
+    for mode, bytes_grown in growth.items():
+        print(f"  {mode:<10} {bytes_grown / MIB:>8.1f} MiB")
+    assert growth["buffered"] >= FILE_SIZE
+    assert growth["streaming"] < STREAMING_RSS_BUDGET
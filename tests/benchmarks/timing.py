@@ -0,0 +1,56 @@
+# standard lib imports
+import statistics
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+
+# per-call microseconds of `iterations` calls after `warmup` untimed ones
+async def time_async(call: Callable[[], Awaitable[Any]], iterations: int, warmup: int = 50) -> Dict[str, float]:
+    for _ in range(warmup):
+        await call()
+    return summarize(await sample_async(call, iterations=iterations))
+
+
+async def sample_async(call: Callable[[], Awaitable[Any]], iterations: int) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        started_at = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - started_at) * 1e6)
+    return samples
+
+
+# alternating rounds, so drift in the database (bloat, checkpoints) hits every call alike
+async def time_async_interleaved(
+    calls: Dict[str, Callable[[], Awaitable[Any]]], iterations: int, rounds: int = 10, warmup: int = 50
+) -> Dict[str, Dict[str, float]]:
+    for call in calls.values():
+        for _ in range(warmup):
+            await call()
+    samples: Dict[str, List[float]] = {name: [] for name in calls}
+    for _ in range(rounds):
+        for name, call in calls.items():
+            samples[name] += await sample_async(call, iterations=iterations // rounds)
+    return {name: summarize(samples[name]) for name in calls}
+
+
+def time_sync(call: Callable[[], Any], iterations: int, warmup: int = 50) -> Dict[str, float]:
+    for _ in range(warmup):
+        call()
+    samples = []
+    for _ in range(iterations):
+        started_at = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - started_at) * 1e6)
+    return summarize(samples)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {"mean": statistics.fmean(samples), "p50": samples[len(samples) // 2], "p99": samples[int(len(samples) * 0.99) - 1]}
+
+
+def print_table(title: str, rows: Dict[str, Dict[str, float]], unit: str = "us") -> None:
+    print(f"\n{title}")
+    for name, row in rows.items():
+        print(f"  {name:<40} " + "  ".join(f"{key} {value:>10.1f} {unit}" for key, value in row.items()))
@@ -0,0 +1,153 @@
+# standard lib imports
+import asyncio
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Iterator, NamedTuple
+
+# app.config reads these when it is imported, the tests only need them to be well-formed
+for name, value in {
+    "DEV_DOMAIN": "http://localhost:5173",
+    "AUTH0_ALLOWED_ISSUERS": "https://jujugigi.test/",
+    "AUTH0_ALGORITHMS": "RS256",
+    "AUTH0_DOMAIN": "jujugigi.test",
+    "AUTH0_API_AUDIENCE": "jujugigi-test",
+    "AUTH0_TOKEN_NAMESPACE": "https://jujugigi.test",
+    "AUTH0_ISSUER": "https://jujugigi.test/",
+    "AUTH0_TENANT": "jujugigi",
+    "SUPABASE_URL": "http://supabase.test",
+    "SUPABASE_BUCKET": "jujugigi-test",
+    "SUPABASE_SERVICE_KEY": "service-key",
+    "SUPABASE_URL_TIMEOUT": "60",
+    "GACHA_PRICE": "100",
+    "DEV_STRIPE_SECRET_KEY": "sk_test",
+    "DEV_STRIPE_PRICE_ID": "price_test",
+    "DEV_STRIPE_WEBHOOK_SECRET": "whsec_test",
+    "LOCAL_DATABASE_URL": os.environ.get("TEST_DATABASE_URL", "postgresql://localhost/jujugigi"),
+}.items():
+    os.environ.setdefault(name, value)
+
+# third party imports
+import asyncpg
+import pytest
+from databases import DatabaseURL
+
+# module imports
+from app.cache import CoalescingCache, LRUCache
+from app.data.image import ImageData
+from app.data.image_sampler import ImageSampler
+from app.data.storage import LocalStorageBackend
+from app.data.user_alias import UserAliasData
+from app.data.user_image import UserImageData
+from app.logic.image import ImageLogic
+
+MIGRATIONS_PATH = Path(__file__).resolve().parent.parent / "db"
+MIGRATION_VERSION_PATTERN = re.compile(r"^V(\d+)__")
+
+
+class MigratedDatabase(NamedTuple):
+    url: str
+    # the trigram index of V6 is only created when the server ships pg_trgm
+    pg_trgm: bool
+
+
+def migration_files() -> list:
+    return sorted(MIGRATIONS_PATH.glob("V*__*.sql"), key=lambda path: int(MIGRATION_VERSION_PATTERN.match(path.name).group(1)))
+
+
+async def _create_database(server_url: DatabaseURL, name: str) -> bool:
+    connection = await asyncpg.connect(str(server_url))
+    try:
+        await connection.execute(f'CREATE DATABASE "{name}"')
+    finally:
+        await connection.close()
+
+    connection = await asyncpg.connect(str(server_url.replace(database=name)))
+    try:
+        pg_trgm = bool(await connection.fetchval("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"))
+        for path in migration_files():
+            sql = path.read_text()
+            if not pg_trgm:
+                sql = ";".join(statement for statement in sql.split(";") if "trgm" not in statement)
+            await connection.execute(sql)
+    finally:
+        await connection.close()
+    return pg_trgm
+
+
+async def _drop_database(server_url: DatabaseURL, name: str) -> None:
+    connection = await asyncpg.connect(str(server_url))
+    try:
+        await connection.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+    finally:
+        await connection.close()
+
+
+# the session creates a throwaway database on TEST_DATABASE_URL, e.g. postgresql://postgres@localhost:5432/postgres,
+# migrates it with db/V*.sql and drops it afterwards; without TEST_DATABASE_URL the database tests are skipped
+@pytest.fixture(scope="session")
+def migrated_database() -> Iterator[MigratedDatabase]:
+    if not os.environ.get("TEST_DATABASE_URL"):
+        pytest.skip("TEST_DATABASE_URL is not set")
+    server_url = DatabaseURL(os.environ["TEST_DATABASE_URL"])
+    name = f"jujugigi_test_{uuid.uuid4().hex[:8]}"
+    pg_trgm = asyncio.run(_create_database(server_url=server_url, name=name))
+    try:
+        yield MigratedDatabase(url=str(server_url.replace(database=name)), pg_trgm=pg_trgm)
+    finally:
+        asyncio.run(_drop_database(server_url=server_url, name=name))
+
+
+# the migrated database, emptied again after the test
+@pytest.fixture
+def database_url(migrated_database: MigratedDatabase) -> Iterator[str]:
+    yield migrated_database.url
+
+    async def _truncate() -> None:
+        connection = await asyncpg.connect(migrated_database.url)
+        try:
+            await connection.execute("TRUNCATE user_image, rankings, user_alias, image, stripe RESTART IDENTITY CASCADE")
+        finally:
+            await connection.close()
+
+    asyncio.run(_truncate())
+
+
+@pytest.fixture(scope="session")
+def image_data() -> Callable[..., ImageData]:
+    # keyword overrides replace the matching ImageData arguments, e.g. storage or direct_db
+    def _image_data(db: Any, storage_root: str, **overrides: Any) -> ImageData:
+        options = {
+            "storage": LocalStorageBackend(root=storage_root, bucket="images"),
+            "signed_url_cache": LRUCache(max_entries=8),
+            "image_sampler": ImageSampler(refresh_interval=300),
+            "supabase_url_timeout": 60,
+            "signed_url_min_ttl_fraction": 0.5,
+            "upload_chunk_size": 1024,
+        }
+        return ImageData(db=db, **{**options, **overrides})
+
+    return _image_data
+
+
+@pytest.fixture(scope="session")
+def image_logic(image_data: Callable[..., ImageData]) -> Callable[..., ImageLogic]:
+    def _image_logic(
+        db: Any,
+        storage_root: str,
+        max_upload_file_bytes: int = 1024 * 1024,
+        max_upload_request_bytes: int = 8 * 1024 * 1024,
+        bulk_upload_concurrency: int = 4,
+        **image_data_overrides: Any,
+    ) -> ImageLogic:
+        return ImageLogic(
+            image_data=image_data(db=db, storage_root=storage_root, **image_data_overrides),
+            user_image_data=UserImageData(db=db, rankings_cache=CoalescingCache(ttl=5, max_entries=8)),
+            user_alias_data=UserAliasData(db=db, user_alias_cache=LRUCache(max_entries=8), user_alias_cache_ttl=60),
+            max_upload_file_bytes=max_upload_file_bytes,
+            max_upload_request_bytes=max_upload_request_bytes,
+            bulk_upload_concurrency=bulk_upload_concurrency,
+        )
+
+    return _image_logic
@@ -0,0 +1,227 @@
+# standard lib imports
+import asyncio
+
+# third party imports
+import asyncpg
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+# module imports
+from app.admission import DB_PRIORITY, AdmissionController, Priority
+from app.api.dependencies import db_priority
+from app.api.events import close_db_connection_pool, create_db_connection_pool, db_pool_max_sizes
+from app.cache import CoalescingCache
+from app.config import LocalConfig
+from app.data.database import AdmittedDatabase
+from app.data.direct_pool import DirectPool
+from app.data.user_image import UserImageData
+from app.exceptions import ServiceUnavailableError
+
+
+def make_admission(max_concurrency: int = 1, max_queue_depth: int = 8, max_wait: float = 1.0) -> AdmissionController:
+    return AdmissionController(max_concurrency=max_concurrency, max_queue_depth=max_queue_depth, max_wait=max_wait, retry_after=1)
+
+
+def test_waiters_are_admitted_by_priority_then_arrival():
+    async def main():
+        admission = make_admission()
+        order = []
+
+        async def acquire(name, priority):
+            async with admission.admit(priority):
+                order.append(name)
+
+        await admission.acquire(Priority.NORMAL)
+        tasks = [
+            asyncio.ensure_future(acquire("low", Priority.LOW)),
+            asyncio.ensure_future(acquire("normal-1", Priority.NORMAL)),
+            asyncio.ensure_future(acquire("high", Priority.HIGH)),
+            asyncio.ensure_future(acquire("normal-2", Priority.NORMAL)),
+        ]
+        await asyncio.sleep(0)
+        admission.release()
+        await asyncio.gather(*tasks)
+        return order, admission.stats()
+
+    order, stats = asyncio.run(main())
+    assert order == ["high", "normal-1", "normal-2", "low"]
+    assert stats["in_use"] == 0
+    assert stats["queued"] == 0
+    assert stats["admitted"] == {"high": 1, "normal": 3, "low": 1}
+
+
+def test_full_queue_sheds_the_lowest_priority_waiter():
+    async def main():
+        admission = make_admission(max_queue_depth=1)
+        await admission.acquire(Priority.NORMAL)
+        low = asyncio.ensure_future(admission.acquire(Priority.LOW))
+        await asyncio.sleep(0)
+        high = asyncio.ensure_future(admission.acquire(Priority.HIGH))
+        await asyncio.sleep(0)
+        with pytest.raises(ServiceUnavailableError):
+            await low
+        # an equal priority newcomer is refused rather than displacing the queued one
+        with pytest.raises(ServiceUnavailableError):
+            await admission.acquire(Priority.HIGH)
+        admission.release()
+        await high
+        admission.release()
+        return admission.stats()
+
+    stats = asyncio.run(main())
+    assert stats["rejections"] == 2
+    assert stats["in_use"] == 0
+
+
+def test_acquire_times_out_after_max_wait():
+    async def main():
+        admission = make_admission(max_wait=0.01)
+        await admission.acquire(Priority.HIGH)
+        with pytest.raises(ServiceUnavailableError):
+            await admission.acquire(Priority.HIGH)
+        admission.release()
+        return admission.stats()
+
+    stats = asyncio.run(main())
+    assert stats["timeouts"] == 1
+    assert stats["queued"] == 0
+    assert stats["in_use"] == 0
+
+
+def test_route_priority_reaches_the_endpoint_context():
+    app = FastAPI()
+
+    @app.get("/high", dependencies=[Depends(db_priority(Priority.HIGH))])
+    async def high():
+        return DB_PRIORITY.get().name
+
+    @app.get("/default")
+    async def default():
+        return DB_PRIORITY.get().name
+
+    client = TestClient(app)
+    assert client.get("/high").json() == "HIGH"
+    assert client.get("/default").json() == "NORMAL"
+
+
+def test_slots_are_held_only_while_a_connection_is(database_url):
+    async def main():
+        admission = make_admission(max_concurrency=2)
+        db = AdmittedDatabase(url=database_url, admission=admission, min_size=1, max_size=2)
+        await db.connect()
+        try:
+            async with db.transaction():
+                await db.fetch_val(query="SELECT 1")
+                in_transaction = admission.stats()["in_use"]
+            after_transaction = admission.stats()["in_use"]
+
+            # four concurrent queries share the two slots and all complete
+            values = await asyncio.gather(*(db.fetch_val(query="SELECT pg_sleep(0.05), 1", column=1) for _ in range(4)))
+            return in_transaction, after_transaction, values, admission.stats()
+        finally:
+            await db.disconnect()
+
+    in_transaction, after_transaction, values, stats = asyncio.run(main())
+    assert in_transaction == 1
+    assert after_transaction == 0
+    assert values == [1, 1, 1, 1]
+    assert stats["peak_in_use"] == 2
+    assert stats["in_use"] == 0
+    assert stats["wait_seconds_buckets"]["+Inf"] == sum(stats["admitted"].values())
+
+
+def test_cached_rankings_page_does_not_need_a_slot(database_url):
+    async def main():
+        admission = make_admission(max_wait=0.05)
+        db = AdmittedDatabase(url=database_url, admission=admission, min_size=1, max_size=1)
+        await db.connect()
+        try:
+            user_image_data = UserImageData(db=db, rankings_cache=CoalescingCache(ttl=60, max_entries=8))
+            cached = await user_image_data.read_rankings(limit=10, offset=0)
+
+            # with every slot taken, the cached page is still served and only an uncached one is refused
+            await admission.acquire(Priority.HIGH)
+            try:
+                assert await user_image_data.read_rankings(limit=10, offset=0) == cached
+                with pytest.raises(ServiceUnavailableError):
+                    await user_image_data.read_rankings(limit=10, offset=10)
+            finally:
+                admission.release()
+        finally:
+            await db.disconnect()
+
+    asyncio.run(main())
+
+
+def test_direct_pool_comes_out_of_the_connection_budget():
+    assert db_pool_max_sizes(LocalConfig(MAX_DB_POOL_SIZE=10, DIRECT_DB_POOL_ENABLED=False, MAX_DIRECT_DB_POOL_SIZE=3)) == (10, 0)
+    assert db_pool_max_sizes(LocalConfig(MAX_DB_POOL_SIZE=10, DIRECT_DB_POOL_ENABLED=True, MAX_DIRECT_DB_POOL_SIZE=3)) == (7, 3)
+    with pytest.raises(ValueError):
+        db_pool_max_sizes(LocalConfig(MAX_DB_POOL_SIZE=3, DIRECT_DB_POOL_ENABLED=True, MAX_DIRECT_DB_POOL_SIZE=3))
+
+
+def test_direct_pool_acquires_take_admission_slots(database_url):
+    async def main():
+        admission = make_admission(max_wait=0.05)
+        direct_db = DirectPool(url=database_url, admission=admission, min_size=1, max_size=1, statement_cache_size=100)
+        await direct_db.connect()
+        try:
+            await admission.acquire(Priority.HIGH)
+            try:
+                with pytest.raises(ServiceUnavailableError):
+                    await direct_db.fetch_val(query="SELECT 1")
+            finally:
+                admission.release()
+
+            async with direct_db.transaction() as connection:
+                await connection.fetch_val(query="SELECT 1")
+                in_transaction = admission.stats()["in_use"]
+
+            DB_PRIORITY.set(Priority.LOW)
+            values = await asyncio.gather(*(direct_db.fetch_val(query="SELECT pg_sleep(0.02), 1", column=1) for _ in range(3)))
+            return in_transaction, values, admission.stats()
+        finally:
+            await direct_db.disconnect()
+
+    in_transaction, values, stats = asyncio.run(main())
+    assert in_transaction == 1
+    assert values == [1, 1, 1]
+    assert stats["in_use"] == 0
+    assert stats["timeouts"] == 1
+    assert stats["admitted"]["low"] == 3
+
+
+def test_both_pools_stay_within_max_db_pool_size(database_url):
+    async def main():
+        app = FastAPI()
+        app.state.config = LocalConfig(
+            DATABASE_URL=database_url,
+            MIN_DB_POOL_SIZE=4,
+            MAX_DB_POOL_SIZE=4,
+            DIRECT_DB_POOL_ENABLED=True,
+            MIN_DIRECT_DB_POOL_SIZE=1,
+            MAX_DIRECT_DB_POOL_SIZE=2,
+            DB_ADMISSION_MAX_QUEUE_DEPTH=64,
+        )
+        await create_db_connection_pool(app)()
+        try:
+            query = "SELECT COUNT(*) FROM pg_stat_activity WHERE datname = current_database() AND pid <> pg_backend_pid()"
+            load = [app.state.database.fetch_val(query="SELECT pg_sleep(0.1)") for _ in range(10)]
+            load += [app.state.direct_database.fetch_val(query="SELECT pg_sleep(0.1)") for _ in range(10)]
+            tasks = asyncio.gather(*load)
+            await asyncio.sleep(0.05)
+            observer = await asyncpg.connect(database_url)
+            try:
+                connections = await observer.fetchval(query)
+            finally:
+                await observer.close()
+            await tasks
+            return connections, app.state.db_admission.stats(), app.state.direct_db_admission.stats()
+        finally:
+            await close_db_connection_pool(app)()
+
+    connections, db_stats, direct_stats = asyncio.run(main())
+    assert connections == 4
+    assert (db_stats["max_concurrency"], db_stats["peak_in_use"]) == (2, 2)
+    assert (direct_stats["max_concurrency"], direct_stats["peak_in_use"]) == (2, 2)
@@ -0,0 +1,91 @@
+# standard lib imports
+import asyncio
+import io
+import os
+
+# third party imports
+import asyncpg
+from databases import Database
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+# module imports
+from app.models.image import ImageIngestStatus
+
+
+def upload(file_name: str, content: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), size=len(content), filename=file_name, headers=Headers({"content-type": "image/jpeg"}))
+
+
+def stored_files(storage_root: str) -> list:
+    images = os.path.join(storage_root, "images", "images")
+    return sorted(os.listdir(images)) if os.path.isdir(images) else []
+
+
+def test_results_follow_the_request_order(database_url, tmp_path, image_logic):
+    async def main():
+        db = Database(url=database_url, min_size=1, max_size=4)
+        await db.connect()
+        try:
+            logic = image_logic(db=db, storage_root=str(tmp_path))
+            await logic.bulk_create(image_files=[upload("3_kept.jpeg", b"kept")], user_email="admin@example.com")
+            # the larger files finish uploading last, so completion order is not request order
+            return await logic.bulk_create(
+                image_files=[
+                    upload("5_large.jpeg", b"x" * 512 * 1024),
+                    upload("bad name.jpeg", b"bad"),
+                    upload("3_kept.jpeg", b"kept"),
+                    upload("1_small.jpeg", b"small"),
+                    upload("5_large.jpeg", b"again"),
+                    upload("3_kept.jpeg", b"changed"),
+                    upload("2_medium.jpeg", b"y" * 64 * 1024),
+                ],
+                user_email="admin@example.com",
+            )
+        finally:
+            await db.disconnect()
+
+    results = asyncio.run(main())
+    assert [(result.file_name, result.status) for result in results] == [
+        ("5_large.jpeg", ImageIngestStatus.CREATED),
+        ("bad name.jpeg", ImageIngestStatus.FAILED),
+        ("3_kept.jpeg", ImageIngestStatus.SKIPPED),
+        ("1_small.jpeg", ImageIngestStatus.CREATED),
+        ("5_large.jpeg", ImageIngestStatus.SKIPPED),
+        ("3_kept.jpeg", ImageIngestStatus.SKIPPED),
+        ("2_medium.jpeg", ImageIngestStatus.CREATED),
+    ]
+
+
+def test_failed_upsert_removes_the_new_objects(database_url, tmp_path, image_logic):
+    async def main():
+        connection = await asyncpg.connect(database_url)
+        db = Database(url=database_url, min_size=1, max_size=4)
+        await db.connect()
+        try:
+            logic = image_logic(db=db, storage_root=str(tmp_path))
+            await logic.bulk_create(image_files=[upload("3_replaced.jpeg", b"before")], user_email="admin@example.com")
+            # the whole batch upserts in one statement, so one rejected row fails it
+            await connection.execute("ALTER TABLE image ADD CONSTRAINT bulk_create_test CHECK (file_name <> '4_rejected.jpeg')")
+            try:
+                results = await logic.bulk_create(
+                    image_files=[upload("1_new.jpeg", b"new"), upload("3_replaced.jpeg", b"after"), upload("4_rejected.jpeg", b"rejected")],
+                    user_email="admin@example.com",
+                )
+            finally:
+                await connection.execute("ALTER TABLE image DROP CONSTRAINT bulk_create_test")
+            rows = await connection.fetch("SELECT file_name FROM image ORDER BY file_name")
+            return results, [row["file_name"] for row in rows]
+        finally:
+            await db.disconnect()
+            await connection.close()
+
+    results, rows = asyncio.run(main())
+    assert [(result.file_name, result.status) for result in results] == [
+        ("1_new.jpeg", ImageIngestStatus.FAILED),
+        ("3_replaced.jpeg", ImageIngestStatus.FAILED),
+        ("4_rejected.jpeg", ImageIngestStatus.FAILED),
+    ]
+    assert rows == ["3_replaced.jpeg"]
+    # the replaced object already lost its previous content, its row still carries the old hash so a retry uploads it
+    assert stored_files(str(tmp_path)) == ["3_replaced.jpeg"]
@@ -0,0 +1,101 @@
+# standard lib imports
+import asyncio
+
+# third party imports
+import asyncpg
+from databases import Database
+
+# module imports
+from app.cache import LRUCache
+from app.data.user_alias import UserAliasData
+
+USER_EMAIL = "claimer@example.com"
+CLAIMS = 24
+
+
+async def seed(connection: asyncpg.Connection, images: int) -> None:
+    await connection.execute("INSERT INTO user_alias (user_email, user_alias) VALUES ($1, 'claimer')", USER_EMAIL)
+    await connection.execute(
+        "INSERT INTO image (path, file_name, description, rarity) SELECT 'images', n || '.jpeg', 'daily dollar', 1 + n % 5 FROM generate_series(1, $1) AS n",
+        images,
+    )
+    # counts every change of the claim timestamp, so a double claim shows up even when both land in the same second
+    await connection.execute(
+        """
+        CREATE TABLE daily_dollar_stamp (user_email varchar, daily_dollar timestamptz);
+        CREATE FUNCTION record_daily_dollar_stamp() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO daily_dollar_stamp VALUES (NEW.user_email, NEW.daily_dollar);
+            RETURN NEW;
+        END $$;
+        CREATE TRIGGER record_daily_dollar_stamp AFTER UPDATE OF daily_dollar ON user_alias
+        FOR EACH ROW WHEN (OLD.daily_dollar IS DISTINCT FROM NEW.daily_dollar) EXECUTE FUNCTION record_daily_dollar_stamp();
+        """
+    )
+
+
+async def drop_stamps(connection: asyncpg.Connection) -> None:
+    await connection.execute("DROP TABLE daily_dollar_stamp; DROP FUNCTION record_daily_dollar_stamp() CASCADE")
+
+
+def test_parallel_claims_grant_exactly_once(database_url, tmp_path, image_logic):
+    async def main():
+        connection = await asyncpg.connect(database_url)
+        db = Database(url=database_url, min_size=1, max_size=10)
+        await db.connect()
+        try:
+            await seed(connection, images=40)
+            logic = image_logic(db=db, storage_root=str(tmp_path), max_upload_file_bytes=1024, max_upload_request_bytes=1024, bulk_upload_concurrency=1)
+            claims = await asyncio.gather(*(logic.daily_dollar(user_email=USER_EMAIL) for _ in range(CLAIMS)))
+            granted = await connection.fetchval("SELECT COUNT(*) FROM user_image WHERE user_email = $1", USER_EMAIL)
+            stamps = await connection.fetch("SELECT daily_dollar FROM daily_dollar_stamp WHERE user_email = $1", USER_EMAIL)
+            daily_dollar = await connection.fetchval("SELECT daily_dollar FROM user_alias WHERE user_email = $1", USER_EMAIL)
+            await drop_stamps(connection)
+            return claims, granted, stamps, daily_dollar
+        finally:
+            await db.disconnect()
+            await connection.close()
+
+    claims, granted, stamps, daily_dollar = asyncio.run(main())
+    assert sorted(claims) == [0] * (CLAIMS - 1) + [1]
+    assert granted == 1
+    assert [stamp["daily_dollar"] for stamp in stamps] == [daily_dollar]
+
+
+def test_claim_losing_the_pull_to_a_concurrent_grant_rolls_back(database_url):
+    async def main():
+        connection = await asyncpg.connect(database_url)
+        granting = await asyncpg.connect(database_url)
+        db = Database(url=database_url, min_size=1, max_size=1)
+        await db.connect()
+        try:
+            await seed(connection, images=1)
+            image_id = await connection.fetchval("SELECT image_id FROM image")
+            user_alias_data = UserAliasData(db=db, user_alias_cache=LRUCache(max_entries=8), user_alias_cache_ttl=60)
+
+            # a gacha grant of the same image is in flight, so the claim's insert waits on it and then conflicts
+            transaction = granting.transaction()
+            await transaction.start()
+            await granting.execute("INSERT INTO user_image (user_email, image_id) VALUES ($1, $2)", USER_EMAIL, image_id)
+            claim = asyncio.ensure_future(user_alias_data.daily_dollar(user_email=USER_EMAIL, image_ids=[image_id]))
+            while not await connection.fetchval("SELECT EXISTS (SELECT 1 FROM pg_stat_activity WHERE wait_event_type = 'Lock')"):
+                await asyncio.sleep(0.01)
+            await transaction.commit()
+
+            result = await claim
+            granted = await connection.fetchval("SELECT COUNT(*) FROM user_image WHERE user_email = $1", USER_EMAIL)
+            stamps = await connection.fetchval("SELECT COUNT(*) FROM daily_dollar_stamp")
+            daily_dollar = await connection.fetchval("SELECT daily_dollar FROM user_alias WHERE user_email = $1", USER_EMAIL)
+            await drop_stamps(connection)
+            return result, granted, stamps, daily_dollar
+        finally:
+            await db.disconnect()
+            await granting.close()
+            await connection.close()
+
+    result, granted, stamps, daily_dollar = asyncio.run(main())
+    assert result == (None, True)
+    # only the concurrent grant's pull exists and the claim's timestamp was rolled back with its insert
+    assert granted == 1
+    assert stamps == 0
+    assert daily_dollar is None
@@ -0,0 +1,53 @@
+# standard lib imports
+import hashlib
+import time
+
+# third party imports
+import pytest
+from fastapi.testclient import TestClient
+
+# module imports
+from app.admission import AdmissionController
+from app.cache import CoalescingCache, LRUCache
+from app.main import get_application
+from app.models.authorization import Principal
+
+
+@pytest.fixture
+def client():
+    app = get_application()
+    # no startup events run, so the state the routes read is filled in here
+    app.state.jwks_key_store = None
+    app.state.token_cache = LRUCache(max_entries=8)
+    app.state.signed_url_cache = LRUCache(max_entries=8)
+    app.state.user_alias_cache = LRUCache(max_entries=8)
+    app.state.rankings_cache = CoalescingCache(ttl=5, max_entries=8)
+    app.state.db_admission = AdmissionController(max_concurrency=1, max_queue_depth=1, max_wait=1, retry_after=1)
+    app.state.direct_db_admission = None
+    return TestClient(app)
+
+
+def bearer(client: TestClient, token: str, scopes: frozenset) -> dict:
+    # a cached principal skips signature verification, the scope check still runs
+    principal = Principal(email="stats@example.com", tenant="jujugigi", scopes=scopes, expires_at=int(time.time()) + 60)
+    client.app.state.token_cache.set(hashlib.sha256(token.encode()).digest(), principal, expires_at=principal.expires_at)
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_healthcheck_is_public(client):
+    assert client.get("/").status_code == 200
+
+
+def test_stats_requires_a_token(client):
+    assert client.get("/stats").status_code == 403
+
+
+def test_stats_requires_the_read_stats_scope(client):
+    response = client.get("/stats", headers=bearer(client, token="no-scope", scopes=frozenset({"read:image"})))
+    assert response.status_code == 403
+
+
+def test_stats_with_the_read_stats_scope(client):
+    response = client.get("/stats", headers=bearer(client, token="stats", scopes=frozenset({"read:stats"})))
+    assert response.status_code == 200
+    assert set(response.json()) == {"token_cache", "signed_url_cache", "user_alias_cache", "rankings_cache", "db_admission", "direct_db_admission"}
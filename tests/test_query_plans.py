@@ -0,0 +1,335 @@
+# standard lib imports
+import asyncio
+import json
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# third party imports
+import pytest
+from databases import Database
+
+# module imports
+from app.cache import CoalescingCache, LRUCache
+from app.data.image import ImageData
+from app.data.rankings import RankingsData
+from app.data.stripe import StripeData
+from app.data.user_alias import UserAliasData
+from app.data.user_image import UserImageData
+from app.models.image import ImageCreate
+from app.models.stripe import StripeWebhook
+from app.models.user_alias import UserAliasCreate, UserAliasUpdate
+from app.models.user_image import UserImageCreate, UserImageUpdate
+
+EXPLAINABLE_STATEMENTS = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+SEED_PREFIX = "plan-check"
+USERS = 2000
+IMAGES = 1000
+PULLS_PER_USER = 50
+# largest table a plan may seq scan or bitmap scan into, or input it may sort
+MAX_ROWS = 1000
+
+
+class PlanRecordingDatabase:
+    def __init__(self, db: Database) -> None:
+        self._db = db
+        self.plans: List[Tuple[str, Dict[str, Any]]] = []
+
+    def transaction(self, **kwargs: Any) -> Any:
+        return self._db.transaction(**kwargs)
+
+    async def execute(self, query: str, values: Optional[Dict[str, Any]] = None) -> Any:
+        await self._explain(query, values)
+        return await self._db.execute(query=query, values=values)
+
+    async def fetch_all(self, query: str, values: Optional[Dict[str, Any]] = None) -> Any:
+        await self._explain(query, values)
+        return await self._db.fetch_all(query=query, values=values)
+
+    async def fetch_one(self, query: str, values: Optional[Dict[str, Any]] = None) -> Any:
+        await self._explain(query, values)
+        return await self._db.fetch_one(query=query, values=values)
+
+    async def fetch_val(self, query: str, values: Optional[Dict[str, Any]] = None, column: Any = 0) -> Any:
+        await self._explain(query, values)
+        return await self._db.fetch_val(query=query, values=values, column=column)
+
+    async def _explain(self, query: str, values: Optional[Dict[str, Any]]) -> None:
+        if not query.lstrip().upper().startswith(EXPLAINABLE_STATEMENTS):
+            return
+        # EXPLAIN without ANALYZE only plans the statement, the data class then runs it as usual
+        plan = await self._db.fetch_val(query=f"EXPLAIN (FORMAT JSON) {query}", values=values)
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        self.plans.append((query, plan[0]["Plan"]))
+
+
+class PlanData(NamedTuple):
+    image: ImageData
+    user_image: UserImageData
+    user_alias: UserAliasData
+    stripe: StripeData
+    rankings: RankingsData
+
+
+class PlanCase(NamedTuple):
+    name: str
+    run: Callable[[PlanData, Dict[str, Any]], Awaitable[Any]]
+    # tables the path reads whole by design; each case says why next to it
+    full_scan_tables: Tuple[str, ...] = ()
+    needs_pg_trgm: bool = False
+
+
+class PlanResult(NamedTuple):
+    plans: List[Tuple[str, Dict[str, Any]]]
+    error: Optional[BaseException]
+
+
+def iter_plan_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from iter_plan_nodes(child)
+
+
+# above max_rows a plan may not seq scan or bitmap heap scan a table outside full_scan_tables, nor sort any input;
+# a bitmap heap scan visits every matching page before a LIMIT can stop it, so a large one is a bulk read too
+def find_regressions(plan: Dict[str, Any], table_rows: Dict[str, float], max_rows: int, full_scan_tables: Tuple[str, ...] = ()) -> List[str]:
+    regressions = []
+    for node in iter_plan_nodes(plan):
+        node_type = node["Node Type"]
+        relation = node.get("Relation Name")
+        if node_type == "Seq Scan" and relation not in full_scan_tables:
+            if table_rows.get(relation, 0) > max_rows:
+                regressions.append(f"Seq Scan on {relation} (~{int(table_rows[relation])} rows)")
+        elif node_type == "Bitmap Heap Scan" and relation not in full_scan_tables:
+            if node["Plan Rows"] > max_rows:
+                regressions.append(f"Bitmap Heap Scan on {relation} of ~{int(node['Plan Rows'])} rows, recheck {node.get('Recheck Cond')}")
+        elif node_type.endswith("Sort"):
+            input_rows = node["Plans"][0]["Plan Rows"]
+            if input_rows > max_rows:
+                regressions.append(f"{node_type} of ~{int(input_rows)} rows on {', '.join(node.get('Sort Key', []))}")
+    return regressions
+
+
+async def seed(db: Database, users: int, images: int, pulls_per_user: int) -> Dict[str, Any]:
+    await db.execute(
+        query=f"""
+            INSERT INTO user_alias (user_email, user_alias, daily_dollar)
+            SELECT '{SEED_PREFIX}-' || n || '@example.com', '{SEED_PREFIX}-' || n, current_timestamp - INTERVAL '2 days'
+            FROM generate_series(1, CAST(:users AS int)) AS n
+        """,
+        values={"users": users},
+    )
+    await db.execute(
+        query=f"""
+            INSERT INTO image (path, file_name, description, rarity)
+            SELECT 'images', (1 + n % 5) || '_{SEED_PREFIX}_' || n || '.jpeg', '{SEED_PREFIX}', 1 + n % 5
+            FROM generate_series(1, CAST(:images AS int)) AS n
+        """,
+        values={"images": images},
+    )
+    # every user pulls a distinct run of images, about half of them opened, spread over a year
+    await db.execute(
+        query=f"""
+            WITH seeded_image AS (
+                SELECT image_id, row_number() OVER (ORDER BY image_id) - 1 AS position
+                FROM image WHERE description = '{SEED_PREFIX}'
+            )
+            INSERT INTO user_image (user_email, image_id, opened, created_on)
+            SELECT '{SEED_PREFIX}-' || u || '@example.com', si.image_id, random() < 0.5, current_timestamp - random() * INTERVAL '365 days'
+            FROM generate_series(1, CAST(:users AS int)) AS u
+            CROSS JOIN generate_series(0, CAST(:pulls_per_user AS int) - 1) AS k
+            JOIN seeded_image si ON si.position = (u * 31 + k) % CAST(:images AS int)
+        """,
+        values={"users": users, "images": images, "pulls_per_user": min(pulls_per_user, images)},
+    )
+    await RankingsData(db=db).rebuild()
+    await db.execute(query="ANALYZE image, user_alias, user_image, rankings, stripe")
+
+    user_email = f"{SEED_PREFIX}-1@example.com"
+    fixture = dict(
+        await db.fetch_one(
+            query="""
+                SELECT ui.user_image_id, ui.image_id, i.file_name,
+                    (SELECT image_id FROM image i2 WHERE i2.description = :description
+                        AND NOT EXISTS (SELECT 1 FROM user_image ui2 WHERE ui2.user_email = :user_email AND ui2.image_id = i2.image_id)
+                        LIMIT 1) AS unowned_image_id
+                FROM user_image ui
+                JOIN image i ON i.image_id = ui.image_id
+                WHERE ui.user_email = :user_email
+                LIMIT 1
+            """,
+            values={"user_email": user_email, "description": SEED_PREFIX},
+        )
+    )
+    fixture.update(user_email=user_email, user_alias=f"{SEED_PREFIX}-1", new_user_email=f"{SEED_PREFIX}-new@example.com")
+    return fixture
+
+
+async def read_image_pages(data: PlanData, fixture: Dict[str, Any]) -> None:
+    _, next_cursor = await data.image.read(user_email=fixture["user_email"], limit=10)
+    if next_cursor:
+        await data.image.read(user_email=fixture["user_email"], limit=10, cursor=next_cursor)
+
+
+async def read_user_image_pages(data: PlanData, fixture: Dict[str, Any]) -> None:
+    _, next_cursor = await data.user_image.read(limit=50, offset=0)
+    if next_cursor:
+        await data.user_image.read(limit=50, offset=0, cursor=next_cursor)
+
+
+async def bulk_upsert_images(data: PlanData, fixture: Dict[str, Any]) -> None:
+    await data.image.bulk_upsert(
+        images=[
+            ImageCreate(path="images", file_name=f"1_{SEED_PREFIX}_new.jpeg", description=SEED_PREFIX, rarity=1, created_by=SEED_PREFIX, updated_by=SEED_PREFIX),
+            # a changed hash and rarity on an owned image also recounts its owners' rankings
+            ImageCreate(path="images", file_name=fixture["file_name"], description=SEED_PREFIX, rarity=5, content_hash="changed", created_by=SEED_PREFIX, updated_by=SEED_PREFIX),
+        ]
+    )
+
+
+NOW = datetime.now(tz=timezone.utc)
+
+PLAN_CASES = [
+    PlanCase("ImageData.read by user_email", read_image_pages),
+    PlanCase("ImageData.read by user_email and opened", lambda d, f: d.image.read(user_email=f["user_email"], opened=False, limit=10)),
+    PlanCase("ImageData.read by user_image_id", lambda d, f: d.image.read(user_image_id=f["user_image_id"])),
+    PlanCase("ImageData.read by user_alias", lambda d, f: d.image.read(user_alias=f["user_alias"], limit=10)),
+    # reconcile_images compares every catalog row against the bucket listing
+    PlanCase("ImageData.read_file_names", lambda d, f: d.image.read_file_names(), full_scan_tables=("image",)),
+    PlanCase("ImageData.read_manifest", lambda d, f: d.image.read_manifest(file_names=[f["file_name"]])),
+    # the sampler keeps the whole (image_id, rarity) catalog in memory and reloads it every few minutes
+    PlanCase("ImageData.refresh_image_sampler", lambda d, f: d.image.refresh_image_sampler(), full_scan_tables=("image",)),
+    PlanCase("ImageData.read_random_unowned_images", lambda d, f: d.image.read_random_unowned_images(user_email=f["user_email"], quantity=2)),
+    PlanCase("ImageData.grant_random_unowned_images", lambda d, f: d.image.grant_random_unowned_images(user_email=f["user_email"], quantity=3)),
+    PlanCase("ImageData.bulk_upsert", bulk_upsert_images),
+    PlanCase("ImageData.delete", lambda d, f: d.image.delete(image_id=-1)),
+    PlanCase(
+        "UserImageData.create",
+        lambda d, f: d.user_image.create(
+            user_image=UserImageCreate(user_email=f["user_email"], image_id=f["unowned_image_id"], opened=True, created_by=SEED_PREFIX, updated_by=SEED_PREFIX)
+        ),
+    ),
+    PlanCase("UserImageData.read", read_user_image_pages),
+    PlanCase("UserImageData.read_rankings", lambda d, f: d.user_image.read_rankings(limit=10, offset=0)),
+    PlanCase(
+        "UserImageData.update",
+        lambda d, f: d.user_image.update(
+            user_image_id=f["user_image_id"],
+            user_image=UserImageUpdate(user_email=f["user_email"], image_id=f["image_id"], opened=True, updated_by=SEED_PREFIX, updated_on=NOW),
+        ),
+    ),
+    PlanCase("UserImageData.delete", lambda d, f: d.user_image.delete(user_image_id=f["user_image_id"])),
+    PlanCase("UserImageData.open_image", lambda d, f: d.user_image.open_image(user_email=f["user_email"])),
+    PlanCase(
+        "UserAliasData.create",
+        lambda d, f: d.user_alias.create(
+            user_alias=UserAliasCreate(user_email=f["new_user_email"], user_alias=f"{SEED_PREFIX}-new", created_by=SEED_PREFIX, updated_by=SEED_PREFIX)
+        ),
+    ),
+    PlanCase("UserAliasData.read by user_email", lambda d, f: d.user_alias.read(user_email=f["user_email"], limit=1)),
+    PlanCase("UserAliasData.read by user_alias", lambda d, f: d.user_alias.read(user_alias=f["user_alias"].upper(), limit=1)),
+    PlanCase("UserAliasData.search", lambda d, f: d.user_alias.search(query=f"{SEED_PREFIX}-12", limit=20), needs_pg_trgm=True),
+    PlanCase(
+        "UserAliasData.update",
+        lambda d, f: d.user_alias.update(user_email=f["user_email"], user_alias=UserAliasUpdate(user_alias=f"{SEED_PREFIX}-renamed", updated_by=SEED_PREFIX, updated_on=NOW)),
+    ),
+    PlanCase("UserAliasData.delete", lambda d, f: d.user_alias.delete(user_alias_id=-1)),
+    PlanCase("UserAliasData.daily_dollar", lambda d, f: d.user_alias.daily_dollar(user_email=f["user_email"], image_ids=[f["unowned_image_id"]])),
+    PlanCase(
+        "StripeData.upsert",
+        lambda d, f: d.stripe.upsert(
+            stripe_update=StripeWebhook(
+                id=f"evt_{SEED_PREFIX}",
+                object="event",
+                api_version=NOW,
+                created=NOW,
+                data={"object": {}},
+                livemode=False,
+                pending_webhooks=0,
+                request={},
+                type="checkout.session.completed",
+            )
+        ),
+    ),
+    PlanCase("RankingsData.rebuild of one user", lambda d, f: d.rankings.rebuild(user_emails=[f["user_email"]])),
+    # the full recount only runs from the rebuild_rankings command, for the backfill and after out-of-band fixes
+    PlanCase("RankingsData.rebuild", lambda d, f: d.rankings.rebuild(), full_scan_tables=("image", "user_alias", "user_image", "rankings")),
+]
+
+
+async def run_plan_cases(database_url: str, storage_root: str, image_data: Callable[..., ImageData]) -> Tuple[Dict[str, float], Dict[str, PlanResult]]:
+    # force_rollback keeps every statement on one connection inside a transaction that is never committed
+    db = Database(url=database_url, force_rollback=True)
+    await db.connect()
+    try:
+        fixture = await seed(db=db, users=USERS, images=IMAGES, pulls_per_user=PULLS_PER_USER)
+        records = await db.fetch_all(query="SELECT relname, reltuples FROM pg_class WHERE relname IN ('image', 'user_alias', 'user_image', 'rankings', 'stripe')")
+        table_rows = {record["relname"]: record["reltuples"] for record in records}
+
+        recording_db = PlanRecordingDatabase(db=db)
+        data = PlanData(
+            image=image_data(db=recording_db, storage_root=storage_root),
+            user_image=UserImageData(db=recording_db, rankings_cache=CoalescingCache(ttl=0, max_entries=1)),
+            # a zero ttl cache keeps every read on the database, where its plan can be checked
+            user_alias=UserAliasData(db=recording_db, user_alias_cache=LRUCache(max_entries=1), user_alias_cache_ttl=0),
+            stripe=StripeData(db=recording_db),
+            rankings=RankingsData(db=recording_db),
+        )
+        results = {}
+        for case in PLAN_CASES:
+            recording_db.plans = []
+            error = None
+            # each case runs in a savepoint that is rolled back, so cases cannot see each other's writes
+            transaction = db.transaction()
+            await transaction.start()
+            try:
+                await case.run(data, fixture)
+            except Exception as e:
+                error = e
+            finally:
+                await transaction.rollback()
+            results[case.name] = PlanResult(plans=recording_db.plans, error=error)
+        return table_rows, results
+    finally:
+        await db.disconnect()
+
+
+@pytest.fixture(scope="module")
+def plan_results(migrated_database, tmp_path_factory, image_data) -> Tuple[Dict[str, float], Dict[str, PlanResult]]:
+    return asyncio.run(run_plan_cases(database_url=migrated_database.url, storage_root=str(tmp_path_factory.mktemp("storage")), image_data=image_data))
+
+
+@pytest.mark.parametrize("case", PLAN_CASES, ids=[case.name for case in PLAN_CASES])
+def test_query_plan(case: PlanCase, plan_results, migrated_database):
+    if case.needs_pg_trgm and not migrated_database.pg_trgm:
+        pytest.skip("the test server does not ship pg_trgm, so V6's trigram index is missing")
+    table_rows, results = plan_results
+    result = results[case.name]
+    if result.error is not None:
+        raise result.error
+    assert result.plans, "the path issued no explainable statement"
+    regressions = [
+        f"{regression}\n    {' '.join(query.split())}"
+        for query, plan in result.plans
+        for regression in find_regressions(plan=plan, table_rows=table_rows, max_rows=MAX_ROWS, full_scan_tables=case.full_scan_tables)
+    ]
+    assert not regressions, "\n".join(regressions)
+
+
+def test_find_regressions_matches_every_sort_node():
+    def sort(node_type: str) -> Dict[str, Any]:
+        return {"Node Type": node_type, "Sort Key": ["created_on"], "Plans": [{"Node Type": "Index Scan", "Relation Name": "user_image", "Plan Rows": 5000}]}
+
+    assert find_regressions(plan=sort("Sort"), table_rows={}, max_rows=1000) == ["Sort of ~5000 rows on created_on"]
+    assert find_regressions(plan=sort("Incremental Sort"), table_rows={}, max_rows=1000) == ["Incremental Sort of ~5000 rows on created_on"]
+
+
+def test_find_regressions_flags_large_bitmap_heap_scans():
+    plan = {
+        "Node Type": "Bitmap Heap Scan",
+        "Relation Name": "user_image",
+        "Plan Rows": 5000,
+        "Recheck Cond": "((user_email)::text = 'a'::text)",
+        "Plans": [{"Node Type": "Bitmap Index Scan", "Plan Rows": 5000}],
+    }
+    assert len(find_regressions(plan=plan, table_rows={"user_image": 100000}, max_rows=1000)) == 1
+    assert find_regressions(plan=plan, table_rows={"user_image": 100000}, max_rows=1000, full_scan_tables=("user_image",)) == []
@@ -0,0 +1,49 @@
+# standard lib imports
+import asyncio
+
+# third party imports
+import asyncpg
+from databases import Database
+
+# module imports
+from app.data.rankings import RankingsData
+from app.models.image import ImageCreate
+
+RANKINGS_QUERY = "SELECT user_email, common_count, uncommon_count, rare_count, epic_count, unique_count, total_count FROM rankings ORDER BY user_email"
+
+
+def test_rarity_change_moves_the_owners_counts(database_url, tmp_path, image_data):
+    async def main():
+        connection = await asyncpg.connect(database_url)
+        db = Database(url=database_url, min_size=1, max_size=2)
+        await db.connect()
+        try:
+            await connection.execute(
+                """
+                INSERT INTO user_alias (user_email, user_alias) SELECT 'u' || n || '@example.com', 'u' || n FROM generate_series(1, 4) AS n;
+                INSERT INTO image (path, file_name, description, rarity, content_hash) SELECT 'images', n || '.jpeg', 'rankings', n, 'a' FROM generate_series(1, 3) AS n;
+                INSERT INTO user_image (user_email, image_id, opened)
+                SELECT 'u' || u || '@example.com', i.image_id, (u + i.rarity) % 2 = 0 FROM generate_series(1, 4) AS u CROSS JOIN image i;
+                """
+            )
+            await RankingsData(db=db).rebuild()
+            images = image_data(db=db, storage_root=str(tmp_path))
+            await images.bulk_upsert(
+                images=[
+                    ImageCreate(path="images", file_name="1.jpeg", description="rankings", rarity=5, content_hash="b", created_by="t", updated_by="t"),
+                    ImageCreate(path="images", file_name="2.jpeg", description="rankings", rarity=4, content_hash="b", created_by="t", updated_by="t"),
+                    # unchanged content is not rewritten, so its new rarity is ignored and nothing moves
+                    ImageCreate(path="images", file_name="3.jpeg", description="rankings", rarity=1, content_hash="a", created_by="t", updated_by="t"),
+                ]
+            )
+            moved = await connection.fetch(RANKINGS_QUERY)
+            await RankingsData(db=db).rebuild()
+            recounted = await connection.fetch(RANKINGS_QUERY)
+            return moved, recounted
+        finally:
+            await db.disconnect()
+            await connection.close()
+
+    moved, recounted = asyncio.run(main())
+    assert [tuple(row) for row in moved] == [tuple(row) for row in recounted]
+    assert sum(row["unique_count"] for row in moved) == 2
@@ -0,0 +1,108 @@
+# standard lib imports
+import asyncio
+
+# third party imports
+import asyncpg
+from databases import Database
+
+# module imports
+from app.cache import CoalescingCache
+from app.data.user_image import UserImageData
+
+STALE_AFTER = 0.2
+
+
+def counting_load():
+    loads = []
+
+    async def load():
+        loads.append(len(loads))
+        return len(loads)
+
+    return load, loads
+
+
+def test_stale_marks_are_batched_into_one_invalidation():
+    async def main():
+        cache = CoalescingCache(ttl=60, max_entries=8, stale_after=STALE_AFTER)
+        load, loads = counting_load()
+        assert await cache.get_or_load("page", load) == 1
+
+        # a burst of writes inside the budget keeps serving the cached page
+        for _ in range(50):
+            cache.mark_stale()
+            assert await cache.get_or_load("page", load) == 1
+        await asyncio.sleep(STALE_AFTER)
+        after_budget = await cache.get_or_load("page", load)
+        return after_budget, loads, cache.stats()
+
+    after_budget, loads, stats = asyncio.run(main())
+    assert after_budget == 2
+    assert len(loads) == 2
+    assert (stats["stale_marks"], stats["invalidations"]) == (50, 1)
+
+
+def test_budget_counts_from_the_oldest_unapplied_mark():
+    async def main():
+        cache = CoalescingCache(ttl=60, max_entries=8, stale_after=STALE_AFTER)
+        load, _ = counting_load()
+        await cache.get_or_load("page", load)
+        cache.mark_stale()
+        await asyncio.sleep(STALE_AFTER / 2)
+        # a later mark does not push the first one's deadline back
+        cache.mark_stale()
+        await asyncio.sleep(STALE_AFTER / 2)
+        return await cache.get_or_load("page", load)
+
+    assert asyncio.run(main()) == 2
+
+
+def test_invalidate_applies_pending_marks_right_away():
+    async def main():
+        cache = CoalescingCache(ttl=60, max_entries=8, stale_after=60)
+        load, _ = counting_load()
+        await cache.get_or_load("page", load)
+        cache.mark_stale()
+        cache.invalidate()
+        reloaded = await cache.get_or_load("page", load)
+        return reloaded, await cache.get_or_load("page", load), cache.stats()
+
+    reloaded, cached, stats = asyncio.run(main())
+    assert (reloaded, cached) == (2, 2)
+    assert stats["invalidations"] == 1
+
+
+def test_opened_images_reach_the_leaderboard_within_the_budget(database_url):
+    async def main():
+        connection = await asyncpg.connect(database_url)
+        db = Database(url=database_url, min_size=1, max_size=2)
+        await db.connect()
+        try:
+            await connection.execute(
+                """
+                INSERT INTO user_alias (user_email, user_alias) VALUES ('opener@example.com', 'opener');
+                INSERT INTO image (path, file_name, description, rarity) SELECT 'images', n || '.jpeg', 'cache', 1 FROM generate_series(1, 5) AS n;
+                INSERT INTO user_image (user_email, image_id) SELECT 'opener@example.com', image_id FROM image;
+                """
+            )
+            cache = CoalescingCache(ttl=60, max_entries=8, stale_after=STALE_AFTER)
+            user_image_data = UserImageData(db=db, rankings_cache=cache)
+            await user_image_data.open_image(user_email="opener@example.com")
+            await asyncio.sleep(STALE_AFTER)
+            first = await user_image_data.read_rankings(limit=10, offset=0)
+
+            for _ in range(4):
+                await user_image_data.open_image(user_email="opener@example.com")
+            within_budget = await user_image_data.read_rankings(limit=10, offset=0)
+            await asyncio.sleep(STALE_AFTER)
+            after_budget = await user_image_data.read_rankings(limit=10, offset=0)
+            return first, within_budget, after_budget, cache.stats()
+        finally:
+            await db.disconnect()
+            await connection.close()
+
+    first, within_budget, after_budget, stats = asyncio.run(main())
+    assert [ranking.total_count for ranking in first] == [1]
+    assert within_budget == first
+    assert [ranking.total_count for ranking in after_budget] == [5]
+    assert (stats["stale_marks"], stats["invalidations"], stats["misses"]) == (5, 2, 2)
@@ -0,0 +1,72 @@
+# standard lib imports
+import time
+from typing import Any, Dict
+from urllib.parse import parse_qs, urlsplit
+
+# third party imports
+import pytest
+from jose import jwt
+from jose.exceptions import ExpiredSignatureError, JWTError
+
+# module imports
+from app.data import storage
+from app.data.storage import SignedURLSigner
+
+BASE_URL = "https://project.supabase.co/storage/v1/"
+SECRET = "super-secret-jwt-token-with-at-least-32-characters-long"
+
+
+# checks a signed url the way the storage API does, with python-jose rather than the signer's own hmac code
+def verify_signed_url(signed_url: str, jwt_secret: str) -> Dict[str, Any]:
+    parts = urlsplit(signed_url)
+    object_url = parts.path.split("/object/sign/", 1)[1]
+    claims = jwt.decode(parse_qs(parts.query)["token"][0], jwt_secret, algorithms=["HS256"])
+    if claims["url"] != object_url:
+        raise JWTError(f"token signed for {claims['url']}, not {object_url}")
+    return claims
+
+
+@pytest.fixture
+def signer():
+    return SignedURLSigner(base_url=BASE_URL, bucket="images", jwt_secret=SECRET)
+
+
+def test_signed_urls_verify(signer):
+    paths = ["jujugigi/1.jpeg", "jujugigi/2 copy.jpeg", "jujugigi/ünïcode.png"]
+    signed_urls = signer.sign(paths=paths, expires_in=300)
+    for path, signed_url in zip(paths, signed_urls):
+        assert signed_url.startswith(f"{BASE_URL}object/sign/images/{path}?token=")
+        claims = verify_signed_url(signed_url, jwt_secret=SECRET)
+        assert claims["url"] == f"images/{path}"
+        assert claims["exp"] - claims["iat"] == 300
+
+
+def test_expired_signed_url_is_rejected(signer, monkeypatch):
+    issued_at = time.time() - 600
+    monkeypatch.setattr(storage.time, "time", lambda: issued_at)
+    [signed_url] = signer.sign(paths=["jujugigi/1.jpeg"], expires_in=300)
+    with pytest.raises(ExpiredSignatureError):
+        verify_signed_url(signed_url, jwt_secret=SECRET)
+
+
+def test_signed_url_for_another_path_is_rejected(signer):
+    [signed_url] = signer.sign(paths=["jujugigi/1.jpeg"], expires_in=300)
+    with pytest.raises(JWTError):
+        verify_signed_url(signed_url.replace("jujugigi/1.jpeg", "jujugigi/2.jpeg"), jwt_secret=SECRET)
+
+
+def test_signed_url_with_tampered_claims_is_rejected(signer):
+    [signed_url, other_url] = signer.sign(paths=["jujugigi/1.jpeg", "jujugigi/2.jpeg"], expires_in=300)
+    header, _, signature = signed_url.split("?token=")[1].split(".")
+    # the other token's claims name the tampered path, so only the signature can catch the swap
+    claims = other_url.split("?token=")[1].split(".")[1]
+    tampered_url = f"{BASE_URL}object/sign/images/jujugigi/2.jpeg?token={header}.{claims}.{signature}"
+    with pytest.raises(JWTError):
+        verify_signed_url(tampered_url, jwt_secret=SECRET)
+
+
+def test_signed_url_under_the_wrong_key_is_rejected():
+    signer = SignedURLSigner(base_url=BASE_URL, bucket="images", jwt_secret="another-secret-that-is-also-32-characters-long")
+    [signed_url] = signer.sign(paths=["jujugigi/1.jpeg"], expires_in=300)
+    with pytest.raises(JWTError):
+        verify_signed_url(signed_url, jwt_secret=SECRET)
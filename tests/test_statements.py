@@ -0,0 +1,71 @@
+# standard lib imports
+import asyncio
+from datetime import datetime, timezone
+
+# third party imports
+import asyncpg
+import pytest
+from databases import Database
+
+# module imports
+from app.data.statements import BIND_PARAM_PATTERN, UPDATE_USER_ALIAS, Statement
+
+
+def test_params_keep_first_use_order_and_number_positionally():
+    statement = Statement("SELECT :b, CAST(:a AS int), :b WHERE x = :c")
+    assert statement.params == ("b", "a", "c")
+    assert statement.positional_sql == "SELECT $1, CAST($2 AS int), $1 WHERE x = $3"
+    assert statement.args({"a": 1, "b": 2, "c": 3, "unused": 4}) == (2, 1, 3)
+    assert statement.bind({"a": 1, "b": 2, "c": 3, "unused": 4}) == {"b": 2, "a": 1, "c": 3}
+
+
+def test_cast_suffixed_params_are_not_read_as_a_shorter_name():
+    # the old pattern backtracked `:image_ids::int[]` to `:image_id`, leaving `s::int[]` behind
+    assert BIND_PARAM_PATTERN.findall("SELECT unnest(:image_ids::int[]), :user_email") == ["user_email"]
+    assert BIND_PARAM_PATTERN.findall("SELECT :a_1::text") == []
+
+
+def test_casts_literals_and_timestamps_are_not_params():
+    statement = Statement("SELECT x::text, '10:30', CAST(:a AS int), '{1,2}'::int[] WHERE y = :b")
+    assert statement.params == ("a", "b")
+
+
+def test_cast_suffixed_params_are_refused():
+    with pytest.raises(ValueError):
+        Statement("SELECT * FROM unnest(:image_ids::int[])")
+
+
+def test_missing_values_raise_key_error():
+    with pytest.raises(KeyError):
+        Statement("SELECT :a, :b").bind({"a": 1})
+
+
+def test_registry_statement_is_prepared_once_per_connection(database_url):
+    async def main():
+        connection = await asyncpg.connect(database_url)
+        await connection.execute("INSERT INTO user_alias (user_email, user_alias) VALUES ('prepared@example.com', 'prepared')")
+        await connection.close()
+
+        # one pooled connection, so every call lands on the same asyncpg statement cache
+        db = Database(url=database_url, min_size=1, max_size=1)
+        await db.connect()
+        try:
+            for index in range(5):
+                values = {
+                    "user_email": "prepared@example.com",
+                    "user_alias": f"prepared-{index}",
+                    "daily_dollar": None,
+                    # alternating which fields are set varies the old built statements, not this one
+                    "set_user_alias": index % 2 == 0,
+                    "set_daily_dollar": index % 2 == 1,
+                    "updated_by": "test",
+                    "updated_on": datetime.now(tz=timezone.utc),
+                }
+                await db.fetch_one(query=UPDATE_USER_ALIAS.sql, values=UPDATE_USER_ALIAS.bind(values))
+            return await db.fetch_val(
+                query="SELECT COUNT(*) FROM pg_prepared_statements WHERE statement LIKE '%UPDATE user_alias ua SET%' AND statement NOT LIKE '%pg_prepared_statements%'"
+            )
+        finally:
+            await db.disconnect()
+
+    assert asyncio.run(main()) == 1